@@ -0,0 +1,3 @@
+"""Benchmarks for the pull-detector pipeline and bot hot paths
+
+"""
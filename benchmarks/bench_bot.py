@@ -0,0 +1,85 @@
+"""Benchmarks for bot hot paths: prompt construction, prior-summary retrieval and discussion history persistence.
+
+All results are seconds or prompt characters (lower is better).
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Dict
+
+from benchmarks.fixtures import make_discussion_messages
+from benchmarks.timing import measure
+
+PROMPT_SIZES = [100, 1000, 10000]
+HISTORY_SIZES = [1000, 10000, 100000]
+SUMMARY_SIZES = [100, 1000, 10000]
+
+
+@contextmanager
+def working_directory(path: str):
+    # DiscussionSummarizer keeps its config and history files in the working directory
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def bench_summarization_prompt(sizes=PROMPT_SIZES) -> Dict[str, float]:
+    from pyobserver.ai_observer_bot.summarization_prompt import summarization_prompt
+
+    results = {}
+    for size in sizes:
+        messages = [m["content"] for m in make_discussion_messages(size)]
+        summaries = messages[: size // 10]
+        seconds = measure(lambda: summarization_prompt(messages, summaries), repeat=5)
+        results[f"prompt.messages{size}.sec"] = seconds
+
+    return results
+
+
+def bench_summary_retrieval(sizes=SUMMARY_SIZES) -> Dict[str, float]:
+    """Prompt size with every prior summary vs. only the retrieved ones, as the summary channel grows"""
+    from pyobserver.ai_observer_bot.summarization_prompt import summarization_prompt
+    from pyobserver.ai_observer_bot.summary_retriever import SummaryRetriever
+
+    results = {}
+    discussion = [m["content"] for m in make_discussion_messages(200, seed=1)]
+    delta = "\n".join(discussion[-20:])
+    for size in sizes:
+        summaries = [f"{i + 1}. {m['content']}" for i, m in enumerate(make_discussion_messages(size))]
+        retriever = SummaryRetriever()
+        for summary in summaries:
+            retriever.add_message(summary)
+
+        results[f"retrieval.summaries{size}.sec"] = measure(lambda: retriever.retrieve(delta), repeat=5)
+        results[f"retrieval.summaries{size}.prompt_chars"] = len(summarization_prompt(discussion, retriever.retrieve(delta)))
+        results[f"retrieval.summaries{size}.full_prompt_chars"] = len(summarization_prompt(discussion, summaries))
+
+    return results
+
+
+def bench_history_persistence(sizes=HISTORY_SIZES) -> Dict[str, float]:
+    from pyobserver.ai_observer_bot.discussion_summarizer import DiscussionSummarizer
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir, working_directory(tmp_dir):
+        for size in sizes:
+            messages = make_discussion_messages(size)
+            cog = DiscussionSummarizer(bot=None)
+            cog.conversation_history = {"bench-논의": messages}
+            cog.processed_message_ids = {"bench-논의": {m["id"] for m in messages}}
+
+            results[f"history.save.messages{size}.sec"] = measure(cog.save_history, repeat=3)
+            results[f"history.load.messages{size}.sec"] = measure(cog.load_history, repeat=3)
+
+    return results
+
+
+def run(quick: bool = False) -> Dict[str, float]:
+    results = {}
+    results.update(bench_summarization_prompt(PROMPT_SIZES[:-1] if quick else PROMPT_SIZES))
+    results.update(bench_summary_retrieval(SUMMARY_SIZES[:-1] if quick else SUMMARY_SIZES))
+    results.update(bench_history_persistence(HISTORY_SIZES[:-1] if quick else HISTORY_SIZES))
+    return results
@@ -0,0 +1,233 @@
+"""Benchmarks for the pull-detector dataset, training step, model forward and ONNX inference.
+
+All results are seconds, or MB for memory (lower is better).
+"""
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict
+
+from benchmarks.fixtures import make_pull_detector_dataset
+from benchmarks.timing import measure
+
+FORWARD_BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64]
+IMAGE_SIZE = 384
+
+# name -> (micro-batch size, grad_accum_steps, gradient_checkpointing), same effective batch 16 except the baseline
+MEMORY_CONFIGS = {
+    "batch4": (4, 1, False),
+    "batch16": (16, 1, False),
+    "batch4x4": (4, 4, False),
+    "batch4x4_checkpointing": (4, 4, True),
+}
+
+
+def bench_dataset(base_dir: Path) -> Dict[str, float]:
+    """Per-image `__getitem__` cost of PullDetectorDataset for the train and valid paths"""
+    import json
+    from pyffxivdata.dataset import PullDetectorDataset
+
+    with open(base_dir / "annotations.json") as f:
+        data_info = json.load(f)
+
+    results = {}
+    for name, kwargs in {
+        "train_pil": {"is_train": True},
+        "valid_pil": {"is_train": False},
+        "uint8": {"is_train": True, "uint8_output": True},
+    }.items():
+        dataset = PullDetectorDataset(data_info, base_dir / "images", **kwargs)
+        seconds = measure(lambda: [dataset[i] for i in range(len(dataset))], repeat=3)
+        results[f"dataset.{name}.sec_per_image"] = seconds / len(dataset)
+
+    return results
+
+
+def bench_train_step(base_dir: Path) -> Dict[str, float]:
+    """Average train() step latency and phase breakdown over one epoch.
+
+    Builds an EfficientNet-V2-M with ImageNet weights, downloaded once by torchvision.
+    """
+    import pandas as pd
+    from pyffxivdata.dataset import PullDetectorDataset
+    from pyffxivdata.train import FFXIVPullDetectorTrainConfig, build_dataloader, split_train_val_image_ids, train
+
+    with tempfile.TemporaryDirectory() as save_dir:
+        config = FFXIVPullDetectorTrainConfig(
+            lr=1e-3,
+            batch_size=4,
+            num_epochs=1,
+            eta_min=1e-5,
+            device="cpu",
+            save_dir=save_dir,
+            model_name="pull_detector",
+            dataset_base_dir=str(base_dir),
+            mlflow_host="127.0.0.1",
+            mlflow_port=8080,
+        )
+        X_train, X_val = split_train_val_image_ids(base_dir / "annotations.json")
+        train_dataloader = build_dataloader(PullDetectorDataset(X_train, base_dir / "images", True), config, shuffle=True)
+        val_dataloader = build_dataloader(PullDetectorDataset(X_val, base_dir / "images", False), config, shuffle=False)
+
+        train(config, train_dataloader, val_dataloader)
+        metrics = pd.read_csv(Path(save_dir) / "metrics_history.csv").iloc[-1]
+
+    num_steps = len(train_dataloader)
+    return {
+        f"train.{phase}.sec_per_step": float(metrics[f"{phase}_sec"]) / num_steps
+        for phase in ("data_wait", "forward", "backward", "optimizer", "compute")
+    }
+
+
+def _train_one_epoch(base_dir: Path, batch_size: int, grad_accum_steps: int, gradient_checkpointing: bool) -> Dict[str, float]:
+    """One train() epoch in the current process, returns its peak RSS and throughput"""
+    import pandas as pd
+    from pyffxivdata.dataset import PullDetectorDataset
+    from pyffxivdata.train import FFXIVPullDetectorTrainConfig, build_dataloader, split_train_val_image_ids, train
+
+    with tempfile.TemporaryDirectory() as save_dir:
+        config = FFXIVPullDetectorTrainConfig(
+            lr=1e-3,
+            batch_size=batch_size,
+            num_epochs=1,
+            eta_min=1e-5,
+            device="cpu",
+            save_dir=save_dir,
+            model_name="pull_detector",
+            dataset_base_dir=str(base_dir),
+            mlflow_host="127.0.0.1",
+            mlflow_port=8080,
+            grad_accum_steps=grad_accum_steps,
+            gradient_checkpointing=gradient_checkpointing,
+        )
+        X_train, X_val = split_train_val_image_ids(base_dir / "annotations.json")
+        train_dataloader = build_dataloader(PullDetectorDataset(X_train, base_dir / "images", True, image_size=IMAGE_SIZE), config, shuffle=True)
+        val_dataloader = build_dataloader(PullDetectorDataset(X_val, base_dir / "images", False, image_size=IMAGE_SIZE), config, shuffle=False)
+
+        train(config, train_dataloader, val_dataloader)
+        metrics = pd.read_csv(Path(save_dir) / "metrics_history.csv").iloc[-1]
+
+    return {"peak_rss_mb": float(metrics["peak_rss_mb"]), "images_per_sec": float(metrics["images_per_sec"])}
+
+
+def bench_train_memory(base_dir: Path) -> Dict[str, float]:
+    """Peak RSS and time per image of one epoch for micro-batch / accumulation / checkpointing settings.
+
+    Every configuration runs in a fresh process because peak RSS never goes down.
+    """
+    import multiprocessing
+
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for name, (batch_size, grad_accum_steps, gradient_checkpointing) in MEMORY_CONFIGS.items():
+        with context.Pool(1) as pool:
+            metrics = pool.apply(_train_one_epoch, (base_dir, batch_size, grad_accum_steps, gradient_checkpointing))
+        results[f"train_memory.{name}.peak_rss_mb"] = metrics["peak_rss_mb"]
+        results[f"train_memory.{name}.sec_per_image"] = 1 / metrics["images_per_sec"]
+
+    return results
+
+
+def bench_forward() -> Dict[str, float]:
+    """FFXIVPullDetector eval forward latency at batch sizes 1 to 64"""
+    import torch
+    from pyffxivdata.model import FFXIVPullDetector
+
+    model = FFXIVPullDetector("cpu").eval()
+    results = {}
+
+    with torch.no_grad():
+        for batch_size in FORWARD_BATCH_SIZES:
+            x = torch.randn(batch_size, 3, IMAGE_SIZE, IMAGE_SIZE)
+            seconds = measure(lambda: model(x), repeat=3)
+            results[f"forward.batch{batch_size}.sec_per_image"] = seconds / batch_size
+
+    return results
+
+
+def bench_onnx() -> Dict[str, float]:
+    """ONNX Runtime latency for one image across thread counts and session settings"""
+    import numpy as np
+    import onnxruntime as ort
+    import torch
+    from pyffxivdata.model import FFXIVPullDetector
+
+    model = FFXIVPullDetector("cpu").eval()
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        onnx_path = str(Path(tmp_dir) / "pull_detector.onnx")
+        torch.onnx.export(model, torch.randn(1, 3, IMAGE_SIZE, IMAGE_SIZE), dynamo=True).save(onnx_path)
+        x = np.random.default_rng(0).standard_normal((1, 3, IMAGE_SIZE, IMAGE_SIZE), dtype=np.float32)
+
+        thread_counts = sorted({1, 2, 4, os.cpu_count() or 1})
+        for threads in thread_counts:
+            for mode_name, execution_mode in {
+                "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+                "parallel": ort.ExecutionMode.ORT_PARALLEL,
+            }.items():
+                for opt_name, opt_level in {
+                    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+                    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+                }.items():
+                    options = ort.SessionOptions()
+                    options.intra_op_num_threads = threads
+                    options.execution_mode = execution_mode
+                    options.graph_optimization_level = opt_level
+                    session = ort.InferenceSession(onnx_path, sess_options=options, providers=["CPUExecutionProvider"])
+                    input_name = session.get_inputs()[0].name
+
+                    seconds = measure(lambda: session.run(None, {input_name: x}), repeat=10, warmup=2)
+                    results[f"onnx.threads{threads}.{mode_name}.{opt_name}.sec"] = seconds
+
+    return results
+
+
+def bench_temporal_head() -> Dict[str, float]:
+    """One temporal head epoch on a synthetic embedding cache, for the two-label and both single-label heads"""
+    import torch
+    from pyffxivdata.temporal_model import TemporalHeadTrainConfig, train_temporal_head
+
+    num_frames, in_features = 512, 64
+    generator = torch.Generator().manual_seed(0)
+    # Two recordings, so windows and the train/val split are per recording
+    cache = {
+        "image_names": [f"{i:08x}-rec{i * 2 // num_frames}_20250101_120000_{i:07d}.jpg" for i in range(num_frames)],
+        "embeddings": torch.randn(num_frames, in_features, generator=generator),
+        "frame_logits": torch.randn(num_frames, 2, generator=generator),
+        "labels": torch.randint(0, 2, (num_frames, 3), generator=generator),
+    }
+
+    results = {}
+    for model_name in ("pull_detector", "pull_start_detector", "pull_end_detector"):
+        config = TemporalHeadTrainConfig(
+            lr=1e-3,
+            batch_size=16,
+            num_epochs=1,
+            seq_len=16,
+            device="cpu",
+            model_name=model_name,
+            dataset_base_dir="",
+            backbone_checkpoint="",
+        )
+        results[f"temporal_head.{model_name}.sec"] = measure(lambda: train_temporal_head(config, cache), repeat=1, warmup=0)
+
+    return results
+
+
+def run(quick: bool = False) -> Dict[str, float]:
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base_dir = make_pull_detector_dataset(Path(tmp_dir), num_images=16 if quick else 64)
+        results.update(bench_dataset(base_dir))
+        if not quick:
+            results.update(bench_train_step(base_dir))
+            results.update(bench_train_memory(base_dir))
+
+    results.update(bench_temporal_head())
+    results.update(bench_forward())
+    if not quick:
+        results.update(bench_onnx())
+
+    return results
@@ -0,0 +1,220 @@
+"""In-process stand-in for the Discord REST API and gateway state used by the bot cogs.
+
+Only the attributes and coroutines the cogs actually touch are implemented. Every coroutine that
+would hit Discord goes through `FakeRestAPI.call`, which adds latency, enforces per-route rate-limit
+buckets and counts calls.
+"""
+import asyncio
+import itertools
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+
+import discord
+
+_ids = itertools.count(10**17)
+
+
+def next_id():
+    return next(_ids)
+
+
+class FakeRestAPI:
+    """Simulated REST layer.
+
+    Args:
+        latency: Seconds added to every call.
+        bucket_size: Calls allowed per route bucket per `bucket_period` (Discord uses 5 per 5s for messages).
+        bucket_period: Length of a rate-limit window in seconds.
+    """
+
+    def __init__(self, latency=0.05, bucket_size=5, bucket_period=5.0):
+        self.latency = latency
+        self.bucket_size = bucket_size
+        self.bucket_period = bucket_period
+
+        self.call_counts = Counter()
+        self.rate_limit_waits = 0
+        self.rate_limit_wait_sec = 0.0
+        self._buckets = defaultdict(list)
+        self._locks = defaultdict(asyncio.Lock)
+
+    async def call(self, route, bucket=None):
+        bucket = bucket or route
+        self.call_counts[route] += 1
+
+        async with self._locks[bucket]:
+            now = time.monotonic()
+            window = [t for t in self._buckets[bucket] if now - t < self.bucket_period]
+            if len(window) >= self.bucket_size:
+                wait = self.bucket_period - (now - window[0])
+                self.rate_limit_waits += 1
+                self.rate_limit_wait_sec += wait
+                await asyncio.sleep(wait)
+                now = time.monotonic()
+                window = [t for t in window if now - t < self.bucket_period]
+            window.append(now)
+            self._buckets[bucket] = window
+
+        await asyncio.sleep(self.latency)
+
+
+class FakePermissions:
+    def __init__(self, send_messages=True, mention_everyone=False, administrator=False):
+        self.send_messages = send_messages
+        self.mention_everyone = mention_everyone
+        self.administrator = administrator
+
+
+class FakeRole:
+    def __init__(self, name):
+        self.id = next_id()
+        self.name = name
+        self.mention = f"<@&{self.id}>"
+
+
+class FakeMember:
+    def __init__(self, name, bot=False):
+        self.id = next_id()
+        self.name = name
+        self.bot = bot
+        self.mention = f"<@{self.id}>"
+        self.guild_permissions = FakePermissions()
+        self.top_role = FakeRole("@everyone")
+
+
+class FakeMessage:
+    def __init__(self, api, channel, author, content=None, embeds=None, created_at=None):
+        self.api = api
+        self.channel = channel
+        self.guild = channel.guild
+        self.id = next_id()
+        self.author = author
+        self.content = content or ""
+        self.embeds = embeds or []
+        self.attachments = []
+        self.created_at = created_at or datetime.now(timezone.utc)
+
+    async def edit(self, content=None, embed=None, embeds=None):
+        await self.api.call("PATCH /channels/{id}/messages/{id}", bucket=f"edit:{self.channel.id}")
+        if content is not None:
+            self.content = content
+        if embed is not None:
+            self.embeds = [embed]
+        if embeds is not None:
+            self.embeds = list(embeds)
+        return self
+
+
+class FakeTextChannel:
+    def __init__(self, api, guild, name):
+        self.api = api
+        self.guild = guild
+        self.id = next_id()
+        self.name = name
+        self.mention = f"<#{self.id}>"
+        # Oldest first, like Discord's storage; history() yields newest first
+        self.messages = []
+
+    def permissions_for(self, member):
+        return FakePermissions()
+
+    async def history(self, limit=100):
+        remaining = len(self.messages) if limit is None else min(limit, len(self.messages))
+        index = len(self.messages)
+
+        # Discord returns history in pages of 100 messages
+        while remaining > 0:
+            await self.api.call("GET /channels/{id}/messages", bucket=f"history:{self.id}")
+            for _ in range(min(100, remaining)):
+                index -= 1
+                remaining -= 1
+                yield self.messages[index]
+
+    async def send(self, content=None, embed=None, embeds=None):
+        await self.api.call("POST /channels/{id}/messages", bucket=f"send:{self.id}")
+        if embed is not None:
+            embeds = [embed]
+        message = FakeMessage(self.api, self, self.guild.me, content, embeds)
+        self.messages.append(message)
+        return message
+
+
+class FakeScheduledEvent:
+    def __init__(self, guild, name, start_time, description=None):
+        self.guild = guild
+        self.id = next_id()
+        self.name = name
+        self.description = description
+        self.start_time = start_time
+        self.end_time = None
+        self.status = discord.EventStatus.scheduled
+        self.location = "Eorzea"
+        self.channel = None
+        self.user_count = 8
+        self.cover_image = None
+        self.url = f"https://discord.com/events/{guild.id}/{self.id}"
+
+
+class FakeGuild:
+    def __init__(self, api, name):
+        self.api = api
+        self.id = next_id()
+        self.name = name
+        self.me = FakeMember("flyxiv-observer", bot=True)
+        self.text_channels = []
+        self.roles = []
+        self.scheduled_events = []
+
+    @property
+    def system_channel(self):
+        return self.text_channels[0] if self.text_channels else None
+
+    def add_text_channel(self, name):
+        channel = FakeTextChannel(self.api, self, name)
+        self.text_channels.append(channel)
+        return channel
+
+    def get_channel(self, channel_id):
+        return next((c for c in self.text_channels if c.id == channel_id), None)
+
+    def get_role(self, role_id):
+        return next((r for r in self.roles if r.id == role_id), None)
+
+    async def fetch_scheduled_events(self):
+        await self.api.call("GET /guilds/{id}/scheduled-events", bucket=f"events:{self.id}")
+        return list(self.scheduled_events)
+
+
+class FakeBot:
+    def __init__(self, api):
+        self.api = api
+        self.guilds = []
+        self.user = FakeMember("flyxiv-observer", bot=True)
+
+    async def wait_until_ready(self):
+        return None
+
+
+class FakeContext:
+    def __init__(self, bot, guild, channel, author):
+        self.bot = bot
+        self.guild = guild
+        self.channel = channel
+        self.author = author
+
+    async def send(self, content=None, embed=None, embeds=None):
+        return await self.channel.send(content, embed=embed, embeds=embeds)
+
+
+def populate_messages(channel, num_messages, contents, authors, start=None, interval=timedelta(seconds=30)):
+    """Fill `channel` with `num_messages` synthetic user messages without REST calls"""
+    start = start or datetime.now(timezone.utc) - interval * num_messages
+    for i in range(num_messages):
+        channel.messages.append(FakeMessage(
+            channel.api,
+            channel,
+            authors[i % len(authors)],
+            contents[i % len(contents)],
+            created_at=start + interval * i,
+        ))
@@ -0,0 +1,58 @@
+"""Synthetic fixtures so benchmarks need no dataset, Discord, Gemini or Dropbox access."""
+import json
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+CHOICES = ["IsCombat", "HasRedCircle", "PullEnded"]
+
+
+def make_pull_detector_dataset(base_dir: Path, num_images: int = 64, width: int = 1280, height: int = 720, seed: int = 0) -> Path:
+    """Write random frames and a Label Studio style annotations.json under `base_dir`.
+
+    Layout matches `dataset_base_dir` of the train config: `annotations.json` + `images/`.
+    """
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    image_dir = base_dir / "images"
+    image_dir.mkdir(parents=True, exist_ok=True)
+
+    annotations = []
+    for i in range(num_images):
+        image_name = f"{i:08x}-frame_{i:06d}.jpg"
+        # Smooth noise compresses like gameplay frames instead of like white noise
+        small = rng.integers(0, 256, (height // 16, width // 16, 3), dtype=np.uint8)
+        Image.fromarray(small).resize((width, height)).save(image_dir / image_name, quality=90)
+
+        choices = [c for c in CHOICES if rng.random() < 0.3]
+        annotations.append({
+            "file_upload": image_name,
+            "annotations": [{"result": [{"value": {"choices": choices}}] if choices else []}],
+        })
+
+    with open(base_dir / "annotations.json", "w") as f:
+        json.dump(annotations, f)
+
+    return base_dir
+
+
+def make_discussion_messages(num_messages: int, seed: int = 0) -> List[Dict]:
+    """Message dicts in the format stored by DiscussionSummarizer"""
+    rng = random.Random(seed)
+    authors = [f"raider{i}" for i in range(8)]
+    words = ["탱커", "힐러", "왼쪽", "오른쪽", "산개", "기믹", "환랑초래", "쉐어", "넉백", "무적", "결정", "12시", "6시"]
+    start = datetime(2025, 1, 1)
+
+    return [
+        {
+            "id": 10**17 + i,
+            "author": rng.choice(authors),
+            "content": " ".join(rng.choice(words) for _ in range(rng.randint(3, 30))),
+            "timestamp": (start + timedelta(seconds=30 * i)).isoformat(),
+            "attachments": [],
+        }
+        for i in range(num_messages)
+    ]
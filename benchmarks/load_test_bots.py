@@ -0,0 +1,253 @@
+"""Drive the bot cogs against the fake Discord layer under load.
+
+Reports command latency, asyncio event-loop lag and REST call counts for:
+- ScheduledEventReminder: one `check_scheduled_events` pass over many guilds and events
+- DiscussionSummarizer: `register_channel` and concurrent `summarize_discussion_result` on a large channel
+- FFXIVInfoScraper: concurrent `summarize_patchnote`
+
+The patch note scrape is replaced by a function that blocks for the configured latency, like the real
+synchronous call does. Gemini is replaced by an async stream that spreads its latency over chunks, and
+the Flash-Lite triage by an async call that always reports a small set of new decisions.
+
+run ex) in flyxiv_observer_v1 base directory,
+
+```sh
+python -m benchmarks.load_test_bots --guilds 300 --events_per_guild 20 --messages 100000
+```
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.fake_discord import FakeBot, FakeContext, FakeGuild, FakeMember, FakeRestAPI, FakeScheduledEvent, populate_messages
+from benchmarks.fixtures import make_discussion_messages
+
+LAG_INTERVAL = 0.01
+
+
+class LoopLagMonitor:
+    """Measures how late a periodic asyncio sleep wakes up"""
+
+    def __init__(self, interval=LAG_INTERVAL):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(time.perf_counter() - start - self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+class CommandTimer:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+
+    async def run(self, name, coro):
+        start = time.perf_counter()
+        try:
+            await coro
+        finally:
+            self.latencies[name].append(time.perf_counter() - start)
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[q - 1]
+
+
+def summarize(samples):
+    return {
+        "count": len(samples),
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "max": max(samples, default=0.0),
+    }
+
+
+def fake_llm_stream(latency, text, num_chunks=20):
+    async def request(*args, **kwargs):
+        size = -(-len(text) // num_chunks)
+        for i in range(0, len(text), size):
+            await asyncio.sleep(latency / num_chunks)
+            yield text[i:i + size]
+    return request
+
+
+def fake_llm(latency, text):
+    async def request(*args, **kwargs):
+        await asyncio.sleep(latency)
+        return text
+    return request
+
+
+def fake_blocking_call(latency, text):
+    def request(*args, **kwargs):
+        time.sleep(latency)
+        return text
+    return request
+
+
+async def run_reminder(api, bot, timer, args):
+    from pyobserver.scheduled_event_reminder import ScheduledEventReminder
+
+    now = datetime.now(timezone.utc)
+    for g in range(args.guilds):
+        guild = FakeGuild(api, f"guild-{g}")
+        guild.add_text_channel("general")
+        for e in range(args.events_per_guild):
+            start_time = now + timedelta(minutes=(g * 7 + e * 131) % (2 * 24 * 60))
+            guild.scheduled_events.append(FakeScheduledEvent(guild, f"raid-{e}", start_time))
+        bot.guilds.append(guild)
+
+    cog = ScheduledEventReminder(bot)
+    # Drive the loop body directly instead of waiting 15 minutes for tasks.loop
+    cog.check_scheduled_events.cancel()
+    await timer.run("check_scheduled_events", cog.check_scheduled_events.coro(cog))
+
+
+async def run_summarizer(api, bot, timer, args):
+    from pyobserver.ai_observer_bot import discussion_summarizer
+    from pyobserver.ai_observer_bot.discussion_summarizer import DiscussionSummarizer
+
+    from pyobserver import model_router
+
+    model_router.request_gemini_async = fake_llm(args.triage_latency, '{"has_new_decisions": true, "delta_size": "small"}')
+    discussion_summarizer.request_gemini_stream = fake_llm_stream(args.llm_latency, "1. 환랑초래 때 탱힐은 오른쪽으로 가기로 했습니다.")
+
+    guild = FakeGuild(api, "raid-guild")
+    bot.guilds.append(guild)
+    command_channel = guild.add_text_channel("bot-commands")
+    discussion_channel = guild.add_text_channel("raid-논의")
+    summary_channel = guild.add_text_channel("raid-최종정리")
+
+    authors = [FakeMember(f"raider{i}") for i in range(8)]
+    contents = [m["content"] for m in make_discussion_messages(1000)]
+    populate_messages(discussion_channel, args.messages, contents, authors)
+    populate_messages(summary_channel, args.summary_messages, contents, [guild.me])
+
+    cog = DiscussionSummarizer(bot)
+    ctx = FakeContext(bot, guild, command_channel, authors[0])
+
+    await timer.run("register_channel", cog.register_channel.callback(cog, ctx, "raid"))
+    await asyncio.gather(*[
+        timer.run("summarize_discussion_result", cog.summarize_discussion_result.callback(cog, ctx, "raid"))
+        for _ in range(args.concurrency)
+    ])
+
+
+async def run_scraper(api, bot, timer, args):
+    from pyobserver import ffxiv_info_scraper
+    from pyobserver.ffxiv_info_scraper import FFXIVInfoScraper
+
+    ffxiv_info_scraper.scrape_webpage = fake_blocking_call(args.scrape_latency, "patch note " * 5000)
+    ffxiv_info_scraper.request_gemini_stream = fake_llm_stream(args.llm_latency, "## Job changes\n" + "- potency 400 -> 420\n" * 400)
+
+    guild = FakeGuild(api, "patch-guild")
+    bot.guilds.append(guild)
+    channel = guild.add_text_channel("bot-commands")
+    cog = FFXIVInfoScraper(bot)
+    ctx = FakeContext(bot, guild, channel, FakeMember("raider"))
+
+    await asyncio.gather(*[
+        timer.run("summarize_patchnote", cog.summarize_patchnote.callback(cog, ctx, "7.3"))
+        for _ in range(args.concurrency)
+    ])
+
+
+SCENARIOS = {
+    "reminder": run_reminder,
+    "summarizer": run_summarizer,
+    "scraper": run_scraper,
+}
+
+
+async def run_scenario(name, args):
+    api = FakeRestAPI(args.rest_latency, args.bucket_size, args.bucket_period)
+    bot = FakeBot(api)
+    timer = CommandTimer()
+    monitor = LoopLagMonitor()
+
+    monitor.start()
+    start = time.perf_counter()
+    await SCENARIOS[name](api, bot, timer, args)
+    elapsed = time.perf_counter() - start
+    await monitor.stop()
+
+    return {
+        "elapsed_sec": elapsed,
+        "commands": {command: summarize(samples) for command, samples in timer.latencies.items()},
+        "loop_lag": summarize(monitor.samples),
+        "rest_calls": dict(api.call_counts),
+        "rest_calls_total": sum(api.call_counts.values()),
+        "rate_limit_waits": api.rate_limit_waits,
+        "rate_limit_wait_sec": api.rate_limit_wait_sec,
+    }
+
+
+def print_report(name, report):
+    print(f"\n=== {name} ({report['elapsed_sec']:.2f}s) ===")
+    for command, stats in report["commands"].items():
+        print(f"{command}: n={stats['count']} p50={stats['p50']:.3f}s p95={stats['p95']:.3f}s max={stats['max']:.3f}s")
+    lag = report["loop_lag"]
+    print(f"event loop lag: p50={lag['p50'] * 1000:.1f}ms p95={lag['p95'] * 1000:.1f}ms max={lag['max'] * 1000:.1f}ms")
+    print(f"REST calls: {report['rest_calls_total']} ({report['rate_limit_waits']} rate-limit waits, {report['rate_limit_wait_sec']:.1f}s)")
+    for route, count in sorted(report["rest_calls"].items(), key=lambda item: -item[1]):
+        print(f"  {route}: {count}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--guilds", type=int, default=200)
+    parser.add_argument("--events_per_guild", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--summary_messages", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--rest_latency", type=float, default=0.05)
+    parser.add_argument("--bucket_size", type=int, default=5)
+    parser.add_argument("--bucket_period", type=float, default=5.0)
+    parser.add_argument("--llm_latency", type=float, default=2.0)
+    parser.add_argument("--triage_latency", type=float, default=0.3)
+    parser.add_argument("--scrape_latency", type=float, default=0.5)
+    parser.add_argument("--output", type=str, default=None)
+    return parser.parse_args()
+
+
+async def main(args):
+    reports = {}
+    for name in args.scenarios:
+        reports[name] = await run_scenario(name, args)
+        print_report(name, reports[name])
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    # The cogs write their config and history files to the working directory
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        asyncio.run(main(args))
@@ -0,0 +1,118 @@
+"""Run the benchmark suite and compare against a JSON baseline.
+
+run ex) in flyxiv_observer_v1 base directory,
+
+```sh
+# record a baseline on this machine
+python -m benchmarks.run_benchmarks --update_baseline
+# fail (exit code 1) if any benchmark is more than 20% slower than the baseline
+python -m benchmarks.run_benchmarks --threshold 1.2
+```
+
+Baseline format:
+
+```json
+{"machine": {...}, "threshold": 1.2, "results": {"prompt.messages1000.sec": 0.0004, ...}}
+```
+
+A benchmark-specific threshold can be set with `"thresholds": {"<name>": 1.5}`.
+"""
+import argparse
+import json
+import platform
+import sys
+from pathlib import Path
+
+from benchmarks import bench_bot, bench_training
+
+SUITES = {
+    "training": bench_training.run,
+    "bot": bench_bot.run,
+}
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+DEFAULT_THRESHOLD = 1.2
+
+
+def machine_info():
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "python": platform.python_version(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Returns (name, baseline, current, ratio) for every benchmark slower than its threshold"""
+    thresholds = baseline.get("thresholds", {})
+    regressions = []
+
+    for name, value in results.items():
+        base_value = baseline["results"].get(name)
+        if not base_value:
+            continue
+
+        ratio = value / base_value
+        print(f"{name:<48}{base_value:>12.6f}{value:>12.6f}{ratio:>8.2f}x")
+        if ratio > thresholds.get(name, threshold):
+            regressions.append((name, base_value, value, ratio))
+
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--suites", nargs="+", choices=list(SUITES), default=list(SUITES))
+    parser.add_argument("--quick", action="store_true", help="Smaller inputs, skips train() and ONNX")
+    parser.add_argument("--baseline", type=str, default=str(DEFAULT_BASELINE))
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--update_baseline", action="store_true")
+    parser.add_argument("--output", type=str, default=None, help="Also write this run's results to a JSON file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    results = {}
+    for suite in args.suites:
+        print(f"Running {suite} benchmarks...")
+        results.update(SUITES[suite](quick=args.quick))
+
+    run = {"machine": machine_info(), "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(run, f, indent=2)
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline or not baseline_path.exists():
+        run["threshold"] = args.threshold or DEFAULT_THRESHOLD
+        if baseline_path.exists():
+            with open(baseline_path) as f:
+                previous = json.load(f)
+            # Keep results of suites that were not run this time and any per-benchmark thresholds
+            run["results"] = {**previous.get("results", {}), **results}
+            run["thresholds"] = previous.get("thresholds", {})
+        with open(baseline_path, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"Baseline saved at: {baseline_path}")
+        return 0
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    print(f"{'Benchmark':<48}{'Baseline':>12}{'Current':>12}{'Ratio':>9}")
+    regressions = compare(results, baseline, args.threshold or baseline.get("threshold", DEFAULT_THRESHOLD))
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s):")
+        for name, base_value, value, ratio in regressions:
+            print(f"  {name}: {base_value:.6f}s -> {value:.6f}s ({ratio:.2f}x)")
+        return 1
+
+    print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,18 @@
+"""Small timing helpers shared by the benchmark modules."""
+import statistics
+import time
+from typing import Callable
+
+
+def measure(fn: Callable[[], object], repeat: int = 5, warmup: int = 1) -> float:
+    """Median wall-clock seconds of `fn()` over `repeat` runs"""
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+
+    return statistics.median(samples)
@@ -0,0 +1,95 @@
+"""Batched tensor augmentation for pull-detector training.
+
+Runs after collation on whole uint8 batches instead of one PIL image at a time in
+`PullDetectorDataset.__getitem__`. Flip and the `RandomAffine` of `TRAIN_TRANSFORM` are fused into a
+single `affine_grid` + `grid_sample` call with parameters sampled per item.
+"""
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from typing import Tuple
+from pyffxivdata.dataset import NORMALIZE_MEAN, NORMALIZE_STD
+
+
+def normalize_batch(images: torch.Tensor) -> torch.Tensor:
+    """(B, C, H, W) in [0, 255] -> (B, C, H, W) float normalized like `T.ToTensor()` + `T.Normalize`."""
+    mean = torch.tensor(NORMALIZE_MEAN, device=images.device).view(1, -1, 1, 1)
+    std = torch.tensor(NORMALIZE_STD, device=images.device).view(1, -1, 1, 1)
+    return (images.float() / 255.0 - mean) / std
+
+
+class BatchAugmentation(nn.Module):
+    """Same augmentations as `TRAIN_TRANSFORM`, applied to a whole batch on its device.
+
+    Parameters are drawn from a CPU generator, so results are deterministic for a given seed
+    and batch order regardless of the device.
+    """
+
+    def __init__(
+        self,
+        degrees: float = 12,
+        translate: Tuple[float, float] = (0.05, 0.05),
+        scale: Tuple[float, float] = (0.9, 1.1),
+        shear: float = 5,
+        flip_p: float = 0.5,
+        fill: float = 128,
+        seed: int | None = None,
+    ) -> None:
+        super().__init__()
+
+        self.degrees = degrees
+        self.translate = translate
+        self.scale = scale
+        self.shear = shear
+        self.flip_p = flip_p
+        self.fill = fill
+
+        self.generator = torch.Generator()
+        if seed is not None:
+            self.generator.manual_seed(seed)
+        else:
+            self.generator.seed()
+
+    def _uniform(self, n: int, low: float, high: float) -> torch.Tensor:
+        return torch.rand(n, generator=self.generator) * (high - low) + low
+
+    def sample_theta(self, batch_size: int, height: int, width: int) -> torch.Tensor:
+        """Per-item (B, 2, 3) matrices mapping output to input in normalized coordinates."""
+        angle = torch.deg2rad(self._uniform(batch_size, -self.degrees, self.degrees))
+        shear = torch.deg2rad(self._uniform(batch_size, -self.shear, self.shear))
+        scale = self._uniform(batch_size, *self.scale)
+        tx = self._uniform(batch_size, -self.translate[0], self.translate[0]) * width
+        ty = self._uniform(batch_size, -self.translate[1], self.translate[1]) * height
+        flip = torch.rand(batch_size, generator=self.generator) < self.flip_p
+
+        # Forward pixel-space transform around the image center: A = R(angle) @ Shear_x @ scale
+        cos, sin, tan = torch.cos(angle), torch.sin(angle), torch.tan(shear)
+        a = torch.stack([
+            torch.stack([cos, cos * tan - sin], dim=-1),
+            torch.stack([sin, sin * tan + cos], dim=-1),
+        ], dim=-2) * scale.view(-1, 1, 1)
+        a_inv = torch.linalg.inv(a)
+
+        # Convert the inverse to normalized coordinates: D^-1 A^-1 D, with D = diag(W/2, H/2)
+        half = torch.tensor([width / 2, height / 2])
+        linear = a_inv * half.view(1, 1, 2) / half.view(1, 2, 1)
+        translation = -(a_inv @ torch.stack([tx, ty], dim=-1).unsqueeze(-1)).squeeze(-1) / half
+
+        theta = torch.cat([linear, translation.unsqueeze(-1)], dim=-1)
+        # Horizontal flip of the input image negates the sampled x coordinate
+        theta[flip, 0] *= -1
+
+        return theta
+
+    def forward(self, images: torch.Tensor) -> torch.Tensor:
+        """(B, C, H, W) uint8 -> (B, C, H, W) augmented and normalized float."""
+        batch_size, _, height, width = images.shape
+        theta = self.sample_theta(batch_size, height, width).to(images.device)
+        grid = F.affine_grid(theta, list(images.shape), align_corners=False)
+
+        # Shift so zero padding becomes `fill`, like RandomAffine(fill=128)
+        shifted = images.float() - self.fill
+        augmented = F.grid_sample(shifted, grid, mode="bilinear", padding_mode="zeros", align_corners=False) + self.fill
+
+        return normalize_batch(augmented)
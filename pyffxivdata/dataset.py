@@ -11,6 +11,9 @@ from pathlib import Path
 from enum import Enum
 
 
+NORMALIZE_MEAN = [0.485, 0.456, 0.406]
+NORMALIZE_STD = [0.229, 0.224, 0.225]
+
 affine = T.RandomAffine(
     degrees=12,
     translate=(0.05, 0.05),
@@ -20,22 +23,33 @@ affine = T.RandomAffine(
     fill=128,          # avoid black corners
 )
 
-# We can add RandomCrop and ColorJitter later
-TRAIN_TRANSFORM = T.Compose([
-    T.RandomHorizontalFlip(p=0.5),
-    affine,
-    T.Resize((480, 480)),
-    T.ToTensor(),
-    T.Normalize(mean=[0.485, 0.456, 0.406], 
-                       std=[0.229, 0.224, 0.225])
-])
-
-VALID_TRANSFORM = T.Compose([
-    T.Resize((480, 480)),
-    T.ToTensor(),
-    T.Normalize(mean=[0.485, 0.456, 0.406], 
-                       std=[0.229, 0.224, 0.225])
-])
+# Resolution of the module level transforms, training picks its own with `image_size`
+DEFAULT_IMAGE_SIZE = 480
+
+
+def build_transform(image_size: int, is_train: bool) -> T.Compose:
+    # We can add RandomCrop and ColorJitter later
+    augment = [T.RandomHorizontalFlip(p=0.5), affine] if is_train else []
+    return T.Compose([
+        *augment,
+        T.Resize((image_size, image_size)),
+        T.ToTensor(),
+        T.Normalize(mean=NORMALIZE_MEAN, 
+                           std=NORMALIZE_STD)
+    ])
+
+
+def build_uint8_transform(image_size: int) -> T.Compose:
+    """Resize only and keep uint8, augmentation and normalization run on whole batches (pyffxivdata.augmentation)"""
+    return T.Compose([
+        T.Resize((image_size, image_size)),
+        T.PILToTensor(),
+    ])
+
+
+TRAIN_TRANSFORM = build_transform(DEFAULT_IMAGE_SIZE, is_train=True)
+VALID_TRANSFORM = build_transform(DEFAULT_IMAGE_SIZE, is_train=False)
+UINT8_TRANSFORM = build_uint8_transform(DEFAULT_IMAGE_SIZE)
 
 class ChoiceLabels(Enum):
     IsCombat = "IsCombat"
@@ -60,10 +74,20 @@ def to_torch_tensor(choices: List[str]) -> torch.Tensor:
 
 
 class PullDetectorDataset(Dataset):
-    def __init__(self, data_info, image_dir: str, is_train: bool) -> None:
+    def __init__(self, data_info, image_dir: str, is_train: bool, uint8_output: bool = False, image_size: int = DEFAULT_IMAGE_SIZE) -> None:
         self.image_dir = image_dir
         self.data_info = data_info
         self.is_train = is_train
+        self.uint8_output = uint8_output
+        self.set_image_size(image_size)
+
+    def set_image_size(self, image_size: int) -> None:
+        """Change the output resolution. DataLoader workers keep their own copy, so rebuild the loader afterwards."""
+        self.image_size = image_size
+        if self.uint8_output:
+            self.transform = build_uint8_transform(image_size)
+        else:
+            self.transform = build_transform(image_size, self.is_train)
 
     def __len__(self) -> int:
         return len(self.data_info)
@@ -71,13 +95,13 @@ class PullDetectorDataset(Dataset):
     def __getitem__(self, idx: int) -> Dict[str, Any]:
         """Output image and label tensor.
         
-        image: (C, H, W)
+        image: (C, H, W), uint8 if `uint8_output` else normalized float
         label: (3)
         """
         annotations = [] if not self.data_info[idx]['annotations'][0]['result'] else self.data_info[idx]['annotations'][0]['result'][0]['value']['choices']
         image_name = self.data_info[idx]['file_upload']
         image = Image.open(Path(self.image_dir) / f"{image_name}").convert("RGB")
-        image = TRAIN_TRANSFORM(image) if self.is_train else VALID_TRANSFORM(image)
+        image = self.transform(image)
         label = to_torch_tensor(annotations)
 
         return {
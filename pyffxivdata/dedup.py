@@ -0,0 +1,200 @@
+"""Near-duplicate frame detection for the pull detector dataset.
+
+Consecutive gameplay frames are often almost identical, so every epoch pays decode + augmentation +
+forward/backward for the same picture many times. This computes a difference hash (dHash) per image in
+parallel, groups images whose hashes are within `threshold` bits, and writes a manifest with the same
+schema as `annotations.json` plus a `dedup` entry per item:
+
+- `cluster_id` / `cluster_size` / `sample_weight`: near-duplicates with the same label, `sample_weight = 1 / cluster_size`
+- `group_id`: near-duplicates regardless of label, used by `split_train_val_image_ids` so a cluster never
+  ends up on both sides of the train/val split
+
+`--mode dedup` keeps one representative per cluster, `--mode weighted` keeps every image and lets
+`weighted_sampling` in the train config draw one cluster's worth of samples per cluster per epoch.
+
+run ex) in flyxiv_observer_v1 base directory,
+
+```sh
+python -m pyffxivdata.dedup --dataset_base_dir data/ffxiv_pulldetector_v1 --mode weighted --threshold 4
+```
+"""
+import json
+import argparse
+import time
+
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from PIL import Image
+
+HASH_SIZE = 8
+DEFAULT_THRESHOLD = 3
+
+
+def dhash(image_path: str, hash_size: int = HASH_SIZE) -> int:
+    """Difference hash: grayscale (hash_size + 1, hash_size) thumbnail, 1 bit per horizontal gradient sign"""
+    with Image.open(image_path) as image:
+        # draft() lets the JPEG decoder downscale while decoding instead of decoding full resolution
+        image.draft("L", (hash_size * 16, hash_size * 16))
+        pixels = list(image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR).getdata())
+
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def compute_hashes(image_dir: Path, image_names: List[str], num_workers: int | None = None) -> List[int]:
+    paths = [str(Path(image_dir) / name) for name in image_names]
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        return list(executor.map(dhash, paths, chunksize=64))
+
+
+def label_key(item: Dict[str, Any]) -> Tuple[str, ...]:
+    """Same label parsing as PullDetectorDataset"""
+    result = item["annotations"][0]["result"]
+    return tuple(sorted(result[0]["value"]["choices"])) if result else ()
+
+
+class UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a: int, b: int):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def hash_bands(threshold: int) -> List[Tuple[int, int]]:
+    """(shift, mask) of `threshold + 1` bands covering the hash bits.
+
+    Two hashes within `threshold` bits of each other differ in at most `threshold` bands, so they share
+    at least one band (pigeonhole) and banding finds every such pair. More bands means narrower bands
+    and more candidate pairs.
+    """
+    num_bits = HASH_SIZE * HASH_SIZE
+    if not 0 <= threshold < num_bits:
+        raise ValueError(f"threshold must be in [0, {num_bits}), got {threshold}")
+
+    num_bands = threshold + 1
+    bounds = [band * num_bits // num_bands for band in range(num_bands + 1)]
+    return [(start, (1 << (end - start)) - 1) for start, end in zip(bounds, bounds[1:])]
+
+
+def cluster_hashes(hashes: List[int], indices: List[int], threshold: int, union_find: UnionFind):
+    """Union every pair in `indices` whose hashes are within `threshold` bits.
+
+    Candidate pairs come from LSH banding (pairs sharing at least one band), so the work is
+    proportional to the number of near-duplicate candidates instead of all pairs.
+    """
+    for shift, mask in hash_bands(threshold):
+        buckets = defaultdict(list)
+        for i in indices:
+            buckets[(hashes[i] >> shift) & mask].append(i)
+
+        for bucket in buckets.values():
+            for a, b in combinations(bucket, 2):
+                if union_find.find(a) != union_find.find(b) and bin(hashes[a] ^ hashes[b]).count("1") <= threshold:
+                    union_find.union(a, b)
+
+
+def build_manifest(items: List[Dict[str, Any]], hashes: List[int], threshold: int = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """Annotate every item with cluster (same label) and group (any label) ids of its near-duplicates"""
+    label_clusters = UnionFind(len(items))
+    by_label = defaultdict(list)
+    for i, item in enumerate(items):
+        by_label[label_key(item)].append(i)
+    for indices in by_label.values():
+        cluster_hashes(hashes, indices, threshold, label_clusters)
+
+    groups = UnionFind(len(items))
+    cluster_hashes(hashes, list(range(len(items))), threshold, groups)
+
+    roots = [label_clusters.find(i) for i in range(len(items))]
+    sizes = defaultdict(int)
+    for root in roots:
+        sizes[root] += 1
+
+    manifest = []
+    for i, item in enumerate(items):
+        manifest.append({
+            **item,
+            "dedup": {
+                "hash": f"{hashes[i]:016x}",
+                "cluster_id": roots[i],
+                "cluster_size": sizes[roots[i]],
+                "sample_weight": 1.0 / sizes[roots[i]],
+                "group_id": groups.find(i),
+                "representative": roots[i] == i,
+            },
+        })
+    return manifest
+
+
+def deduplicate(manifest: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One representative (the first frame) per cluster, weights reset to 1"""
+    kept = []
+    for item in manifest:
+        if item["dedup"]["representative"]:
+            kept.append({**item, "dedup": {**item["dedup"], "sample_weight": 1.0}})
+    return kept
+
+
+def report(manifest: List[Dict[str, Any]], threshold: int, hash_sec: float):
+    num_images = len(manifest)
+    num_clusters = sum(item["dedup"]["representative"] for item in manifest)
+    num_groups = len({item["dedup"]["group_id"] for item in manifest})
+    largest = max((item["dedup"]["cluster_size"] for item in manifest), default=0)
+    reduction = 1 - num_clusters / num_images if num_images else 0.0
+
+    print(f"images: {num_images} (hashed in {hash_sec:.1f}s)")
+    print(f"near-duplicate clusters (threshold {threshold} bits, per label): {num_clusters}, largest {largest}")
+    print(f"split groups (any label): {num_groups}")
+    # Per-sample cost (decode, augmentation, forward/backward) does not change, so epoch time scales with samples per epoch
+    print(f"samples per epoch: {num_images} -> {num_clusters}, estimated epoch time reduction {reduction * 100:.1f}%")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset_base_dir", type=str, required=True)
+    parser.add_argument("--annotations", type=str, default="annotations.json")
+    parser.add_argument("--mode", type=str, choices=["dedup", "weighted"], default="weighted")
+    parser.add_argument("--threshold", type=int, default=DEFAULT_THRESHOLD, help="max differing bits out of 64")
+    parser.add_argument("--num_workers", type=int, default=None)
+    parser.add_argument("--output", type=str, default=None, help="default: annotations.<mode>.json")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    base_dir = Path(args.dataset_base_dir)
+
+    with open(base_dir / args.annotations, "r") as f:
+        items = json.load(f)
+
+    start = time.perf_counter()
+    hashes = compute_hashes(base_dir / "images", [item["file_upload"] for item in items], args.num_workers)
+    hash_sec = time.perf_counter() - start
+
+    manifest = build_manifest(items, hashes, args.threshold)
+    report(manifest, args.threshold, hash_sec)
+    if args.mode == "dedup":
+        manifest = deduplicate(manifest)
+
+    output = base_dir / (args.output or f"annotations.{args.mode}.json")
+    with open(output, "w") as f:
+        json.dump(manifest, f)
+    print(f"wrote {len(manifest)} items to {output}")
@@ -1,32 +1,28 @@
 import argparse
 from pathlib import Path
 import optuna
-from pyffxivdata.train import split_train_val_image_ids,FFXIVPullDetectorTrainConfig,train,evaluate_val_metrics
+from pyffxivdata.train import split_train_val_image_ids,FFXIVPullDetectorTrainConfig,train,evaluate_val_metrics,build_dataloader
 from pyffxivdata.dataset import PullDetectorDataset
 import logging
 import mlflow
 from optuna.integration.mlflow import MLflowCallback
 import hydra
 from omegaconf import OmegaConf
-from torch.utils.data import DataLoader
 
 @hydra.main(config_path="config")
 def main(conf: OmegaConf):
     global config
     config = FFXIVPullDetectorTrainConfig(**conf)
-    label_json_path = Path(config.dataset_base_dir) / "annotations.json"
+    label_json_path = Path(config.dataset_base_dir) / config.annotations_file
     X_train, X_val = split_train_val_image_ids(label_json_path)
 
     image_dir = Path(config.dataset_base_dir) / "images"
 
-    train_dataset = PullDetectorDataset(X_train, image_dir, True)
-    val_dataset = PullDetectorDataset(X_val, image_dir, False)
+    global train_dataset
+    global val_dataset
 
-    global train_dataloader
-    global val_dataloader
-
-    train_dataloader = DataLoader(train_dataset, batch_size=config.batch_size, shuffle=True)
-    val_dataloader = DataLoader(val_dataset, batch_size=config.batch_size, shuffle=False)
+    train_dataset = PullDetectorDataset(X_train, image_dir, True, config.batch_augmentation, config.image_size)
+    val_dataset = PullDetectorDataset(X_val, image_dir, False, config.batch_augmentation, config.image_size)
 
 
     study = optuna.create_study(direction="maximize", storage="sqlite:///optuna.db")
@@ -48,16 +44,41 @@ def main(conf: OmegaConf):
         study.optimize(objective, n_trials=31, callbacks=[mlflc])
 
 
+# Loaders are reused across trials with the same batch size so persistent workers stay alive
+dataloaders = {}
+
+def get_dataloaders(batch_size):
+    if batch_size not in dataloaders:
+        dataloaders[batch_size] = (
+            build_dataloader(train_dataset, config, shuffle=True, batch_size=batch_size),
+            build_dataloader(val_dataset, config, shuffle=False, batch_size=batch_size),
+        )
+    return dataloaders[batch_size]
+
+
 def objective(trial):
-    batch_size = trial.suggest_categorical("batch_size", [1, 2, 4])
+    # Effective batch = micro-batch (config.batch_size at most, what fits in memory) * accumulation steps
+    effective_batch_size = trial.suggest_categorical("effective_batch_size", [4, 8, 16, 32, 64])
+    # Largest micro-batch up to config.batch_size that divides the effective batch, so
+    # batch_size * grad_accum_steps is exactly the suggested value (config.batch_size 24 and 64 -> 16 x 4, not 24 x 2)
+    batch_size = max(d for d in range(1, min(effective_batch_size, config.batch_size) + 1) if effective_batch_size % d == 0)
+    grad_accum_steps = effective_batch_size // batch_size
+    trial.set_user_attr("batch_size", batch_size)
+    trial.set_user_attr("grad_accum_steps", grad_accum_steps)
     lr = trial.suggest_float("lr", 1e-4, 1e-2)
-    logging.info(f"Batch size: {batch_size}, LR: {lr}, Model: efficientnet")
+    logging.info(f"Batch size: {batch_size} x {grad_accum_steps} steps, LR: {lr}, Model: efficientnet")
     eta_min = trial.suggest_float("eta_min", 1e-6, 1e-4)
-    experiment_config = config.copy()
-    experiment_config.batch_size = batch_size
-    experiment_config.lr = lr
-    experiment_config.eta_min = eta_min
-    experiment_config.num_epochs = 8
+    # Short trials run at image_size only, the resolution schedule is sized for the full num_epochs.
+    # model_copy skips validation, so validate the trial config again
+    experiment_config = FFXIVPullDetectorTrainConfig.model_validate(config.model_copy(update={
+        "batch_size": batch_size,
+        "grad_accum_steps": grad_accum_steps,
+        "lr": lr,
+        "eta_min": eta_min,
+        "num_epochs": 8,
+        "resolution_schedule": None,
+    }).model_dump())
+    train_dataloader, val_dataloader = get_dataloaders(batch_size)
     model, _ , _ = train(experiment_config, train_dataloader, val_dataloader)
     logging.info("Training completed")
 
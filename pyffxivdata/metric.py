@@ -1,26 +1,22 @@
 """Metrics for FFXIV pull detector."""
 
 import torch
-from typing import Dict, Any
+from typing import Dict, Any, Sequence
 from pyffxivdata.dataset import ChoiceLabels
 
 THRESHOLD = 0.5
+# Label of every logit column, in model output order
+LABEL_NAMES = ("pull_start", "pull_end")
 
 def calculate_accuracy_for_each_label(
-    y_pred_logits: torch.Tensor,  # (B,) or (B,1) logits for the positive class
-    y_true: torch.Tensor,         # (B,) or (B,1) in {0,1}
+    y_pred_logits: torch.Tensor,  # (B, num_labels) logits for the positive class
+    y_true: torch.Tensor,         # (B, num_labels) in {0,1}
     threshold: float = 0.5,       # probability threshold
+    label_names: Sequence[str] = LABEL_NAMES,  # one per column, e.g. ["pull_end"] for a single-label head
 ) -> Dict[str, Any]:
 
-    y_pred_logits = {
-        "pull_start": y_pred_logits[:, 0],
-        "pull_end": y_pred_logits[:, 1]
-    }
-
-    y_trues = {
-        "pull_start": y_true[:, 0],
-        "pull_end": y_true[:, 1]
-    }
+    y_pred_logits = {label: y_pred_logits[:, i] for i, label in enumerate(label_names)}
+    y_trues = {label: y_true[:, i] for i, label in enumerate(label_names)}
 
     accuracy_dict = {}
 
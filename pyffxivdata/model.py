@@ -10,6 +10,7 @@ python -m pyseraai.clothing_classification.train --config_dir train_config.yml -
 """
 import torch
 import torch.nn as nn
+from torch.utils.checkpoint import checkpoint
 from collections import OrderedDict
 from typing import Tuple
 from torchvision.models import efficientnet_v2_m, EfficientNet_V2_M_Weights
@@ -23,10 +24,12 @@ class FFXIVPullDetector(nn.Module):
     Category can have only one value out of the possible options, and the other labels can all have multiple labels, so their heads are splitted. 
     """
 
-    def __init__(self, device: str) -> None:
+    def __init__(self, device: str, gradient_checkpointing: bool = False) -> None:
         super().__init__()
 
         self.device = device
+        # Keep only the input of each backbone stage during training and recompute the stage in backward
+        self.gradient_checkpointing = gradient_checkpointing
 
         self.model = efficientnet_v2_m(weights=EfficientNet_V2_M_Weights.IMAGENET1K_V1)
         self.in_features = self.model.classifier[-1].in_features
@@ -59,4 +62,22 @@ class FFXIVPullDetector(nn.Module):
 
         Returns:
         """
-        return self.mlp(self.model(x))
\ No newline at end of file
+        return self.mlp(self.embed(x))
+
+    def embed(self, x: torch.Tensor) -> torch.Tensor:
+        """Backbone features before the classifier head.
+
+        Args:
+            x: (B, C, H, W)
+
+        Returns:
+            embeddings: (B, in_features)
+        """
+        if not (self.gradient_checkpointing and self.training and torch.is_grad_enabled()):
+            return self.model(x)
+
+        # Recomputation runs BatchNorm in train mode again, which updates running stats twice per step
+        # (same trade-off as other checkpointed CNNs, only the momentum is effectively doubled)
+        for stage in self.model.features:
+            x = checkpoint(stage, x, use_reentrant=False)
+        return self.model.classifier(torch.flatten(self.model.avgpool(x), 1))
\ No newline at end of file
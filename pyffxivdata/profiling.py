@@ -0,0 +1,174 @@
+"""Step-time breakdown and torch.profiler hooks for `train()`."""
+import sys
+import time
+import logging
+import torch
+import torch.nn as nn
+
+from pathlib import Path
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List
+from torch.profiler import ProfilerActivity, profile, record_function, schedule
+
+PHASES = ("data_wait", "forward", "backward", "optimizer", "eval")
+
+
+class StepTimer:
+    """Accumulates wall-clock seconds per training phase.
+
+    CUDA work is asynchronous, so the device is synchronized at phase boundaries to
+    attribute kernel time to the phase that launched it.
+    """
+
+    def __init__(self, device: str) -> None:
+        self.sync = device.startswith("cuda")
+        self.totals = {name: 0.0 for name in PHASES}
+
+    def reset(self) -> None:
+        self.totals = {name: 0.0 for name in PHASES}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.totals[name] += seconds
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if self.sync:
+            torch.cuda.synchronize()
+        start = time.perf_counter()
+        with record_function(name):
+            yield
+        if self.sync:
+            torch.cuda.synchronize()
+        self.totals[name] += time.perf_counter() - start
+
+    def as_metrics(self) -> Dict[str, float]:
+        """Per-phase seconds as metrics_history columns, plus the total compute time"""
+        metrics = {f"{name}_sec": value for name, value in self.totals.items()}
+        metrics["compute_sec"] = self.totals["forward"] + self.totals["backward"] + self.totals["optimizer"]
+        return metrics
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process since it started, in MB"""
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(
+            ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb
+        )
+        return counters.PeakWorkingSetSize / 2**20
+
+    import resource
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KB on Linux
+    return maxrss / 2**20 if sys.platform == "darwin" else maxrss / 2**10
+
+
+def peak_cuda_mb(device: str) -> float:
+    """Peak memory allocated by tensors on `device` since it started, 0 on CPU"""
+    if not device.startswith("cuda"):
+        return 0.0
+    return torch.cuda.max_memory_allocated(device) / 2**20
+
+
+@contextmanager
+def module_scopes(modules: Dict[str, nn.Module]) -> Iterator[None]:
+    """Wrap each module's forward in a `module::<name>` profiler scope for the per-module table"""
+    handles = []
+
+    for name, module in modules.items():
+        scopes: List[record_function] = []
+
+        def pre_hook(_module, _inputs, name=name, scopes=scopes):
+            scope = record_function(f"module::{name}")
+            scope.__enter__()
+            scopes.append(scope)
+
+        def post_hook(_module, _inputs, _output, scopes=scopes):
+            scopes.pop().__exit__(None, None, None)
+
+        handles.append(module.register_forward_pre_hook(pre_hook))
+        handles.append(module.register_forward_hook(post_hook))
+
+    try:
+        yield
+    finally:
+        for handle in handles:
+            handle.remove()
+
+
+def profiled_modules(model: nn.Module) -> Dict[str, nn.Module]:
+    """Backbone stages and classifier head of FFXIVPullDetector"""
+    modules = {f"features.{i}": stage for i, stage in enumerate(model.model.features)}
+    modules["mlp"] = model.mlp
+    return modules
+
+
+def _device_time(event) -> float:
+    return getattr(event, "device_time_total", getattr(event, "cuda_time_total", 0.0))
+
+
+def export_profile(prof: profile, output_dir: Path) -> None:
+    """Write a Chrome trace, a per-operator table and a per-module table to `output_dir`"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    prof.export_chrome_trace(str(output_dir / "trace.json"))
+
+    averages = prof.key_averages()
+    sort_by = "self_cuda_time_total" if any(_device_time(e) > 0 for e in averages) else "self_cpu_time_total"
+    with open(output_dir / "operators.txt", "w") as f:
+        f.write(averages.table(sort_by=sort_by, row_limit=50))
+
+    module_events = sorted(
+        (e for e in averages if e.key.startswith("module::") or e.key in PHASES),
+        key=lambda e: e.cpu_time_total,
+        reverse=True,
+    )
+    with open(output_dir / "modules.txt", "w") as f:
+        f.write(f"{'Name':<24}{'Calls':>8}{'CPU total (ms)':>18}{'Device total (ms)':>20}\n")
+        for e in module_events:
+            f.write(f"{e.key:<24}{e.count:>8}{e.cpu_time_total / 1000:>18.2f}{_device_time(e) / 1000:>20.2f}\n")
+
+    logging.info(f"Profiler output saved at: {output_dir}")
+
+
+def build_profiler(enabled: bool, device: str, output_dir: Path, wait: int, warmup: int, active: int):
+    """torch.profiler over one window of training steps, or a no-op context when disabled.
+
+    Call `.step()` on the returned object after every training step.
+    """
+    if not enabled:
+        return nullcontext(_NoOpProfiler())
+
+    activities = [ProfilerActivity.CPU]
+    if device.startswith("cuda"):
+        activities.append(ProfilerActivity.CUDA)
+
+    return profile(
+        activities=activities,
+        schedule=schedule(wait=wait, warmup=warmup, active=active, repeat=1),
+        on_trace_ready=lambda prof: export_profile(prof, output_dir),
+        record_shapes=True,
+        profile_memory=True,
+    )
+
+
+class _NoOpProfiler:
+    def step(self) -> None:
+        pass
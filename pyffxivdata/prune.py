@@ -0,0 +1,333 @@
+"""Structured pruning of the FFXIVPullDetector backbone.
+
+Removes whole expansion channels inside every MBConv / FusedMBConv block and whole residual blocks,
+so the pruned network is physically smaller (no masks) and exports to a smaller ONNX graph.
+
+- Channels: ranked by |gamma| of the BatchNorm that scales them (depthwise BN for MBConv, expand BN
+  for FusedMBConv). Only the expanded width changes, block inputs/outputs and residuals keep their shape.
+- Blocks: only residual blocks can go (the identity path remains), ranked by the mean |gamma| of the
+  projection BN relative to the other residual blocks of the stage.
+
+Every level prunes until the backbone MACs are at or below `target * baseline MACs`, fine-tunes with
+`train()`, exports ONNX and measures ONNX Runtime latency. Levels build on the previous fine-tuned model,
+and with `--latency_budget_ms` pruning stops at the first level that meets the budget.
+
+run ex) in flyxiv_observer_v1 base directory,
+
+```sh
+python -m pyffxivdata.prune --config_path pyffxivdata/config/train_config.yml --checkpoint saved_models/best_model.pth --mac_targets 0.75 0.5 0.35 --finetune_epochs 5 --output_dir saved_models/pruned
+```
+"""
+import time
+import argparse
+import statistics
+import logging
+import torch
+import torch.nn as nn
+import pandas as pd
+
+from pathlib import Path
+from typing import Dict, List, Tuple
+from torchvision.ops.misc import Conv2dNormActivation, SqueezeExcitation
+from pyffxivdata.dataset import PullDetectorDataset
+from pyffxivdata.model import FFXIVPullDetector
+from pyffxivdata.train import FFXIVPullDetectorTrainConfig, build_dataloader, evaluate_val_metrics, split_train_val_image_ids, train
+
+# Fraction of the remaining expansion channels removed from every block per pruning iteration
+CHANNEL_STEP = 0.1
+# Never prune a block below this fraction of its original expansion width, or below MIN_CHANNELS
+MIN_CHANNEL_RATIO = 0.25
+MIN_CHANNELS = 8
+# Residual blocks kept per stage
+MIN_RESIDUAL_BLOCKS = 1
+
+
+def count_macs(model: nn.Module, image_size: int) -> int:
+    """Multiply-accumulates of one (1, 3, image_size, image_size) forward over Conv2d and Linear layers"""
+    macs = 0
+
+    def conv_hook(module, _inputs, output):
+        nonlocal macs
+        kernel = module.kernel_size[0] * module.kernel_size[1]
+        macs += output.numel() * (module.in_channels // module.groups) * kernel
+
+    def linear_hook(module, _inputs, output):
+        nonlocal macs
+        macs += output.numel() * module.in_features
+
+    handles = []
+    for module in model.modules():
+        if isinstance(module, nn.Conv2d):
+            handles.append(module.register_forward_hook(conv_hook))
+        elif isinstance(module, nn.Linear):
+            handles.append(module.register_forward_hook(linear_hook))
+
+    device = next(model.parameters()).device
+    was_training = model.training
+    model.eval()
+    try:
+        with torch.no_grad():
+            model(torch.zeros(1, 3, image_size, image_size, device=device))
+    finally:
+        for handle in handles:
+            handle.remove()
+        model.train(was_training)
+
+    return macs
+
+
+def count_params(model: nn.Module) -> int:
+    return sum(p.numel() for p in model.parameters())
+
+
+def _slice_conv(conv: nn.Conv2d, keep: torch.Tensor, dim: int) -> None:
+    """Keep output (dim=0) or input (dim=1) channels `keep` of `conv` in place"""
+    conv.weight = nn.Parameter(conv.weight.data.index_select(dim, keep).clone())
+    if dim == 0:
+        if conv.bias is not None:
+            conv.bias = nn.Parameter(conv.bias.data[keep].clone())
+        conv.out_channels = len(keep)
+        # Depthwise: one input channel per output channel
+        if conv.groups > 1:
+            conv.in_channels = len(keep)
+            conv.groups = len(keep)
+    else:
+        conv.in_channels = len(keep)
+
+
+def _slice_bn(bn: nn.BatchNorm2d, keep: torch.Tensor) -> None:
+    bn.weight = nn.Parameter(bn.weight.data[keep].clone())
+    bn.bias = nn.Parameter(bn.bias.data[keep].clone())
+    bn.running_mean = bn.running_mean[keep].clone()
+    bn.running_var = bn.running_var[keep].clone()
+    bn.num_features = len(keep)
+
+
+def expansion_layers(block: nn.Module) -> Tuple[List[nn.Module], nn.Module] | None:
+    """(layers producing the expanded channels, projection layer) of an MBConv / FusedMBConv block,
+    None when the block has no expansion (FusedMBConv with expand_ratio 1)"""
+    layers = list(block.block)
+    if len(layers) < 2:
+        return None
+    return layers[:-1], layers[-1]
+
+
+def channel_scores(block: nn.Module) -> torch.Tensor:
+    """|gamma| of the last BatchNorm before the projection, one score per expansion channel"""
+    expanding, _ = expansion_layers(block)
+    norms = [layer[1] for layer in expanding if isinstance(layer, Conv2dNormActivation)]
+    return norms[-1].weight.detach().abs()
+
+
+def prune_block_channels(block: nn.Module, keep: torch.Tensor) -> None:
+    """Physically remove all expansion channels of `block` not in `keep`"""
+    keep = keep.sort().values
+    expanding, project = expansion_layers(block)
+
+    for layer in expanding:
+        if isinstance(layer, Conv2dNormActivation):
+            _slice_conv(layer[0], keep, dim=0)
+            _slice_bn(layer[1], keep)
+        elif isinstance(layer, SqueezeExcitation):
+            _slice_conv(layer.fc1, keep, dim=1)
+            _slice_conv(layer.fc2, keep, dim=0)
+
+    _slice_conv(project[0], keep, dim=1)
+
+
+def backbone_blocks(model: FFXIVPullDetector) -> List[Tuple[int, int, nn.Module]]:
+    """(stage index, block index, block) of every MBConv / FusedMBConv still in the backbone"""
+    blocks = []
+    for stage_idx, stage in enumerate(model.model.features):
+        if not isinstance(stage, nn.Sequential) or isinstance(stage, Conv2dNormActivation):
+            continue
+        for block_idx, block in enumerate(stage):
+            if hasattr(block, "block"):
+                blocks.append((stage_idx, block_idx, block))
+    return blocks
+
+
+def expansion_widths(model: FFXIVPullDetector) -> Dict[str, int]:
+    """Expansion width of every block by module name (`features.5.3`), taken once from the unpruned model"""
+    return {
+        f"features.{stage_idx}.{block_idx}": len(channel_scores(block))
+        for stage_idx, block_idx, block in backbone_blocks(model)
+        if expansion_layers(block) is not None
+    }
+
+
+def prune_channels_step(model: FFXIVPullDetector, original_widths: Dict[str, int], step: float = CHANNEL_STEP) -> int:
+    """Remove the lowest-|gamma| `step` fraction of expansion channels from every block, returns channels removed"""
+    removed = 0
+    for stage_idx, block_idx, block in backbone_blocks(model):
+        if expansion_layers(block) is None:
+            continue
+
+        scores = channel_scores(block)
+        floor = max(MIN_CHANNELS, int(original_widths[f"features.{stage_idx}.{block_idx}"] * MIN_CHANNEL_RATIO))
+        num_keep = max(floor, int(len(scores) * (1 - step)))
+        if num_keep >= len(scores):
+            continue
+
+        prune_block_channels(block, scores.topk(num_keep).indices)
+        removed += len(scores) - num_keep
+    return removed
+
+
+def remove_weakest_block(model: FFXIVPullDetector) -> str | None:
+    """Replace the least important residual block with an identity, returns its name"""
+    candidates = []
+    for stage_idx, stage in enumerate(model.model.features):
+        residual = [
+            (block_idx, block) for block_idx, block in enumerate(stage)
+            if getattr(block, "use_res_connect", False)
+        ] if isinstance(stage, nn.Sequential) else []
+        if len(residual) <= MIN_RESIDUAL_BLOCKS:
+            continue
+
+        scores = {block_idx: block.block[-1][1].weight.detach().abs().mean().item() for block_idx, block in residual}
+        stage_mean = statistics.mean(scores.values())
+        for block_idx, score in scores.items():
+            candidates.append((score / stage_mean, stage_idx, block_idx))
+
+    if not candidates:
+        return None
+
+    _, stage_idx, block_idx = min(candidates)
+    model.model.features[stage_idx][block_idx] = nn.Identity()
+    return f"features.{stage_idx}.{block_idx}"
+
+
+def prune_to_budget(model: FFXIVPullDetector, target_macs: int, image_size: int, original_widths: Dict[str, int],
+                    prune_blocks: bool = True) -> List[str]:
+    """Alternate channel and block pruning until the model is at or below `target_macs`
+
+    `original_widths` comes from `expansion_widths` of the unpruned model, so MIN_CHANNEL_RATIO stays relative
+    to the original width across levels instead of compounding.
+
+    Returns:
+        names of the removed blocks
+    """
+    removed_blocks = []
+
+    macs = count_macs(model, image_size)
+    while macs > target_macs:
+        removed = prune_channels_step(model, original_widths)
+        if prune_blocks and (name := remove_weakest_block(model)) is not None:
+            removed_blocks.append(name)
+        elif removed == 0:
+            logging.warning(f"Cannot prune further, stopped at {macs / 1e9:.2f} GMACs (target {target_macs / 1e9:.2f})")
+            break
+        macs = count_macs(model, image_size)
+
+    return removed_blocks
+
+
+def onnx_latency_ms(onnx_path: Path, image_size: int, repeat: int = 20) -> float:
+    """Median ONNX Runtime latency of one frame, same session settings as the live detector"""
+    import numpy as np
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = 1
+    session = ort.InferenceSession(str(onnx_path), sess_options=options, providers=["CPUExecutionProvider"])
+    input_name = session.get_inputs()[0].name
+    x = np.random.default_rng(0).standard_normal((1, 3, image_size, image_size), dtype=np.float32)
+
+    session.run(None, {input_name: x})
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        session.run(None, {input_name: x})
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def export_onnx(model: FFXIVPullDetector, onnx_path: Path, image_size: int) -> None:
+    model = model.to("cpu").eval()
+    torch.onnx.export(model, torch.randn(1, 3, image_size, image_size), dynamo=True).save(str(onnx_path))
+
+
+def load_model(checkpoint: str, device: str) -> FFXIVPullDetector:
+    model = FFXIVPullDetector(device)
+    state = torch.load(checkpoint, map_location=device)
+    model.load_state_dict({k.replace("module.", ""): v for k, v in state.items()}, strict=True)
+    return model
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config_path", type=str, required=True)
+    parser.add_argument("--checkpoint", type=str, required=True)
+    parser.add_argument("--mac_targets", type=float, nargs="+", default=[0.75, 0.5, 0.35], help="fractions of the unpruned MACs")
+    parser.add_argument("--finetune_epochs", type=int, default=5)
+    parser.add_argument("--latency_budget_ms", type=float, default=None, help="stop at the first level whose ONNX latency is within budget")
+    parser.add_argument("--no_block_pruning", action="store_true")
+    parser.add_argument("--output_dir", type=str, required=True)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    config = FFXIVPullDetectorTrainConfig.load_from_config_yaml(args.config_path)
+    # Fine-tuning runs at the deployment resolution with a fresh cosine schedule per level
+    config = config.model_copy(update={"num_epochs": args.finetune_epochs, "resolution_schedule": None})
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    X_train, X_val = split_train_val_image_ids(Path(config.dataset_base_dir) / config.annotations_file)
+    image_dir = Path(config.dataset_base_dir) / "images"
+    train_dataloader = build_dataloader(PullDetectorDataset(X_train, image_dir, True, config.batch_augmentation, config.image_size), config, shuffle=True)
+    val_dataloader = build_dataloader(PullDetectorDataset(X_val, image_dir, False, config.batch_augmentation, config.image_size), config, shuffle=False)
+
+    label_idx = {"pull_start_detector": 1, "pull_end_detector": 2}.get(config.model_name, [1, 2])
+    model = load_model(args.checkpoint, config.device)
+    baseline_macs = count_macs(model, config.image_size)
+    original_widths = expansion_widths(model)
+
+    report = []
+    removed_blocks = []
+    for target in [1.0] + sorted(args.mac_targets, reverse=True):
+        level_dir = output_dir / f"macs_{int(target * 100)}"
+        level_dir.mkdir(parents=True, exist_ok=True)
+
+        if target < 1.0:
+            removed_blocks += prune_to_budget(model, int(baseline_macs * target), config.image_size, original_widths, not args.no_block_pruning)
+            level_config = config.model_copy(update={"save_dir": str(level_dir)})
+            model, _, _ = train(level_config, train_dataloader, val_dataloader, model=model)
+            # train() returns the last epoch, keep the best one (saved only if the score ever improved)
+            if (level_dir / "best_model.pth").exists():
+                model.load_state_dict(torch.load(level_dir / "best_model.pth", map_location=config.device))
+
+        model.eval()
+        accuracy_dict = {}
+        score = evaluate_val_metrics(model, val_dataloader, config.device, accuracy_dict, label_idx=label_idx)
+        counts = accuracy_dict.values()
+        accuracy = statistics.mean((c["true_positive"] + c["true_negative"]) / sum(c.values()) for c in counts)
+
+        onnx_path = level_dir / "pull_detector.onnx"
+        export_onnx(model, onnx_path, config.image_size)
+        # The whole module, the pruned architecture cannot be rebuilt from a state dict alone
+        torch.save(model, level_dir / "pruned_model.pt")
+
+        macs = count_macs(model, config.image_size)
+        report.append({
+            "level": level_dir.name,
+            "gmacs": macs / 1e9,
+            "macs_ratio": macs / baseline_macs,
+            "params_m": count_params(model) / 1e6,
+            "removed_blocks": len(removed_blocks),
+            "latency_ms": onnx_latency_ms(onnx_path, config.image_size),
+            "accuracy": accuracy,
+            "score": float(score),
+        })
+        print(report[-1])
+        model.to(config.device)
+
+        if args.latency_budget_ms is not None and report[-1]["latency_ms"] <= args.latency_budget_ms:
+            print(f"{level_dir.name} is within the {args.latency_budget_ms}ms latency budget")
+            break
+
+    report = pd.DataFrame(report)
+    report.to_csv(output_dir / "prune_report.csv", index=False)
+    print(report.to_string(index=False, float_format=lambda value: f"{value:.3f}"))
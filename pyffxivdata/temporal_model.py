@@ -0,0 +1,408 @@
+"""Temporal head over per-frame FFXIVPullDetector embeddings.
+
+The frame classifier judges every frame independently, so pull boundaries flicker and frames
+have to be sampled densely. This module trains a small GRU on sequences of cached backbone
+embeddings of consecutive frames of the same recording, and exposes a streaming API that keeps
+the GRU state between frames.
+
+After training, the head and the per-frame classifier are compared on the validation part of every
+recording at reduced sample rates (every 1st, 2nd, 4th, ... frame), which is what decides whether
+frames can be sampled more sparsely with the head.
+
+run ex) in flyxiv_observer_v1 base directory,
+
+```sh
+python -m pyffxivdata.temporal_model --config-name temporal_head_config
+```
+"""
+import json
+import logging
+import os
+import random
+import re
+import torch
+import hydra
+import torch.nn as nn
+
+from omegaconf import OmegaConf
+from tqdm import tqdm
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+from pydantic import BaseModel
+from torch.utils.data import Dataset, DataLoader
+from pyffxivdata.dataset import PullDetectorDataset
+from pyffxivdata.model import FFXIVPullDetector
+from pyffxivdata.metric import LABEL_NAMES, calculate_accuracy_for_each_label
+
+# Label Studio prefixes uploaded files with a random id, e.g. "1a2b3c4d-20250101_120000_000123.png"
+LABEL_STUDIO_PREFIX = re.compile(r"^[0-9a-f]{8}-")
+# Trailing frame number of extracted frames, e.g. "a_20250101_120000_0000123.jpg"
+FRAME_NUMBER_SUFFIX = re.compile(r"_\d+$")
+
+
+class TemporalHeadTrainConfig(BaseModel):
+    lr: float
+    batch_size: int
+    num_epochs: int
+
+    seq_len: int = 32
+    # Training windows are subsampled with a random stride up to this value,
+    # so the head stays accurate when frames are sampled sparsely at inference.
+    max_frame_stride: int = 4
+    # Validation windows use one fixed stride so scores are comparable between epochs
+    val_frame_stride: int = 1
+    # Last fraction of every recording used for validation
+    val_ratio: float = 0.1
+    hidden_size: int = 128
+
+    device: str = "cuda" if torch.cuda.is_available() else "cpu"
+    save_dir: str | None = None
+    model_name: str
+    dataset_base_dir: str
+    backbone_checkpoint: str
+    embedding_cache_path: str | None = None
+
+
+def frame_sort_key(image_name: str) -> str:
+    """Sort key that orders frames by their original (capture time based) file name"""
+    return LABEL_STUDIO_PREFIX.sub("", Path(image_name).name)
+
+
+def recording_key(image_name: str) -> str:
+    """Recording a frame was extracted from, `1a2b3c4d-a_20250101_120000_0000123.jpg` -> `a_20250101_120000`"""
+    return FRAME_NUMBER_SUFFIX.sub("", Path(frame_sort_key(image_name)).stem)
+
+
+def split_recordings(image_names: List[str]) -> List[List[int]]:
+    """Cache indices grouped by recording, in capture order within every recording"""
+    recordings = {}
+    for idx, image_name in enumerate(image_names):
+        recordings.setdefault(recording_key(image_name), []).append(idx)
+    return list(recordings.values())
+
+
+def head_label_names(label_idx: int | List[int]) -> List[str]:
+    """Metric label of every head output, label columns 1 and 2 are pull_start and pull_end"""
+    return [LABEL_NAMES[idx - 1] for idx in ([label_idx] if isinstance(label_idx, int) else label_idx)]
+
+
+def get_label_idx(model_name: str) -> int | List[int]:
+    if model_name == "pull_start_detector":
+        return 1
+    elif model_name == "pull_end_detector":
+        return 2
+    elif model_name == "pull_detector":
+        return [1, 2]
+    else:
+        raise ValueError(f"Invalid model name: {model_name}")
+
+
+@torch.no_grad()
+def cache_backbone_embeddings(model: FFXIVPullDetector, dataset: PullDetectorDataset, batch_size: int, device: str) -> Dict[str, Any]:
+    """Run the frozen backbone once over every frame, in capture order.
+
+    Returns:
+        image_names: List[str] (N)
+        embeddings: (N, in_features)
+        frame_logits: (N, 2) per-frame classifier output, the baseline for the temporal head
+        labels: (N, 3)
+    """
+    dataset.data_info = sorted(dataset.data_info, key=lambda item: frame_sort_key(item["file_upload"]))
+    dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=False)
+
+    model.eval()
+    image_names, embeddings, frame_logits, labels = [], [], [], []
+    for batch in tqdm(dataloader, desc="Caching embeddings", total=len(dataloader)):
+        embedding = model.embed(batch["image"].to(device))
+        embeddings.append(embedding.cpu())
+        frame_logits.append(model.mlp(embedding).cpu())
+        labels.append(batch["label"])
+        image_names.extend(batch["image_name"])
+
+    return {
+        "image_names": image_names,
+        "embeddings": torch.cat(embeddings),
+        "frame_logits": torch.cat(frame_logits),
+        "labels": torch.cat(labels),
+    }
+
+
+def select_labels(labels: torch.Tensor, label_idx: int | List[int]) -> torch.Tensor:
+    labels = labels[:, label_idx]
+    return labels.unsqueeze(1) if labels.dim() == 1 else labels
+
+
+class EmbeddingSequenceDataset(Dataset):
+    """Windows of consecutive cached embeddings within one recording.
+
+    Each item is `seq_len` frames of the same recording taken with a stride sampled from
+    [1, max_frame_stride], or with `frame_stride` when it is set (validation).
+    """
+
+    def __init__(self, embeddings: torch.Tensor, labels: torch.Tensor, recordings: List[List[int]], seq_len: int,
+                 max_frame_stride: int, label_idx: int | List[int], frame_stride: int | None = None) -> None:
+        self.embeddings = embeddings
+        self.labels = select_labels(labels, label_idx)
+        self.recordings = recordings
+        self.seq_len = seq_len
+        self.max_frame_stride = max_frame_stride
+        self.frame_stride = frame_stride
+
+        # (recording, window start) of every window that fits in its recording
+        min_span = (frame_stride or 1) * (seq_len - 1) + 1
+        self.windows = [
+            (recording_idx, start)
+            for recording_idx, indices in enumerate(recordings)
+            for start in range(len(indices) - min_span + 1)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.windows)
+
+    def __getitem__(self, idx: int) -> Dict[str, Any]:
+        """Output embedding sequence and label sequence.
+
+        embeddings: (T, in_features)
+        label: (T, num_labels)
+        """
+        recording_idx, start = self.windows[idx]
+        recording = self.recordings[recording_idx]
+
+        if self.frame_stride is not None:
+            stride = self.frame_stride
+        else:
+            max_stride = max(1, min(self.max_frame_stride, (len(recording) - 1 - start) // max(1, self.seq_len - 1)))
+            stride = random.randint(1, max_stride)
+        indices = torch.tensor(recording[start:start + stride * self.seq_len:stride])
+
+        return {
+            "embeddings": self.embeddings[indices],
+            "label": self.labels[indices].float(),
+        }
+
+
+class PullTemporalHead(nn.Module):
+    """GRU over backbone embeddings of consecutive frames."""
+
+    def __init__(self, in_features: int, hidden_size: int = 128, num_outputs: int = 2, dropout: float = 0.1) -> None:
+        super().__init__()
+
+        self.proj = nn.Sequential(
+            nn.LayerNorm(in_features),
+            nn.Dropout(dropout),
+            nn.Linear(in_features, hidden_size),
+            nn.GELU(),
+        )
+        self.gru = nn.GRU(hidden_size, hidden_size, batch_first=True)
+        self.output = nn.Linear(hidden_size, num_outputs)
+
+    def forward(self, embeddings: torch.Tensor, hidden: torch.Tensor | None = None) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Forward pass of the temporal head.
+
+        Args:
+            embeddings: (B, T, in_features)
+            hidden: (1, B, hidden_size) GRU state carried over from previous frames
+
+        Returns:
+            logits: (B, T, num_outputs)
+            hidden: (1, B, hidden_size)
+        """
+        x, hidden = self.gru(self.proj(embeddings), hidden)
+        return self.output(x), hidden
+
+
+class StreamingPullDetector:
+    """Frame-by-frame inference that keeps the temporal head's running state.
+
+    Call `reset()` whenever a new video starts.
+
+    PyTorch only: the ONNX model used by the live detector (`scripts/convert_pth_to_onnx.py`) outputs the
+    per-frame logits, not the embeddings the head needs. Use `sample_rate_report` to decide whether the head
+    is worth a second export before wiring it into the live path.
+    """
+
+    def __init__(self, backbone: FFXIVPullDetector, head: PullTemporalHead, device: str) -> None:
+        self.backbone = backbone.eval()
+        self.head = head.to(device).eval()
+        self.device = device
+        self.hidden = None
+
+    def reset(self) -> None:
+        self.hidden = None
+
+    @torch.no_grad()
+    def step_embedding(self, embedding: torch.Tensor) -> torch.Tensor:
+        """embedding: (in_features) -> logits: (num_outputs)"""
+        logits, self.hidden = self.head(embedding.view(1, 1, -1).to(self.device), self.hidden)
+        return logits[0, -1]
+
+    @torch.no_grad()
+    def step(self, image: torch.Tensor) -> torch.Tensor:
+        """image: (C, H, W) normalized like VALID_TRANSFORM -> logits: (num_outputs)"""
+        embedding = self.backbone.embed(image.unsqueeze(0).to(self.device))
+        return self.step_embedding(embedding[0])
+
+
+def evaluate_temporal_head(head: PullTemporalHead, val_dataloader: DataLoader, device: str, label_names: List[str] = LABEL_NAMES) -> float:
+    accuracy_dict = {}
+    head.eval()
+
+    for batch in val_dataloader:
+        with torch.no_grad():
+            logits, _ = head(batch["embeddings"].to(device))
+            label_batch = batch["label"].to(device)
+            accuracy_batch = calculate_accuracy_for_each_label(logits.flatten(0, 1), label_batch.flatten(0, 1), label_names=label_names)
+
+        for label, value in accuracy_batch.items():
+            totals = accuracy_dict.setdefault(label, {k: 0 for k in value})
+            for k, v in value.items():
+                totals[k] += v
+
+    score = 0
+    for label, value in accuracy_dict.items():
+        total = sum(value.values())
+        accuracy = (value['true_positive'] + value['true_negative']) / total if total > 0 else 0
+        precision = value['true_positive'] / (value['true_positive'] + value['false_positive']) if (value['true_positive'] + value['false_positive']) > 0 else 0
+        recall = value['true_positive'] / (value['true_positive'] + value['false_negative']) if (value['true_positive'] + value['false_negative']) > 0 else 0
+        print(f"{label} Accuracy: {accuracy} Precision: {precision} Recall: {recall}")
+        score += (accuracy + precision + recall)
+
+    head.train()
+    return score
+
+
+def split_train_val_recordings(recordings: List[List[int]], val_ratio: float) -> Tuple[List[List[int]], List[List[int]]]:
+    """The last `val_ratio` of every recording is validation, so windows never overlap the training frames"""
+    train_recordings, val_recordings = [], []
+    for indices in recordings:
+        split = int(len(indices) * (1 - val_ratio))
+        train_recordings.append(indices[:split])
+        val_recordings.append(indices[split:])
+    return train_recordings, val_recordings
+
+
+def accuracy_by_label(accuracy_dict: Dict[str, Dict[str, int]]) -> Dict[str, float]:
+    return {
+        label: (value["true_positive"] + value["true_negative"]) / max(1, sum(value.values()))
+        for label, value in accuracy_dict.items()
+    }
+
+
+@torch.no_grad()
+def sample_rate_report(head: PullTemporalHead, cache: Dict[str, Any], val_recordings: List[List[int]],
+                       label_idx: int | List[int], strides: List[int], device: str) -> List[Dict[str, Any]]:
+    """Accuracy of the temporal head and of the per-frame classifier when only every `stride`-th frame is sampled.
+
+    The head runs over every validation recording as one stream (state carried across frames like
+    StreamingPullDetector), the per-frame classifier scores the same frames independently.
+    """
+    labels = select_labels(cache["labels"], label_idx).float()
+    label_names = head_label_names(label_idx)
+    # Classifier outputs are (pull_start, pull_end), label columns 1 and 2
+    frame_logits = cache["frame_logits"][:, [LABEL_NAMES.index(label) for label in label_names]]
+
+    head.eval()
+    report = []
+    for stride in strides:
+        head_logits, baseline_logits, targets = [], [], []
+        for recording in val_recordings:
+            indices = torch.tensor(recording[::stride])
+            if len(indices) == 0:
+                continue
+            logits, _ = head(cache["embeddings"][indices].unsqueeze(0).to(device))
+            head_logits.append(logits[0].cpu())
+            baseline_logits.append(frame_logits[indices])
+            targets.append(labels[indices])
+
+        if not targets:
+            continue
+        targets = torch.cat(targets)
+        head_accuracy = accuracy_by_label(calculate_accuracy_for_each_label(torch.cat(head_logits), targets, label_names=label_names))
+        frame_accuracy = accuracy_by_label(calculate_accuracy_for_each_label(torch.cat(baseline_logits), targets, label_names=label_names))
+        for label in head_accuracy:
+            report.append({
+                "stride": stride,
+                "label": label,
+                "frames": len(targets),
+                "head_accuracy": head_accuracy[label],
+                "frame_accuracy": frame_accuracy[label],
+            })
+            print(f"stride {stride} | {label} | head: {head_accuracy[label]:.4f} | per-frame: {frame_accuracy[label]:.4f}")
+    head.train()
+    return report
+
+
+def train_temporal_head(config: TemporalHeadTrainConfig, cache: Dict[str, Any]) -> Tuple[PullTemporalHead, float]:
+    label_idx = get_label_idx(config.model_name)
+    num_outputs = len(label_idx) if isinstance(label_idx, list) else 1
+
+    train_recordings, val_recordings = split_train_val_recordings(split_recordings(cache["image_names"]), config.val_ratio)
+    train_dataset = EmbeddingSequenceDataset(cache["embeddings"], cache["labels"], train_recordings, config.seq_len, config.max_frame_stride, label_idx)
+    val_dataset = EmbeddingSequenceDataset(cache["embeddings"], cache["labels"], val_recordings, config.seq_len, config.max_frame_stride, label_idx, config.val_frame_stride)
+    train_dataloader = DataLoader(train_dataset, batch_size=config.batch_size, shuffle=True)
+    val_dataloader = DataLoader(val_dataset, batch_size=config.batch_size, shuffle=False)
+
+    head = PullTemporalHead(cache["embeddings"].shape[1], config.hidden_size, num_outputs).to(config.device)
+    optimizer = torch.optim.AdamW(head.parameters(), lr=config.lr)
+    criterion = nn.BCEWithLogitsLoss()
+
+    logging.info(f"Temporal head config: {config.model_dump_json()}")
+    best_score = 0
+
+    for epoch in range(config.num_epochs):
+        logging.info(f"Epoch {epoch}:")
+        for batch in tqdm(train_dataloader, desc="Training", total=len(train_dataloader)):
+            logits, _ = head(batch["embeddings"].to(config.device))
+            loss = criterion(logits, batch["label"].to(config.device))
+
+            optimizer.zero_grad(set_to_none=True)
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(head.parameters(), max_norm=1.0)
+            optimizer.step()
+
+        score = evaluate_temporal_head(head, val_dataloader, config.device, head_label_names(label_idx))
+        print(f"Epoch {epoch} | Loss: {loss.item():.4f} | Score: {score}")
+
+        if config.save_dir and score > best_score:
+            best_score = score
+            torch.save(head.state_dict(), Path(config.save_dir) / "best_temporal_head.pth")
+
+    if config.save_dir and (Path(config.save_dir) / "best_temporal_head.pth").exists():
+        head.load_state_dict(torch.load(Path(config.save_dir) / "best_temporal_head.pth", map_location=config.device))
+    # Up to twice the strides seen in training, to see how far the head holds up beyond them
+    strides = [stride for stride in (1, 2, 4, 8, 16) if stride <= config.max_frame_stride * 2]
+    report = sample_rate_report(head, cache, val_recordings, label_idx, strides, config.device)
+    if config.save_dir:
+        with open(Path(config.save_dir) / "temporal_head_sample_rate_report.json", "w") as f:
+            json.dump(report, f, indent=2)
+
+    return head, best_score
+
+
+@hydra.main(config_path="config")
+def main(config: OmegaConf):
+    config = TemporalHeadTrainConfig(**config)
+    if config.save_dir:
+        os.makedirs(config.save_dir, exist_ok=True)
+
+    cache_path = Path(config.embedding_cache_path or Path(config.dataset_base_dir) / "embeddings.pt")
+
+    cache = torch.load(cache_path) if cache_path.exists() else None
+    # Caches written before the per-frame baseline was stored are rebuilt
+    if cache is None or "frame_logits" not in cache:
+        with open(Path(config.dataset_base_dir) / "annotations.json", "r") as f:
+            data_info = json.load(f)
+
+        backbone = FFXIVPullDetector(config.device)
+        state = torch.load(config.backbone_checkpoint, map_location=config.device)
+        backbone.load_state_dict({k.replace("module.", ""): v for k, v in state.items()}, strict=True)
+
+        dataset = PullDetectorDataset(data_info, Path(config.dataset_base_dir) / "images", False)
+        cache = cache_backbone_embeddings(backbone, dataset, config.batch_size, config.device)
+        torch.save(cache, cache_path)
+
+    train_temporal_head(config, cache)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 import os
+import math
+import time
 import torch
 import yaml
 import argparse
@@ -12,17 +14,28 @@ import torch.nn as nn
 from omegaconf import OmegaConf
 from tqdm import tqdm
 from pathlib import Path
+from contextlib import nullcontext
 from typing import List, Tuple
-from pydantic import BaseModel
-from torch.utils.data import DataLoader
-from sklearn.model_selection import train_test_split
+from pydantic import BaseModel, model_validator
+from torch.utils.data import DataLoader, WeightedRandomSampler
+from sklearn.model_selection import GroupShuffleSplit, train_test_split
 from pyffxivdata.dataset import PullDetectorDataset
+from pyffxivdata.augmentation import BatchAugmentation, normalize_batch
+from pyffxivdata.profiling import StepTimer, build_profiler, module_scopes, peak_cuda_mb, peak_rss_mb, profiled_modules
 from pyffxivdata.model import FFXIVPullDetector
 from pyffxivdata.loss import ff_pull_detector_loss
 from pyffxivdata.metric import calculate_accuracy_for_each_label
 from mlflow.models import infer_signature
 
 
+class ResolutionPhase(BaseModel):
+    """`epochs` epochs at `image_size`. Without `batch_size` the batch grows with the pixel count saved
+    against the deployment resolution, so a step costs about the same at every phase."""
+    image_size: int
+    epochs: int
+    batch_size: int | None = None
+
+
 class FFXIVPullDetectorTrainConfig(BaseModel):
     lr: float
     batch_size: int
@@ -36,6 +49,67 @@ class FFXIVPullDetectorTrainConfig(BaseModel):
     mlflow_host: str
     mlflow_port: int
 
+    # Annotation manifest under dataset_base_dir. Use the output of `python -m pyffxivdata.dedup`
+    # (annotations.dedup.json / annotations.weighted.json) to train on near-duplicate clusters.
+    annotations_file: str = "annotations.json"
+    # With a weighted manifest, draw training samples with weight 1 / cluster_size so an epoch
+    # covers about one sample per near-duplicate cluster
+    weighted_sampling: bool = False
+
+    # Deployment resolution (ONNX export and live detection), used for validation and the last training phase
+    image_size: int = 384
+    # Progressive resizing, e.g. 224 -> 320 -> 384. Epochs of all phases must add up to num_epochs
+    # and the last phase must be at image_size. None trains every epoch at image_size.
+    resolution_schedule: List[ResolutionPhase] | None = None
+
+    # Memory savers for large effective batches (batch_size * grad_accum_steps) on small machines:
+    # recompute backbone stage activations in backward, and step the optimizer every grad_accum_steps micro-batches
+    gradient_checkpointing: bool = False
+    grad_accum_steps: int = 1
+
+    # Input pipeline. With num_workers > 0, decoding and augmentation run in worker processes
+    # and batches are collated straight into shared memory.
+    num_workers: int = 0
+    persistent_workers: bool = False
+    prefetch_factor: int | None = None
+    pin_memory: bool = False
+
+    # Augment whole uint8 batches with tensor ops after collation instead of per-image PIL transforms
+    batch_augmentation: bool = False
+    augmentation_seed: int | None = None
+
+    # Profile one window of training steps with torch.profiler (Chrome trace + operator/module tables)
+    profile: bool = False
+    profile_wait_steps: int = 2
+    profile_warmup_steps: int = 2
+    profile_active_steps: int = 5
+    profile_dir: str | None = None
+
+    @model_validator(mode="after")
+    def check_schedules(self) -> "FFXIVPullDetectorTrainConfig":
+        if self.grad_accum_steps < 1:
+            raise ValueError("grad_accum_steps must be at least 1")
+        if self.resolution_schedule:
+            if sum(phase.epochs for phase in self.resolution_schedule) != self.num_epochs:
+                raise ValueError("epochs of resolution_schedule must add up to num_epochs")
+            if self.resolution_schedule[-1].image_size != self.image_size:
+                raise ValueError("the last phase of resolution_schedule must be at image_size")
+        return self
+
+    def resolution_phases(self) -> List[ResolutionPhase]:
+        """Schedule with every batch size filled in"""
+        if not self.resolution_schedule:
+            return [ResolutionPhase(image_size=self.image_size, epochs=self.num_epochs, batch_size=self.batch_size)]
+
+        return [
+            ResolutionPhase(
+                image_size=phase.image_size,
+                epochs=phase.epochs,
+                batch_size=phase.batch_size or max(1, int(self.batch_size * (self.image_size / phase.image_size) ** 2)),
+            )
+            for phase in self.resolution_schedule
+        ]
+
     @staticmethod
     def load_from_config_yaml(config_dir: str) -> "FFXIVPullDetectorTrainConfig":
         with open(config_dir, "r") as f:
@@ -49,6 +123,8 @@ class MLFlowLogParam(BaseModel):
     num_epochs: int
     eta_min: float
     model_name: str
+    image_size: int
+    grad_accum_steps: int
 
         
 
@@ -56,6 +132,8 @@ def evaluate_val_metrics(model: FFXIVPullDetector, val_dataloader: DataLoader, d
     for batch in tqdm(val_dataloader, desc="Evaluating", total=len(val_dataloader)):
         image_batch = batch["image"].to(device)
         label_batch = batch["label"].to(device)
+        if image_batch.dtype == torch.uint8:
+            image_batch = normalize_batch(image_batch)
 
         with torch.no_grad():
             choice_logits = model(image_batch)
@@ -104,14 +182,23 @@ def evaluate_val_metrics(model: FFXIVPullDetector, val_dataloader: DataLoader, d
     return score
 
 
-def train(config: FFXIVPullDetectorTrainConfig, train_dataloader: DataLoader, val_dataloader: DataLoader) -> None:
-    model = FFXIVPullDetector(config.device)
+def train(config: FFXIVPullDetectorTrainConfig, train_dataloader: DataLoader, val_dataloader: DataLoader, model: FFXIVPullDetector | None = None) -> None:
+    """Train a new FFXIVPullDetector, or fine-tune `model` (e.g. a pruned one) when given"""
+    if model is None:
+        model = FFXIVPullDetector(config.device, gradient_checkpointing=config.gradient_checkpointing)
+    else:
+        model.gradient_checkpointing = config.gradient_checkpointing
+        model.device = config.device
+        model.to(config.device)
+    batch_augmentation = BatchAugmentation(seed=config.augmentation_seed) if config.batch_augmentation else None
 
+    # The scheduler steps with the optimizer, so the cosine spans every optimizer step of the run
     optimizer = torch.optim.AdamW(model.parameters(), lr=config.lr)
-    scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(optimizer, T_max=config.num_epochs, eta_min=config.eta_min)
+    total_steps = count_optimizer_steps(config, len(train_dataloader.sampler))
+    scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(optimizer, T_max=total_steps, eta_min=config.eta_min)
 
     logging.info(f"Training config: {config.model_dump_json()}")
-    logging.info(f"Training started with {config.num_epochs} epochs")
+    logging.info(f"Training started with {config.num_epochs} epochs, {total_steps} optimizer steps")
 
     step_cnt = 0
     running_loss = 0.0
@@ -125,6 +212,11 @@ def train(config: FFXIVPullDetectorTrainConfig, train_dataloader: DataLoader, va
         "step": [],
         "loss": [],
     }
+    step_timer = StepTimer(config.device)
+    for name in step_timer.as_metrics():
+        metrics_history[name] = []
+    for name in ("image_size", "batch_size", "epoch_time_sec", "elapsed_sec", "score", "images_per_sec", "peak_rss_mb", "peak_cuda_mb"):
+        metrics_history[name] = []
     best_metrics_history = None
     os.makedirs(config.save_dir, exist_ok=True)
 
@@ -138,77 +230,194 @@ def train(config: FFXIVPullDetectorTrainConfig, train_dataloader: DataLoader, va
         raise ValueError(f"Invalid model name: {config.model_name}")
     print(f"Label index: {label_idx}")
 
-    for epoch in range(config.num_epochs):
-        logging.info(f"Epoch {epoch}:")
-        for batch in tqdm(train_dataloader, desc="Training", total=len(train_dataloader)):
-            image_batch = batch["image"].to(config.device)
-            label_batch = batch["label"].to(config.device).float()
-            label_batch = label_batch[:, label_idx]
+    profile_dir = Path(config.profile_dir or Path(config.save_dir or ".") / "profile")
+    profiler = build_profiler(
+        config.profile, config.device, profile_dir,
+        config.profile_wait_steps, config.profile_warmup_steps, config.profile_active_steps,
+    )
+    scopes = module_scopes(profiled_modules(model)) if config.profile else nullcontext()
+
+    # Validate at the deployment resolution whatever the training phase
+    val_dataloader = resize_dataloader(val_dataloader, config, config.image_size, val_dataloader.batch_size, shuffle=False)
+    epoch_phases = [phase for phase in config.resolution_phases() for _ in range(phase.epochs)]
+    train_start = time.perf_counter()
+
+    with profiler as prof, scopes:
+        for epoch in range(config.num_epochs):
+            phase = epoch_phases[epoch]
+            train_dataloader = resize_dataloader(train_dataloader, config, phase.image_size, phase.batch_size, shuffle=True)
+            logging.info(f"Epoch {epoch}: {phase.image_size}x{phase.image_size}, batch size {phase.batch_size}")
+            step_timer.reset()
+            epoch_start = time.perf_counter()
+            batch_start = time.perf_counter()
+            num_batches = len(train_dataloader)
+            num_images = 0
+
+            for batch_idx, batch in enumerate(tqdm(train_dataloader, desc="Training", total=num_batches)):
+                step_timer.add("data_wait", time.perf_counter() - batch_start)
+
+                with step_timer.phase("forward"):
+                    image_batch = batch["image"].to(config.device, non_blocking=config.pin_memory)
+                    label_batch = batch["label"].to(config.device, non_blocking=config.pin_memory).float()
+                    label_batch = label_batch[:, label_idx]
+                    if batch_augmentation is not None:
+                        image_batch = batch_augmentation(image_batch)
+
+                    choice_logits = model(image_batch).squeeze(1)
+
+                    loss = nn.BCEWithLogitsLoss()(
+                        choice_logits, label_batch
+                    )
+
+                # Average over the micro-batches of one optimizer step, the last group of an epoch can be shorter
+                group_size = min(config.grad_accum_steps, num_batches - batch_idx // config.grad_accum_steps * config.grad_accum_steps)
+                with step_timer.phase("backward"):
+                    (loss / group_size).backward()
+
+                running_loss += float(loss.item()) / group_size
+                num_images += image_batch.shape[0]
+
+                if (batch_idx + 1) % config.grad_accum_steps == 0 or batch_idx + 1 == num_batches:
+                    step_cnt += 1
+
+                    with step_timer.phase("optimizer"):
+                        torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=1.0)
+                        optimizer.step()
+                        scheduler.step()
+                        optimizer.zero_grad(set_to_none=True)
+
+                    avg_loss = running_loss 
+                    print(f"Step {step_cnt} | AvgLoss: {avg_loss:.4f}")
+                    running_loss = 0.0
+
+                prof.step()
+                batch_start = time.perf_counter()
+
+            train_sec = time.perf_counter() - epoch_start
+            model.eval()
+            accuracy_dict = {}
+            with step_timer.phase("eval"):
+                score = evaluate_val_metrics(model, val_dataloader, config.device, accuracy_dict, metrics_history, label_idx)
+
+            model.train()
+
+            metrics_history['step'].append(step_cnt)
+            metrics_history['loss'].append(avg_loss)
+            metrics_history['image_size'].append(phase.image_size)
+            metrics_history['batch_size'].append(phase.batch_size)
+            metrics_history['epoch_time_sec'].append(time.perf_counter() - epoch_start)
+            metrics_history['elapsed_sec'].append(time.perf_counter() - train_start)
+            metrics_history['score'].append(score)
+            metrics_history['images_per_sec'].append(num_images / train_sec)
+            metrics_history['peak_rss_mb'].append(peak_rss_mb())
+            metrics_history['peak_cuda_mb'].append(peak_cuda_mb(config.device))
+
+            step_metrics = step_timer.as_metrics()
+            for name, value in step_metrics.items():
+                metrics_history[name].append(value)
+            logging.info(f"Epoch {epoch} | " + " | ".join(f"{name}: {value:.1f}s" for name, value in step_metrics.items()))
+
+            print(score)
+            print(f"best_score: {best_score}")
+            if config.save_dir and score > best_score:
+                best_score = score
+                best_metrics_history = {k: v[-1] for k, v in metrics_history.items()} 
+                pd.DataFrame(metrics_history).to_csv(Path(config.save_dir) / "metrics_history.csv", index=False)
+                torch.save(model.state_dict(), Path(config.save_dir) / f"best_model.pth")
+                save_checkpoint_meta(checkpoint_meta_path(Path(config.save_dir) / "best_model.pth"), config, epoch, score)
+                print(f"saved at: {Path(config.save_dir) / f'best_model.pth'}")
 
-            choice_logits = model(image_batch).squeeze(1)
-
-            loss = nn.BCEWithLogitsLoss()(
-                choice_logits, label_batch
-            )
-
-            loss.backward()
+    if config.save_dir:
+        pd.DataFrame(metrics_history).to_csv(Path(config.save_dir) / "metrics_history.csv", index=False)
+        torch.save(model.state_dict(), Path(config.save_dir) / "last_epoch.pth")    
+        save_checkpoint_meta(checkpoint_meta_path(Path(config.save_dir) / "last_epoch.pth"), config, epoch, score)
 
-            running_loss += float(loss.item())
+    return model, best_metrics_history, best_score
 
-            step_cnt += 1
 
-            torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=1.0)
-            optimizer.step()
-            scheduler.step()
-            optimizer.zero_grad(set_to_none=True)
+def count_optimizer_steps(config: FFXIVPullDetectorTrainConfig, num_samples: int) -> int:
+    """Optimizer steps of the whole run for `num_samples` training samples per epoch"""
+    return sum(
+        phase.epochs * math.ceil(math.ceil(num_samples / phase.batch_size) / config.grad_accum_steps)
+        for phase in config.resolution_phases()
+    )
 
-            avg_loss = running_loss 
-            print(f"Step {step_cnt} | AvgLoss: {avg_loss:.4f}")
-            running_loss = 0.0
 
-        model.eval()
-        accuracy_dict = {}
-        score = evaluate_val_metrics(model, val_dataloader, config.device, accuracy_dict, metrics_history, label_idx)
+def checkpoint_meta_path(checkpoint_path: str | Path) -> Path:
+    """`saved_models/best_model.pth` -> `saved_models/best_model.meta.json`"""
+    return Path(checkpoint_path).with_suffix(".meta.json")
 
-        model.train()
 
-        metrics_history['step'].append(step_cnt)
-        metrics_history['loss'].append(avg_loss)
+def save_checkpoint_meta(path: Path, config: FFXIVPullDetectorTrainConfig, epoch: int, score: float) -> None:
+    """Resolution the checkpoint was trained and validated at, read by scripts/convert_pth_to_onnx.py"""
+    meta = {
+        "model_name": config.model_name,
+        "image_size": config.image_size,
+        "resolution_schedule": [phase.model_dump() for phase in config.resolution_phases()],
+        "epoch": epoch,
+        "score": score,
+    }
+    with open(path, "w") as f:
+        json.dump(meta, f, indent=2)
 
-        print(score)
-        print(f"best_score: {best_score}")
-        if config.save_dir and score > best_score:
-            best_score = score
-            best_metrics_history = {k: v[-1] for k, v in metrics_history.items()} 
-            pd.DataFrame(metrics_history).to_csv(Path(config.save_dir) / "metrics_history.csv", index=False)
-            torch.save(model.state_dict(), Path(config.save_dir) / f"best_model.pth")
-            print(f"saved at: {Path(config.save_dir) / f'best_model.pth'}")
 
-    if config.save_dir:
-        pd.DataFrame(metrics_history).to_csv(Path(config.save_dir) / "metrics_history.csv", index=False)
-        torch.save(model.state_dict(), Path(config.save_dir) / "last_epoch.pth")    
+def resize_dataloader(dataloader: DataLoader, config: FFXIVPullDetectorTrainConfig, image_size: int, batch_size: int, shuffle: bool) -> DataLoader:
+    """`dataloader` at `image_size` and `batch_size`, rebuilt only when one of them changes"""
+    dataset = dataloader.dataset
+    if dataset.image_size == image_size and dataloader.batch_size == batch_size:
+        return dataloader
 
-    return model, best_metrics_history, best_score
+    dataset.set_image_size(image_size)
+    return build_dataloader(dataset, config, shuffle=shuffle, batch_size=batch_size)
 
 
 def split_train_val_image_ids(label_json_path: str) -> Tuple[List[int], List[int]]:
+    """Split the manifest 9:1. Items of a dedup manifest are split by near-duplicate group so
+    almost identical frames never end up on both sides of the split."""
     with open(label_json_path, "r") as f:
         X = json.load(f)
-    
-    return train_test_split(X, test_size=0.1, random_state=42)
+
+    if not X or "dedup" not in X[0]:
+        return train_test_split(X, test_size=0.1, random_state=42)
+
+    groups = [item["dedup"]["group_id"] for item in X]
+    train_idx, val_idx = next(GroupShuffleSplit(n_splits=1, test_size=0.1, random_state=42).split(X, groups=groups))
+    return [X[i] for i in train_idx], [X[i] for i in val_idx]
+
+
+def build_dataloader(dataset: PullDetectorDataset, config: FFXIVPullDetectorTrainConfig, shuffle: bool, batch_size: int | None = None) -> DataLoader:
+    """DataLoader with the input pipeline settings of `config`."""
+    kwargs = {}
+    if shuffle and config.weighted_sampling:
+        weights = [item.get("dedup", {}).get("sample_weight", 1.0) for item in dataset.data_info]
+        kwargs["sampler"] = WeightedRandomSampler(weights, num_samples=max(1, round(sum(weights))), replacement=True)
+        shuffle = False
+    if config.num_workers > 0:
+        kwargs["persistent_workers"] = config.persistent_workers
+        if config.prefetch_factor is not None:
+            kwargs["prefetch_factor"] = config.prefetch_factor
+
+    return DataLoader(
+        dataset,
+        batch_size=batch_size or config.batch_size,
+        shuffle=shuffle,
+        num_workers=config.num_workers,
+        pin_memory=config.pin_memory,
+        **kwargs,
+    )
 
 @hydra.main(config_path="config")
 def main(config: OmegaConf):
     config = FFXIVPullDetectorTrainConfig(**config)
-    label_json_path = Path(config.dataset_base_dir) / "annotations.json"
+    label_json_path = Path(config.dataset_base_dir) / config.annotations_file
     X_train, X_val = split_train_val_image_ids(label_json_path)
 
     image_dir = Path(config.dataset_base_dir) / "images"
 
-    train_dataset = PullDetectorDataset(X_train, image_dir, True)
-    val_dataset = PullDetectorDataset(X_val, image_dir, False)
-    train_dataloader = DataLoader(train_dataset, batch_size=config.batch_size, shuffle=True)
-    val_dataloader = DataLoader(val_dataset, batch_size=config.batch_size, shuffle=False)
+    train_dataset = PullDetectorDataset(X_train, image_dir, True, config.batch_augmentation, config.image_size)
+    val_dataset = PullDetectorDataset(X_val, image_dir, False, config.batch_augmentation, config.image_size)
+    train_dataloader = build_dataloader(train_dataset, config, shuffle=True)
+    val_dataloader = build_dataloader(val_dataset, config, shuffle=False)
 
     model, final_metrics, _ = train(config, train_dataloader, val_dataloader)
     mlflow.set_tracking_uri(uri=f"http://{config.mlflow_host}:{config.mlflow_port}")
@@ -224,7 +433,9 @@ def main(config: OmegaConf):
             print(f"{metric_name}: {metric_value}")
             mlflow.log_metric(metric_name, metric_value)
 
-        input_sample = next(iter(train_dataloader))["image"].to(config.device)
+        input_sample = next(iter(val_dataloader))["image"].to(config.device)
+        if input_sample.dtype == torch.uint8:
+            input_sample = normalize_batch(input_sample)
         signature = infer_signature(input_sample, model(input_sample))
 
         model_info = mlflow.pytorch.log_model(
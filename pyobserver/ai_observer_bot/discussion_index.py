@@ -0,0 +1,169 @@
+import re
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+INDEX_FILE = 'discussion_index.db'
+
+# 흔한 단어로 검색하면 일치하는 문서가 너무 많아 전부 bm25로 정렬하기 느리므로 최근 문서 중 이 개수까지만 순위를 매김
+CANDIDATE_LIMIT = 2000
+# 전체 결과 수는 이 개수까지만 세고 넘으면 COUNT_LIMIT + 1 반환
+COUNT_LIMIT = 1000
+
+# 한글 음절/자모 연속 구간과 영문·숫자 단어
+HANGUL_RUN = re.compile(r'[가-힣ㄱ-ㆎ]+')
+TOKEN_PATTERN = re.compile(r'[가-힣ㄱ-ㆎ]+|[0-9A-Za-z]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """한국어 검색용 토큰화
+
+    한국어는 조사가 붙어 띄어쓰기 단위로는 검색이 잘 되지 않으므로 한글 구간은 2글자 단위(bigram)로 나누고,
+    영문·숫자는 소문자 단어로 사용. ex) '탱힐은 오른쪽' -> ['탱힐', '힐은', '오른', '른쪽']
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text or ''):
+        word = match.group()
+        if HANGUL_RUN.fullmatch(word):
+            if len(word) == 1:
+                tokens.append(word)
+            else:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word.lower())
+    return tokens
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """검색어를 FTS5 MATCH 식으로 변환 (모든 토큰을 포함하는 문서만)"""
+    tokens = tokenize(query)
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"' for token in dict.fromkeys(tokens))
+
+
+class DiscussionIndex:
+    """논의 메시지와 게시된 요약에 대한 SQLite FTS5 전문 검색 인덱스
+
+    원문은 `documents` 테이블에, 토큰화한 텍스트는 같은 rowid로 `documents_fts`에 저장하여
+    메시지가 올 때마다 한 줄씩 추가하고 bm25 순으로 검색.
+    모든 서버가 파일 하나를 같이 쓰므로 검색은 항상 guild_id로 제한함.
+    쓰기는 `asyncio.to_thread`로 이벤트 루프 밖에서 호출하므로 연결 하나를 lock으로 보호
+    """
+
+    def __init__(self, db_path: str = INDEX_FILE):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+
+        # guild_id가 없던 이전 인덱스는 어느 서버 메시지인지 알 수 없으므로 지우고 새로 만듦 (채널 등록 시 다시 채워짐)
+        columns = [row['name'] for row in self.conn.execute("PRAGMA table_info(documents)")]
+        if columns and 'guild_id' not in columns:
+            self.conn.executescript("DROP TABLE documents; DROP TABLE IF EXISTS documents_fts;")
+
+        self.conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY,
+                message_id INTEGER UNIQUE,
+                guild_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                author TEXT,
+                content TEXT NOT NULL,
+                timestamp TEXT,
+                url TEXT
+            );
+            CREATE INDEX IF NOT EXISTS documents_guild_channel ON documents(guild_id, channel);
+            CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(tokens);
+        """)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def _insert(self, document: Dict) -> bool:
+        cursor = self.conn.execute(
+            """INSERT OR IGNORE INTO documents (message_id, guild_id, kind, channel, author, content, timestamp, url)
+               VALUES (:message_id, :guild_id, :kind, :channel, :author, :content, :timestamp, :url)""",
+            {'author': None, 'timestamp': None, 'url': None, **document}
+        )
+        # 이미 인덱스된 메시지
+        if cursor.rowcount == 0:
+            return False
+
+        self.conn.execute(
+            "INSERT INTO documents_fts (rowid, tokens) VALUES (?, ?)",
+            (cursor.lastrowid, ' '.join(tokenize(document['content'])))
+        )
+        return True
+
+    def add(self, document: Dict) -> bool:
+        """문서 하나 추가 (message_id, guild_id, kind, channel, content, author, timestamp, url)
+
+        Returns:
+            새로 추가되었으면 True, 이미 있던 메시지면 False
+        """
+        with self.lock, self.conn:
+            return self._insert(document)
+
+    def add_many(self, documents: List[Dict]) -> int:
+        """여러 문서를 한 트랜잭션으로 추가하고 새로 추가된 개수 반환"""
+        with self.lock, self.conn:
+            return sum(self._insert(document) for document in documents)
+
+    def search(
+        self,
+        query: str,
+        guild_id: int,
+        channel: Optional[str] = None,
+        kind: Optional[str] = None,
+        page: int = 1,
+        page_size: int = 5,
+    ) -> Tuple[int, List[sqlite3.Row]]:
+        """guild_id 서버의 문서만 bm25 순으로 검색
+
+        Returns:
+            (전체 결과 수 (최대 COUNT_LIMIT + 1), 해당 페이지 결과)
+        """
+        match = build_match_query(query)
+        if match is None:
+            return 0, []
+
+        where = "documents_fts MATCH ? AND d.guild_id = ?"
+        params = [match, guild_id]
+        if channel is not None:
+            where += " AND d.channel = ?"
+            params.append(channel)
+        if kind is not None:
+            where += " AND d.kind = ?"
+            params.append(kind)
+
+        # CROSS JOIN으로 FTS 결과를 먼저 읽도록 고정 (channel 인덱스로 전체 문서를 훑지 않도록)
+        base = f"FROM documents_fts CROSS JOIN documents d ON d.id = documents_fts.rowid WHERE {where}"
+        with self.lock:
+            total = self.conn.execute(
+                f"SELECT COUNT(*) FROM (SELECT 1 {base} LIMIT ?)", params + [COUNT_LIMIT + 1]
+            ).fetchone()[0]
+            rows = self.conn.execute(
+                f"""SELECT d.*, c.score FROM (
+                        SELECT documents_fts.rowid AS id, bm25(documents_fts) AS score {base}
+                        ORDER BY documents_fts.rowid DESC LIMIT ?
+                    ) c JOIN documents d ON d.id = c.id
+                    ORDER BY c.score LIMIT ? OFFSET ?""",
+                params + [CANDIDATE_LIMIT, page_size, (max(page, 1) - 1) * page_size]
+            ).fetchall()
+        return total, rows
+
+    def count(self, guild_id: Optional[int] = None, channel: Optional[str] = None) -> int:
+        where, params = [], []
+        if guild_id is not None:
+            where.append("guild_id = ?")
+            params.append(guild_id)
+        if channel is not None:
+            where.append("channel = ?")
+            params.append(channel)
+        sql = "SELECT COUNT(*) FROM documents" + (" WHERE " + " AND ".join(where) if where else "")
+        with self.lock:
+            return self.conn.execute(sql, params).fetchone()[0]
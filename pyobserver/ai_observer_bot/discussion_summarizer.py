@@ -4,12 +4,57 @@ from datetime import datetime, timedelta
 import pytz
 import json
 import os
-from pyobserver.request_gemini import request_gemini, GeminiModels
-from typing import Dict, List, Set, Optional
-from pyobserver.ai_observer_bot.summarization_prompt import summarization_prompt
+import time
+import asyncio
+from pyobserver.request_gemini import request_gemini_stream
+from pyobserver.model_router import default_router
+from pyobserver.message_delivery import send_sections, send_text, ProgressiveMessage
+from typing import Dict, List, Set, Optional, Tuple
+from pyobserver.ai_observer_bot.summarization_prompt import summarization_prompt, triage_prompt
+from pyobserver.ai_observer_bot.discussion_index import DiscussionIndex, COUNT_LIMIT
+from pyobserver.ai_observer_bot.summary_retriever import SummaryRetriever
 
 KST = pytz.timezone('Asia/Seoul')
 
+SEARCH_PAGE_SIZE = 5
+
+
+def summary_texts(message) -> List[str]:
+    """정리 채널 메시지의 본문과 임베드(제목, 설명)를 텍스트로"""
+    texts = [message.content] if message.content else []
+    for embed in message.embeds:
+        embed_content = []
+
+        # 임베드 제목
+        if embed.title:
+            embed_content.append(f"📋 {embed.title}")
+
+        # 임베드 설명
+        if embed.description:
+            embed_content.append(embed.description)
+
+        if embed_content:
+            texts.append('\n'.join(embed_content))
+    return texts
+
+
+def message_document(message, kind: str) -> Optional[Dict]:
+    """검색 인덱스에 넣을 문서, 요약 채널은 임베드 제목/설명까지 포함"""
+    parts = summary_texts(message)
+    if not parts:
+        return None
+
+    return {
+        'message_id': message.id,
+        'guild_id': message.guild.id,
+        'kind': kind,
+        'channel': message.channel.name,
+        'author': message.author.name,
+        'content': '\n'.join(parts),
+        'timestamp': message.created_at.isoformat(),
+        'url': getattr(message, 'jump_url', None),
+    }
+
 
 class DiscussionSummarizer(commands.Cog):
     """Discord `input_channel-논의` 채널에서 논의한 내용 중 논의 중인 내용을 필터링 하고 "최종적으로 결정된 사안" 들만 LLM으로 요약하여 `input_channel-최종정리` 채널로 전송"""
@@ -25,6 +70,10 @@ class DiscussionSummarizer(commands.Cog):
         
         # 채널 매핑 정보 (논의 채널 -> 정리 채널)
         self.channel_mappings: Dict[str, str] = {}
+
+        # 정리 채널별 기존 결정사항 검색기
+        # (서버 id, 정리 채널 이름) -> 정리 항목 검색
+        self.summary_retrievers: Dict[Tuple[int, str], SummaryRetriever] = {}
         
         # 설정 파일
         self.config_file = 'discussion_config.json'
@@ -33,6 +82,9 @@ class DiscussionSummarizer(commands.Cog):
         # 설정 및 기록 로드
         self.load_config()
         self.load_history()
+
+        # 논의 메시지와 요약 전문 검색 인덱스 (메시지가 올 때마다 갱신)
+        self.index = DiscussionIndex()
     
     def load_config(self):
         """설정 파일 로드"""
@@ -87,6 +139,28 @@ class DiscussionSummarizer(commands.Cog):
         """Cog 언로드 시 저장"""
         self.save_config()
         self.save_history()
+        self.index.close()
+
+    def export_state(self):
+        """확장 리로드 시 새 cog로 넘겨줄 상태 (파일을 다시 읽지 않도록 메모리 그대로 전달)"""
+        return {
+            'conversation_history': self.conversation_history,
+            'processed_message_ids': self.processed_message_ids,
+            'channel_mappings': self.channel_mappings,
+            # 리로드된 summary_retriever 모듈의 새 클래스로 다시 만들도록 객체 대신 항목 텍스트만 전달
+            'summary_entries': {key: retriever.entries for key, retriever in self.summary_retrievers.items()},
+        }
+
+    def import_state(self, state):
+        self.conversation_history = state['conversation_history']
+        self.processed_message_ids = state['processed_message_ids']
+        self.channel_mappings = state['channel_mappings']
+        self.summary_retrievers = {}
+        for key, entries in state.get('summary_entries', {}).items():
+            retriever = SummaryRetriever()
+            for entry in entries:
+                retriever.add_entry(entry)
+            self.summary_retrievers[key] = retriever
 
     @commands.command(name='register_channel', aliases=['채널등록'])
     async def register_channel(self, ctx, channel_name: str):
@@ -118,8 +192,10 @@ class DiscussionSummarizer(commands.Cog):
         # 기존 메시지 로드
         try:
             message_count = 0
+            documents = []
             async for message in discussion_channel.history(limit=1000):  # 최근 1000개 메시지
                 if not message.author.bot:  # 봇 메시지 제외
+                    documents.append(message_document(message, 'discussion'))
                     message_data = {
                         'id': message.id,
                         'author': message.author.name,
@@ -136,6 +212,13 @@ class DiscussionSummarizer(commands.Cog):
             
             # 시간순 정렬 (오래된 것부터)
             self.conversation_history[discussion_channel_name].sort(key=lambda x: x['timestamp'])
+
+            # 검색 인덱스에 기존 논의 메시지와 요약 추가 (이미 있는 메시지는 건너뜀)
+            documents += [
+                message_document(message, 'summary')
+                async for message in summary_channel.history(limit=1000)
+            ]
+            await asyncio.to_thread(self.index.add_many, [document for document in documents if document])
             
             # 설정 저장
             self.save_config()
@@ -170,26 +253,20 @@ class DiscussionSummarizer(commands.Cog):
         discussion_channel = discord.utils.get(ctx.guild.text_channels, name=discussion_channel_name)
         summary_channel = discord.utils.get(ctx.guild.text_channels, name=summary_channel_name)
 
-        summary_channel_messages = []
-        async for message in summary_channel.history(limit=1000):
-            if message.content:
-                summary_channel_messages.append(message.content)
+        # 정리 채널 항목 BM25 인덱스, 처음 한 번만 채널 기록으로 만들고 이후에는 on_message로 갱신
+        # 같은 이름의 채널이 여러 서버에 있을 수 있으므로 (서버, 채널)로 구분
+        retriever_key = (ctx.guild.id, summary_channel_name)
+        retriever = self.summary_retrievers.get(retriever_key)
+        if retriever is None:
+            summary_channel_messages = []
+            async for message in summary_channel.history(limit=1000):
+                summary_channel_messages.extend(summary_texts(message))
+            summary_channel_messages.reverse()
 
-            if message.embeds:
-                for embed in message.embeds:
-                    embed_content = []
-                    
-                    # 임베드 제목
-                    if embed.title:
-                        embed_content.append(f"📋 {embed.title}")
-                    
-                    # 임베드 설명
-                    if embed.description:
-                        embed_content.append(embed.description)
-                    
-                    if embed_content:
-                        summary_channel_messages.append('\n'.join(embed_content))
-        summary_channel_messages.reverse()
+            retriever = SummaryRetriever()
+            for text in summary_channel_messages:
+                retriever.add_message(text)
+            self.summary_retrievers[retriever_key] = retriever
 
 
         discussion_channel_messages = []
@@ -232,36 +309,43 @@ class DiscussionSummarizer(commands.Cog):
                 for msg in new_messages
             ])
 
-            prompt = summarization_prompt(discussion_channel_messages, summary_channel_messages)
-            print(prompt)
-            # Gemini API 호출
-            await processing_msg.edit(content="🤖 AI가 결정사항을 분석 중...")
-            summary = request_gemini(GeminiModels.GEMINI_2_5_PRO, prompt)
+            # 기존 정리 전체 대신 새 논의와 관련 있는 결정사항만 프롬프트에 포함
+            # 타임스탬프와 작성자 이름이 점수에 섞이지 않도록 메시지 본문만으로 검색
+            relevant_summaries = retriever.retrieve("\n".join(msg['content'] for msg in new_messages))
+
+            # 새 메시지만 Flash-Lite로 먼저 확인하여 결정사항이 없으면 요약 요청을 건너뛰고, 있으면 크기에 맞는 모델 선택
+            await processing_msg.edit(content="🔎 새로운 결정사항이 있는지 확인 중...")
+            decision = await default_router.route(
+                'discussion_summary',
+                triage_prompt(conversation_text.split('\n'), relevant_summaries),
+                len(conversation_text)
+            )
+
+            if decision.skipped:
+                default_router.record(decision)
+                summary = "아직 최종 결정된 사항이 없습니다."
+            else:
+                prompt = summarization_prompt(discussion_channel_messages, relevant_summaries)
+                print(prompt)
+                # Gemini API 호출
+                header = "🤖 AI가 결정사항을 분석 중..."
+                await processing_msg.edit(content=header)
+                # 생성되는 대로 처리 중 메시지에 보여줌
+                start = time.perf_counter()
+                summary = await ProgressiveMessage(processing_msg, header).consume(
+                    request_gemini_stream(decision.model, prompt)
+                )
+                default_router.record(decision, time.perf_counter() - start)
             
             if summary and "아직 최종 결정된 사항이 없습니다" not in summary:
-                if len(summary) > 2000:
-                    chunks = [summary[i:i+2000] for i in range(0, len(summary), 2000)]
-                    for i, chunk in enumerate(chunks):
-                        if i == 0:
-                            embed = discord.Embed(
-                                title=f"📊 {channel_name} 논의 결과 요약",
-                                description=chunk,
-                                color=discord.Color.blue(),
-                                timestamp=datetime.now(KST)
-                            )
-                            embed.set_footer(text=f"요약 요청자: {ctx.author.name}")
-                            await summary_channel.send(embed=embed)
-                        else:
-                            await summary_channel.send(chunk)
-                else:
-                    embed = discord.Embed(
-                        title=f"📊 {channel_name} 논의 결과 요약",
-                        description=summary,
-                        color=discord.Color.blue(),
-                        timestamp=datetime.now(KST)
-                    )
-                    
-                    await summary_channel.send(embed=embed)
+                # 마크다운 경계에서 나눠 최소한의 메시지로 전송
+                await send_text(
+                    summary_channel,
+                    summary,
+                    title=f"📊 {channel_name} 논의 결과 요약",
+                    footer=f"요약 요청자: {ctx.author.name}",
+                    timestamp=datetime.now(KST)
+                )
                 
                 await processing_msg.edit(content=f"✅ 요약이 완료되어 {summary_channel.mention}에 게시되었습니다.")
             else:
@@ -278,6 +362,56 @@ class DiscussionSummarizer(commands.Cog):
         self.processed_message_ids[discussion_channel_name].add(message.id)
  
     
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        """등록된 논의 채널의 메시지와 정리 채널의 요약을 검색 인덱스에 바로 추가"""
+        channel_name = getattr(message.channel, 'name', None)
+        if channel_name in self.channel_mappings and not message.author.bot:
+            kind = 'discussion'
+        elif channel_name in self.channel_mappings.values():
+            kind = 'summary'
+        else:
+            return
+
+        document = message_document(message, kind)
+        if document:
+            # sqlite 쓰기가 이벤트 루프를 막지 않도록 스레드에서 실행
+            await asyncio.to_thread(self.index.add, document)
+
+        retriever = self.summary_retrievers.get((message.guild.id, channel_name))
+        if kind == 'summary' and retriever is not None:
+            for text in summary_texts(message):
+                retriever.add_message(text)
+
+    @commands.command(name='search', aliases=['검색'])
+    async def search(self, ctx, page: Optional[int] = 1, *, query: str):
+        """논의 메시지와 요약에서 검색합니다 (ex: `!!검색 환랑초래 탱힐`, 2페이지: `!!검색 2 환랑초래 탱힐`)"""
+        start = time.perf_counter()
+        # 다른 서버의 논의가 보이지 않도록 명령을 실행한 서버로 제한
+        total, rows = self.index.search(query, ctx.guild.id, page=page, page_size=SEARCH_PAGE_SIZE)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        if not rows:
+            await ctx.send(f"🔎 '{query}'에 대한 검색 결과가 없습니다.")
+            return
+
+        total_text = f"{COUNT_LIMIT}+" if total > COUNT_LIMIT else str(total)
+        pages = -(-min(total, COUNT_LIMIT) // SEARCH_PAGE_SIZE)
+        embed = discord.Embed(
+            title=f"🔎 '{query}' 검색 결과",
+            description=f"{total_text}건 중 {page}/{pages} 페이지 ({elapsed_ms:.0f}ms)",
+            color=discord.Color.blue()
+        )
+        for row in rows:
+            kind = '📋 요약' if row['kind'] == 'summary' else '💬 논의'
+            timestamp = (row['timestamp'] or '')[:16].replace('T', ' ')
+            content = row['content'] if len(row['content']) <= 300 else row['content'][:300] + '…'
+            if row['url']:
+                content += f"\n[메시지로 이동]({row['url']})"
+            embed.add_field(name=f"{kind} · {row['channel']} · {row['author']} · {timestamp}", value=content, inline=False)
+
+        await ctx.send(embed=embed)
+
     @commands.command(name='clear_history', aliases=['기록초기화'])
     @commands.has_permissions(manage_guild=True)
     async def clear_history(self, ctx, channel_name: str):
@@ -297,16 +431,24 @@ class DiscussionSummarizer(commands.Cog):
         """특정 채널의 대화 기록 표시"""
         discussion_channel_name = f"{channel_name}"
         if discussion_channel_name in self.conversation_history:
-            await ctx.send(f"'{channel_name}' 채널의 대화 기록 메모리: ")
-            await ctx.send(f"{self.conversation_history[discussion_channel_name]}")
+            await send_text(
+                ctx,
+                f"{self.conversation_history[discussion_channel_name]}",
+                title=f"'{channel_name}' 채널의 대화 기록 메모리"
+            )
         else:
             await ctx.send(f"❌ '{channel_name}' 채널이 등록되지 않았습니다.")
 
     @commands.command(name='show_history_all', aliases=['모든기록보기'])
     async def show_history_all(self, ctx):
         """모든 채널의 대화 기록 표시"""
-        for channel_name in self.conversation_history:
-            await self.show_history(ctx, channel_name)
+        # 채널마다 따로 보내지 않고 모든 채널 기록을 임베드로 묶어서 전송
+        sections = [
+            (f"'{channel_name}' 채널의 대화 기록 메모리", f"{history}")
+            for channel_name, history in self.conversation_history.items()
+        ]
+        if sections:
+            await send_sections(ctx, sections)
  
     
     @commands.command(name='show_stats', aliases=['통계'])
@@ -1,85 +1,106 @@
+import time
+_process_start = time.perf_counter()
+
 import os
 import sys
+import asyncio
 import logging
 from dotenv import load_dotenv
 import discord
 from discord.ext import commands
+from pyobserver.hot_reload import update_bot
+from pyobserver.startup import StartupProfile, prewarm_imports
+from pyobserver.metrics import start_metrics, loop_lag
 
 logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
-TOKEN = os.getenv('AI_ASSISTANT_DISCORD_TOKEN')
+TOKEN_ENV = 'AI_ASSISTANT_DISCORD_TOKEN'
 
-if not TOKEN:
-    logger.error("DISCORD_TOKEN not found in environment variables!")
-    sys.exit(1)
+EXTENSIONS = {
+    'pyobserver.ai_observer_bot.discussion_summarizer': 'Discussion Summarizer',
+    'pyobserver.ffxiv_stream_collector.live_stream_recorder': 'Live Stream Recorder',
+}
 
-# Enable message content intent
-intents = discord.Intents.default()
-intents.message_content = True  
+# 명령어에서 처음 쓰일 때 import 되는 무거운 모듈들, 접속 후 백그라운드에서 미리 로드
+PREWARM_MODULES = ['google.generativeai', 'dropbox']
 
-bot = commands.Bot(command_prefix='!!', intents=intents)
+def create_bot(startup_profile=None, connector=None):
+    """봇 인스턴스 생성
 
-@bot.event
-async def on_ready():
-    logger.info(f'{bot.user} has connected to Discord!')
-    try:
-        await bot.load_extension('pyobserver.ai_observer_bot.discussion_summarizer')
-        await bot.load_extension('pyobserver.ffxiv_stream_collector.live_stream_recorder')
-    except Exception as e:
-        logger.error(f"Failed to load Discussion Summarizer extension: {e}")
-
-@bot.event
-async def on_error(event, *args, **kwargs):
-    logger.error(f"Error in event {event}: {args} {kwargs}")
-
-@bot.command()
-@commands.is_owner()  # 봇 소유자만 실행 가능
-async def update(ctx):
-    """Git에서 최신 코드를 가져옵니다"""
-    await ctx.send("📥 업데이트를 확인하는 중...")
-    
-    try:
-        # Git pull 실행
-        process = await asyncio.create_subprocess_shell(
-            'git pull origin main',
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await process.communicate()
-        
-        # 결과 확인
-        if process.returncode == 0:
-            output = stdout.decode()
-            if "Already up to date." in output:
-                await ctx.send("✅ 이미 최신 버전입니다!")
-            else:
-                await ctx.send(f"✅ 업데이트 완료!\n```\n{output}\n```")
-                await ctx.send("🔄 봇을 재시작합니다...")
-                await bot.close()
-                # 봇 재시작
-                os.execv(sys.executable, ['python'] + sys.argv)
-        else:
-            await ctx.send(f"❌ 업데이트 실패:\n```\n{stderr.decode()}\n```")
-            
-    except Exception as e:
-        await ctx.send(f"❌ 오류 발생: {str(e)}")
+    Args:
+        startup_profile: 시작 단계 기록용 StartupProfile (없으면 새로 생성)
+        connector: 다른 봇과 공유할 aiohttp 커넥터 (run_bot_host에서 사용)
+    """
+    if startup_profile is None:
+        startup_profile = StartupProfile('FlyXIV AI Observer', time.perf_counter())
+
+    # Enable message content intent
+    intents = discord.Intents.default()
+    intents.message_content = True
+
+    bot = commands.Bot(command_prefix='!!', intents=intents, connector=connector)
+
+    @bot.event
+    async def setup_hook():
+        startup_profile.mark('login')
+        await start_metrics(bot, 'observer')
+
+        # on_ready는 재접속할 때마다 호출되므로 확장은 여기서 한 번만 로드
+        for extension, name in EXTENSIONS.items():
+            try:
+                await bot.load_extension(extension)
+                logger.info(f"Loaded {name} extension")
+            except Exception as e:
+                logger.error(f"Failed to load {name} extension: {e}")
 
-@bot.command()
-async def healthcheck(ctx):
-    """봇의 상태를 확인합니다"""
-    # 디버깅: 봇의 권한 상태 출력
-    print(f"봇 권한 - 관리자: {ctx.guild.me.guild_permissions.administrator}")
-    print(f"봇 최상위 역할: {ctx.guild.me.top_role.name}")
+        startup_profile.mark('extension_load')
+
+    @bot.event
+    async def on_ready():
+        logger.info(f'{bot.user} has connected to Discord!')
+        if not startup_profile.finished:
+            startup_profile.finish()
+            asyncio.create_task(prewarm_imports(PREWARM_MODULES))
+
+    @bot.event
+    async def on_error(event, *args, **kwargs):
+        logger.error(f"Error in event {event}: {args} {kwargs}")
+
+    @bot.command()
+    @commands.is_owner()  # 봇 소유자만 실행 가능
+    async def update(ctx):
+        """Git에서 최신 코드를 가져와 바뀐 확장만 다시 로드합니다"""
+        await update_bot(bot, ctx)
+
+    @bot.command()
+    async def healthcheck(ctx):
+        """봇의 상태를 확인합니다"""
+        # 디버깅: 봇의 권한 상태 출력
+        print(f"봇 권한 - 관리자: {ctx.guild.me.guild_permissions.administrator}")
+        print(f"봇 최상위 역할: {ctx.guild.me.top_role.name}")
+
+        lag = loop_lag()
+        lag_text = f" (이벤트 루프 지연 {lag * 1000:.0f}ms)" if lag is not None else ""
+        await ctx.send(f"✅ 봇이 정상 작동 중입니다!{lag_text}")
+
+    return bot
 
-    await ctx.send("✅ 봇이 정상 작동 중입니다!")
 
 def main():
     """Main function to run the bot"""
+    token = os.getenv(TOKEN_ENV)
+    if not token:
+        logger.error(f"{TOKEN_ENV} not found in environment variables!")
+        sys.exit(1)
+
     try:
         logger.info("Starting FlyXIV AI Observer Discord bot...")
-        bot.run(TOKEN)
+        startup_profile = StartupProfile('FlyXIV AI Observer', _process_start)
+        startup_profile.mark('imports')
+        bot = create_bot(startup_profile)
+        bot.run(token)
     except discord.LoginFailure:
         logger.error("Failed to login: Invalid Discord token")
         sys.exit(1)
@@ -88,4 +109,4 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -25,4 +25,26 @@ def summarization_prompt(discussion_channel_messages: List[str], summary_channel
 </논의 대화 내용>
 
 만약 최종 결정된 사항이 없다면 "아직 최종 결정된 사항이 없습니다."라고 답하세요.
-"""
\ No newline at end of file
+"""
+
+
+def triage_prompt(new_messages: List[str], summary_channel_messages: List[str]):
+    """Flash-Lite로 새 메시지에 결정사항이 있는지, 얼마나 큰지만 빠르게 판단하기 위한 프롬프트"""
+    return f"""당신은 RPG 레이드 팀의 공략 논의를 분류하는 AI Assistant입니다.
+아래 새 논의 메시지들에 기존 최종 정리에 없는 **새로 합의되고 결정된 사항**이 있는지 판단하세요.
+제안, 질문, 아직 의견을 나누는 중인 대화는 결정사항이 아닙니다.
+
+<기존 최종 정리 채널 내용>
+{'\n'.join(summary_channel_messages)}
+</기존 최종 정리 채널 내용>
+
+<새 논의 메시지>
+{'\n'.join(new_messages)}
+</새 논의 메시지>
+
+다른 설명 없이 아래 JSON 형식으로만 답하세요.
+{{"has_new_decisions": true 또는 false, "delta_size": "small" 또는 "medium" 또는 "large"}}
+- small: 결정사항 1~2개, 단순한 내용
+- medium: 결정사항 여러 개 또는 기존 정리를 수정하는 내용
+- large: 많은 기믹에 걸친 결정이나 서로 얽힌 수정사항
+"""
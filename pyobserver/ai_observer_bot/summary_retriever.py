@@ -0,0 +1,124 @@
+import re
+import math
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+from pyobserver.ai_observer_bot.discussion_index import tokenize
+
+# 프롬프트에 넣을 기존 정리 항목 수와 글자 수 상한 (정리 채널이 길어져도 프롬프트 크기가 일정하도록)
+DEFAULT_TOP_K = 8
+DEFAULT_CHAR_BUDGET = 3000
+
+# BM25 파라미터
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# 새 항목의 시작: 번호(1. / 2)), 글머리 기호
+ENTRY_START = re.compile(r'^\s*(\d+[.)]\s|[-*•]\s)')
+# 항목이 아니라 뒤따르는 항목들의 맥락이 되는 줄: 마크다운 제목, 임베드 제목
+HEADING = re.compile(r'^\s*(#{1,3}\s|📋|\*\*[^*]+\*\*\s*$)')
+
+
+def split_entries(text: str) -> List[str]:
+    """정리 메시지를 결정사항(기믹) 단위 항목으로 나눔
+
+    번호/글머리 기호마다 새 항목을 시작하고, 이어지는 줄은 같은 항목에 붙임.
+    제목 줄은 그 아래 항목들 앞에 붙여 어떤 페이즈/기믹에 대한 결정인지 같이 검색되도록 함
+    """
+    entries = []
+    heading = None
+    current = []
+
+    def flush():
+        if current:
+            body = '\n'.join(current).strip()
+            if body:
+                entries.append(f"{heading}\n{body}" if heading else body)
+            current.clear()
+
+    for line in (text or '').split('\n'):
+        if not line.strip():
+            flush()
+        elif HEADING.match(line):
+            flush()
+            heading = line.strip()
+        elif ENTRY_START.match(line):
+            flush()
+            current.append(line)
+        else:
+            current.append(line)
+    flush()
+
+    return entries
+
+
+class SummaryRetriever:
+    """기존 최종 정리 항목에 대한 BM25 검색
+
+    정리가 올라올 때마다 `add_message`로 항목을 추가하고, 새 논의 내용과 관련 있는 항목만 골라 프롬프트에 넣음
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.entries: List[str] = []
+        self.lengths: List[int] = []
+        # 토큰 -> [(항목 번호, 빈도)]
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add_entry(self, entry: str):
+        term_freqs = Counter(tokenize(entry))
+        if not term_freqs:
+            return
+
+        entry_id = len(self.entries)
+        self.entries.append(entry)
+        length = sum(term_freqs.values())
+        self.lengths.append(length)
+        self.total_length += length
+        for token, freq in term_freqs.items():
+            self.postings[token].append((entry_id, freq))
+
+    def add_message(self, text: str):
+        for entry in split_entries(text):
+            self.add_entry(entry)
+
+    def scores(self, query: str) -> Dict[int, float]:
+        if not self.entries:
+            return {}
+
+        num_entries = len(self.entries)
+        average_length = self.total_length / num_entries
+        scores = defaultdict(float)
+        for token in set(tokenize(query)):
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (num_entries - len(postings) + 0.5) / (len(postings) + 0.5))
+            for entry_id, freq in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[entry_id] / average_length)
+                scores[entry_id] += idf * freq * (self.k1 + 1) / (freq + norm)
+        return scores
+
+    def retrieve(self, query: str, top_k: int = DEFAULT_TOP_K, char_budget: int = DEFAULT_CHAR_BUDGET) -> List[str]:
+        """query와 관련도가 높은 항목을 top_k개, char_budget 글자 이내로 골라 원래(게시) 순서대로 반환
+
+        이전 결정이 나중에 바뀐 경우 LLM이 순서를 알 수 있도록 점수 순이 아니라 게시 순서로 정렬
+        """
+        ranked = sorted(self.scores(query).items(), key=lambda item: -item[1])
+
+        selected = []
+        used = 0
+        for entry_id, _ in ranked:
+            if len(selected) == top_k:
+                break
+            size = len(self.entries[entry_id])
+            if used + size > char_budget:
+                continue
+            selected.append(entry_id)
+            used += size
+
+        return [self.entries[entry_id] for entry_id in sorted(selected)]
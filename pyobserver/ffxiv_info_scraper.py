@@ -1,12 +1,26 @@
 from discord.ext import commands
 import discord
-from pyobserver.request_gemini import request_gemini, GeminiModels
-import requests
-from bs4 import BeautifulSoup
+import time
 import asyncio
+from pyobserver.request_gemini import request_gemini_stream
+from pyobserver.model_router import default_router
+from pyobserver.message_delivery import send_text, ProgressiveMessage
+
+_http_session = None
+
+def get_http_session():
+    """연결을 재사용하도록 requests 세션을 프로세스 전체에서 공유"""
+    global _http_session
+    if _http_session is None:
+        # requests는 명령어를 처음 실행할 때 로드
+        import requests
+        _http_session = requests.Session()
+    return _http_session
 
 def scrape_webpage(url):
-    response = requests.get(url)
+    from bs4 import BeautifulSoup
+
+    response = get_http_session().get(url)
     soup = BeautifulSoup(response.content, 'html.parser')
     
     text = soup.get_text(strip=True)
@@ -16,8 +30,6 @@ patch_note_urls = {
     '7.3': 'https://na.finalfantasyxiv.com/lodestone/topics/detail/c04405c6cbe8519a0b6c8aa5e4d88a5d447419c9'
 }
 
-CHUNK_SIZE = 1500 
-
 
 class FFXIVInfoScraper(commands.Cog):
     def __init__(self, bot):
@@ -26,7 +38,7 @@ class FFXIVInfoScraper(commands.Cog):
     @commands.command(name='summarize_patchnote', aliases=['패치요약'])
     async def summarize_patchnote(self, ctx, patch_version: str):
         await ctx.send(f"Scraping patch note for {patch_version}...")
-        webpage_content = scrape_webpage(patch_note_urls[patch_version])
+        webpage_content = await asyncio.to_thread(scrape_webpage, patch_note_urls[patch_version])
 
         prompt = f"""
         You are a helpful assistant that summarizes patchnotes.
@@ -40,19 +52,19 @@ class FFXIVInfoScraper(commands.Cog):
         """
 
 
-        await ctx.send(f"Summarizing patch note for {patch_version}...")
-        response = request_gemini(GeminiModels.GEMINI_2_5_FLASH, prompt)
-
-        text = response.text
+        header = f"Summarizing patch note for {patch_version}..."
+        processing_msg = await ctx.send(header)
+        # 생성되는 대로 처리 중 메시지를 수정하여 보여주고, 끝나면 전체 요약을 전송
+        decision = await default_router.route('patch_note', delta_chars=len(webpage_content))
+        start = time.perf_counter()
+        text = await ProgressiveMessage(processing_msg, header).consume(
+            request_gemini_stream(decision.model, prompt)
+        )
+        default_router.record(decision, time.perf_counter() - start)
         print(text)
+        await processing_msg.edit(content=f"✅ {patch_version} 패치 노트 요약 완료")
 
-        if len(text) > CHUNK_SIZE:
-            for i in range(0, len(text), CHUNK_SIZE):
-                chunk = text[i:i+CHUNK_SIZE]
-                await ctx.send(chunk)
-                await asyncio.sleep(1)
-        else:
-            await ctx.send(text)
+        await send_text(ctx, text, title=f"📝 {patch_version} 패치 노트 요약")
     
     @commands.command(name='healthcheck')
     async def healthcheck(self, ctx):
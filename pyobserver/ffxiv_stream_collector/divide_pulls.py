@@ -1,3 +1,59 @@
 """Divide pulls using FFXIVPullDetector
 
-"""
\ No newline at end of file
+Reads the pull-boundary sidecar written during recording (or runs the detector once if it is
+missing) and cuts every pull into its own clip with keyframe-aware stream copy.
+
+run ex)
+
+```sh
+python -m pyobserver.ffxiv_stream_collector.divide_pulls --video_path recordings/a/20250101_120000.mkv
+```
+"""
+import argparse
+import json
+from pathlib import Path
+
+from pyobserver.ffxiv_stream_collector.live_pull_detector import sidecar_path
+from pyobserver.ffxiv_stream_collector.video_index import cut_clips
+
+# Seconds kept before the pull start and after the pull end
+PADDING = 5.0
+
+
+def load_pulls(video_path, onnx_model_path=None):
+    path = sidecar_path(video_path)
+
+    if not path.exists():
+        if onnx_model_path is None:
+            raise FileNotFoundError(f"No pull sidecar for {video_path}, pass --onnx_model_path to detect pulls")
+
+        from pyobserver.ffxiv_stream_collector.live_pull_detector import LivePullDetector
+        LivePullDetector(onnx_model_path).analyze_recording(video_path)
+
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['pulls']
+
+
+def divide_pulls(video_path, output_dir=None, onnx_model_path=None, padding=PADDING, max_workers=None):
+    pulls = load_pulls(video_path, onnx_model_path)
+    if output_dir is None:
+        output_dir = Path(video_path).with_suffix('')
+
+    clips = [(pull['start'] - padding, pull['end'] + padding) for pull in pulls]
+    return cut_clips(video_path, clips, output_dir, max_workers)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--video_path", type=str, required=True)
+    parser.add_argument("--output_dir", type=str, default=None)
+    parser.add_argument("--onnx_model_path", type=str, default=None)
+    parser.add_argument("--padding", type=float, default=PADDING)
+    parser.add_argument("--max_workers", type=int, default=None)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    for output_path in divide_pulls(**vars(args)):
+        print("Saved:", output_path)
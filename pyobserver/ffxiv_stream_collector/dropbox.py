@@ -1,102 +1,202 @@
 import os
-import dropbox
+import json
+import time
+import hashlib
 from dotenv import load_dotenv
+from pyobserver.metrics import record_upload
 
 load_dotenv()
 
-def upload_to_dropbox(local_file_path):
+CHUNK_SIZE = 4 * 1024 * 1024  # 4MB 청크 (Dropbox content hash 블록 크기와 동일)
+UPLOAD_INDEX_FILE = 'dropbox_upload_index.json'
+
+_dropbox_client = None
+
+
+class DropboxContentHasher:
+    """Dropbox content hash 계산기
+
+    파일을 4MB 블록으로 나누어 각 블록의 SHA-256을 구하고, 블록 해시들을 이어붙인 값의 SHA-256을 최종 해시로 사용
+    https://www.dropbox.com/developers/reference/content-hash
     """
-    로컬 파일을 Dropbox에 업로드
-    
-    Args:
-        local_file_path: 업로드할 로컬 파일 경로 (예: '/home/user/video.mkv')
-        dropbox_dir: Dropbox 저장 디렉토리 (예: '/Videos')
-        access_token: Dropbox API 액세스 토큰
-    
+
+    def __init__(self):
+        self._overall = hashlib.sha256()
+        self._block = hashlib.sha256()
+        self._block_pos = 0
+
+    def update(self, data):
+        pos = 0
+        while pos < len(data):
+            if self._block_pos == CHUNK_SIZE:
+                self._overall.update(self._block.digest())
+                self._block = hashlib.sha256()
+                self._block_pos = 0
+
+            part = data[pos:pos + CHUNK_SIZE - self._block_pos]
+            self._block.update(part)
+            self._block_pos += len(part)
+            pos += len(part)
+
+    def hexdigest(self):
+        overall = self._overall.copy()
+        if self._block_pos > 0:
+            overall.update(self._block.digest())
+        return overall.hexdigest()
+
+
+def compute_dropbox_content_hash(local_file_path):
+    """로컬 파일의 Dropbox content hash 계산"""
+    hasher = DropboxContentHasher()
+    with open(local_file_path, 'rb') as f:
+        while chunk := f.read(CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def get_dropbox_client():
+    """Dropbox 클라이언트(내부 HTTP 세션 포함)를 프로세스 전체에서 재사용"""
+    global _dropbox_client
+    if _dropbox_client is None:
+        # dropbox SDK는 업로드할 때만 로드
+        import dropbox
+        _dropbox_client = dropbox.Dropbox(os.getenv("DROPBOX_ACCESS_TOKEN"))
+    return _dropbox_client
+
+
+def load_upload_index(index_file=UPLOAD_INDEX_FILE):
+    """업로드 인덱스 로드 (로컬 경로 -> 크기, 수정 시각, content hash, 공유 링크)"""
+    if os.path.exists(index_file):
+        try:
+            with open(index_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"업로드 인덱스 로드 실패: {e}")
+    return {}
+
+
+def save_upload_index(index, index_file=UPLOAD_INDEX_FILE):
+    """업로드 인덱스 저장"""
+    try:
+        with open(index_file, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+    except Exception as e:
+        print(f"업로드 인덱스 저장 실패: {e}")
+
+
+def get_remote_metadata(dbx, dropbox_path):
+    """Dropbox 파일 메타데이터 조회, 파일이 없으면 None"""
+    import dropbox
+
+    try:
+        metadata = dbx.files_get_metadata(dropbox_path)
+    except dropbox.exceptions.ApiError as e:
+        if e.error.is_path() and e.error.get_path().is_not_found():
+            return None
+        raise
+
+    if isinstance(metadata, dropbox.files.FileMetadata):
+        return metadata
+    return None
+
+
+def get_local_content_hash(local_file_path, index_entry):
+    """인덱스에 저장된 해시가 현재 파일과 일치하면 재사용하고, 아니면 다시 계산"""
+    stat = os.stat(local_file_path)
+    if (
+        index_entry
+        and index_entry.get('size') == stat.st_size
+        and index_entry.get('mtime') == stat.st_mtime
+        and index_entry.get('content_hash')
+    ):
+        return index_entry['content_hash']
+    return compute_dropbox_content_hash(local_file_path)
+
+
+def upload_file(dbx, local_file_path, dropbox_path):
+    """파일을 업로드하면서 content hash를 함께 계산
+
     Returns:
-        성공 시 True, 실패 시 False
+        업로드한 파일의 content hash
     """
-    dropbox_dir = '/'.join(local_file_path.split('/')[:-1])
+    import dropbox
 
-    # Dropbox 클라이언트 생성
-    dbx = dropbox.Dropbox(os.getenv("DROPBOX_ACCESS_TOKEN"))
-    
-    # 파일명 추출
     filename = os.path.basename(local_file_path)
-    
-    # Dropbox 경로는 반드시 /로 시작해야 함
-    if not dropbox_dir.startswith('/'):
-        dropbox_dir = '/' + dropbox_dir
-    
-    # Dropbox 경로 생성 (디렉토리가 /로 끝나지 않으면 추가)
-    if not dropbox_dir.endswith('/'):
-        dropbox_dir += '/'
-    dropbox_path = dropbox_dir + filename
-    
-    # 파일 크기 확인
     file_size = os.path.getsize(local_file_path)
-    
-    CHUNK_SIZE = 4 * 1024 * 1024  # 4MB 청크
-    
-    try:
-        with open(local_file_path, 'rb') as f:
-            # 파일이 작으면 한번에 업로드
-            if file_size <= CHUNK_SIZE:
-                print(f"업로드 중: {filename}")
-                dbx.files_upload(f.read(), dropbox_path, mode=dropbox.files.WriteMode.overwrite)
-                print(f"업로드 완료: {dropbox_path}")
-            
-            # 큰 파일은 청크로 나누어 업로드
-            else:
-                print(f"대용량 파일 업로드 중: {filename} ({file_size / 1024 / 1024:.1f} MB)")
-                
-                upload_session_start_result = dbx.files_upload_session_start(f.read(CHUNK_SIZE))
-                cursor = dropbox.files.UploadSessionCursor(
-                    session_id=upload_session_start_result.session_id,
-                    offset=f.tell()
-                )
-                
-                # 남은 청크 업로드
-                while f.tell() < file_size:
-                    if (file_size - f.tell()) <= CHUNK_SIZE:
-                        # 마지막 청크
-                        remaining = f.read(CHUNK_SIZE)
-                        dbx.files_upload_session_finish(
-                            remaining,
-                            cursor,
-                            dropbox.files.CommitInfo(path=dropbox_path, mode=dropbox.files.WriteMode.overwrite)
-                        )
-                    else:
-                        # 중간 청크
-                        dbx.files_upload_session_append_v2(f.read(CHUNK_SIZE), cursor)
-                        cursor.offset = f.tell()
-                    
-                    # 진행률 표시
-                    progress = f.tell() / file_size * 100
-                    print(f"진행률: {progress:.1f}%")
-                
-                print(f"업로드 완료: {dropbox_path}")
-        
-    except Exception as e:
-        print(f"업로드 실패: {e}")
+    hasher = DropboxContentHasher()
+    start = time.perf_counter()
+
+    with open(local_file_path, 'rb') as f:
+        # 파일이 작으면 한번에 업로드
+        if file_size <= CHUNK_SIZE:
+            print(f"업로드 중: {filename}")
+            data = f.read()
+            hasher.update(data)
+            metadata = dbx.files_upload(data, dropbox_path, mode=dropbox.files.WriteMode.overwrite)
+
+        # 큰 파일은 청크로 나누어 업로드
+        else:
+            print(f"대용량 파일 업로드 중: {filename} ({file_size / 1024 / 1024:.1f} MB)")
+
+            chunk = f.read(CHUNK_SIZE)
+            hasher.update(chunk)
+            upload_session_start_result = dbx.files_upload_session_start(chunk)
+            cursor = dropbox.files.UploadSessionCursor(
+                session_id=upload_session_start_result.session_id,
+                offset=f.tell()
+            )
+
+            # 남은 청크 업로드
+            while f.tell() < file_size:
+                chunk = f.read(CHUNK_SIZE)
+                hasher.update(chunk)
+                if f.tell() >= file_size:
+                    # 마지막 청크
+                    metadata = dbx.files_upload_session_finish(
+                        chunk,
+                        cursor,
+                        dropbox.files.CommitInfo(path=dropbox_path, mode=dropbox.files.WriteMode.overwrite)
+                    )
+                else:
+                    # 중간 청크
+                    dbx.files_upload_session_append_v2(chunk, cursor)
+                    cursor.offset = f.tell()
+
+                # 진행률 표시
+                progress = f.tell() / file_size * 100
+                print(f"진행률: {progress:.1f}%")
+
+    record_upload(file_size, time.perf_counter() - start)
+
+    content_hash = hasher.hexdigest()
+    if metadata.content_hash != content_hash:
+        print(f"경고: 업로드된 파일의 content hash가 일치하지 않습니다: {dropbox_path}")
+
+    print(f"업로드 완료: {dropbox_path}")
+    return content_hash
+
+
+def get_share_url(dbx, dropbox_path):
+    """공유 링크 조회 또는 생성"""
+    import dropbox
 
     try:
-        existing_links = dbx.sharing_list_shared_links(path=dropbox_path)
+        existing_links = dbx.sharing_list_shared_links(path=dropbox_path, direct_only=True)
         if existing_links.links:
             share_url = existing_links.links[0].url
         else:
             # 새 공유 링크 생성
             shared_link = dbx.sharing_create_shared_link_with_settings(dropbox_path)
             share_url = shared_link.url
-        
+
         # dl=0을 dl=1로 변경하면 다이렉트 다운로드 링크가 됨
         direct_url = share_url.replace('dl=0', 'dl=1')
-        
+
         print(f"공유 링크: {share_url}")
         print(f"다이렉트 링크: {direct_url}")
-        
+
         return share_url
-        
+
     except dropbox.exceptions.ApiError as e:
         # 이미 공유 링크가 있는 경우
         if e.error.is_shared_link_already_exists():
@@ -107,3 +207,115 @@ def upload_to_dropbox(local_file_path):
                 return share_url
         print(f"공유 링크 생성 실패: {e}")
         return None
+
+
+def upload_to_dropbox(local_file_path, dbx=None, index=None):
+    """
+    로컬 파일을 Dropbox에 업로드
+
+    Dropbox에 같은 content hash의 파일이 이미 있으면 전송을 건너뛰고,
+    공유 링크는 로컬 인덱스에 캐시하여 재실행 시 메타데이터 조회만 하도록 함
+
+    Args:
+        local_file_path: 업로드할 로컬 파일 경로 (예: '/home/user/video.mkv')
+        dbx: 사용할 Dropbox 클라이언트 (없으면 공유 클라이언트)
+        index: 재사용할 업로드 인덱스 (없으면 파일에서 로드 후 저장)
+
+    Returns:
+        성공 시 공유 링크, 실패 시 None
+    """
+    dropbox_dir = '/'.join(local_file_path.split('/')[:-1])
+
+    # Dropbox 클라이언트 생성
+    if dbx is None:
+        dbx = get_dropbox_client()
+
+    owns_index = index is None
+    if owns_index:
+        index = load_upload_index()
+
+    # 파일명 추출
+    filename = os.path.basename(local_file_path)
+
+    # Dropbox 경로는 반드시 /로 시작해야 함
+    if not dropbox_dir.startswith('/'):
+        dropbox_dir = '/' + dropbox_dir
+
+    # Dropbox 경로 생성 (디렉토리가 /로 끝나지 않으면 추가)
+    if not dropbox_dir.endswith('/'):
+        dropbox_dir += '/'
+    dropbox_path = dropbox_dir + filename
+
+    index_entry = index.get(local_file_path)
+    if index_entry and index_entry.get('dropbox_path') != dropbox_path:
+        index_entry = None
+
+    content_hash = None
+    try:
+        remote = get_remote_metadata(dbx, dropbox_path)
+        file_size = os.path.getsize(local_file_path)
+
+        # 크기가 같을 때만 해시를 비교 (크기가 다르면 읽지 않고 바로 업로드)
+        if remote is not None and remote.size == file_size:
+            content_hash = get_local_content_hash(local_file_path, index_entry)
+
+        if content_hash is not None and remote.content_hash == content_hash:
+            print(f"동일한 파일이 이미 존재하여 업로드를 건너뜁니다: {dropbox_path}")
+        else:
+            content_hash = upload_file(dbx, local_file_path, dropbox_path)
+            # 원격 파일이 바뀌었으므로 캐시된 링크는 다시 확인
+            if index_entry:
+                index_entry.pop('share_url', None)
+
+    except Exception as e:
+        print(f"업로드 실패: {e}")
+
+    if index_entry and index_entry.get('content_hash') == content_hash and index_entry.get('share_url'):
+        share_url = index_entry['share_url']
+        print(f"공유 링크 (캐시): {share_url}")
+    else:
+        share_url = get_share_url(dbx, dropbox_path)
+
+    if content_hash is not None:
+        stat = os.stat(local_file_path)
+        index[local_file_path] = {
+            'dropbox_path': dropbox_path,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'content_hash': content_hash,
+            'share_url': share_url,
+        }
+        if owns_index:
+            save_upload_index(index)
+
+    return share_url
+
+
+def upload_directory_to_dropbox(local_dir='recordings', extensions=('.mkv',)):
+    """
+    디렉토리 안의 녹화 파일들을 일괄 업로드
+
+    이미 올라간 파일은 메타데이터 조회만으로 건너뛰므로 실패한 배치를 그대로 다시 실행해도 됨
+
+    Returns:
+        로컬 파일 경로 -> 공유 링크 딕셔너리
+    """
+    dbx = get_dropbox_client()
+    index = load_upload_index()
+    share_urls = {}
+
+    for root, _, files in os.walk(local_dir):
+        for filename in sorted(files):
+            if not filename.endswith(extensions):
+                continue
+
+            local_file_path = os.path.join(root, filename).replace(os.sep, '/')
+            share_urls[local_file_path] = upload_to_dropbox(local_file_path, dbx=dbx, index=index)
+            # 중간에 실패해도 진행 상황이 남도록 파일마다 저장
+            save_upload_index(index)
+
+    return share_urls
+
+
+if __name__ == '__main__':
+    upload_directory_to_dropbox()
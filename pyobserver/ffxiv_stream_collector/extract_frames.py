@@ -0,0 +1,190 @@
+"""Extract training frames from recorded streams
+
+Every recording is split into fixed-length time segments and each segment is decoded by its own
+single-threaded ffmpeg process, so a handful of long VODs still keeps every core busy. Frames are
+sampled at `--fps`, resized to the training resolution by ffmpeg and written either into the
+dataset image layout (`<output_dir>/images/`) or packed into one tar shard per segment
+(`<output_dir>/shards/`).
+
+Finished segments are recorded in `<output_dir>/extract_manifest.json`, so an interrupted run
+continues where it stopped and adding recordings only extracts the new ones.
+
+run ex)
+
+```sh
+python -m pyobserver.ffxiv_stream_collector.extract_frames --video_paths recordings/a/*.mkv --output_dir data/ffxiv_pulldetector_v2 --fps 1
+```
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import subprocess
+import tarfile
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from pyobserver.ffxiv_stream_collector.video_index import probe_video_stream
+
+MANIFEST_FILE = 'extract_manifest.json'
+
+DEFAULT_FPS = 1.0
+# Same as the Resize in pyffxivdata.dataset, so training does not decode full HD frames only to shrink them
+DEFAULT_WIDTH = 480
+DEFAULT_HEIGHT = 480
+# Length of one ffmpeg job; shorter segments balance better across cores but seek more often
+SEGMENT_SEC = 120.0
+
+
+def frame_prefix(video_path):
+    """`recordings/a/20250101_120000.mkv` -> `a_20250101_120000`"""
+    video_path = Path(video_path)
+    return f"{video_path.parent.name}_{video_path.stem}"
+
+
+def plan_segments(duration, fps, segment_sec=SEGMENT_SEC):
+    """Split the frame indices of a recording into [(first, last)) ranges of about segment_sec each"""
+    total = int(math.floor(duration * fps))
+    frames_per_segment = max(1, int(round(segment_sec * fps)))
+    return [(first, min(first + frames_per_segment, total)) for first in range(0, total, frames_per_segment)]
+
+
+def _extract_cmd(video_path, first, last, settings, pattern):
+    fps = settings['fps']
+    return [
+        'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+        # One decoder/filter thread per process, parallelism comes from running many segments at once
+        '-threads', '1', '-filter_threads', '1',
+        '-ss', f'{first / fps:.6f}',
+        '-i', str(video_path),
+        '-an', '-sn',
+        '-vf', f"fps={fps},scale={settings['width']}:{settings['height']}:flags=area",
+        '-frames:v', str(last - first),
+        '-start_number', str(first),
+        '-q:v', '2',
+        str(pattern),
+    ]
+
+
+def extract_segment(video_path, first, last, settings, output_dir):
+    """Extract one segment into a temporary directory and move the finished frames into place
+
+    Returns:
+        names of the extracted frames and the shard path (None for the images layout)
+    """
+    output_dir = Path(output_dir)
+    prefix = frame_prefix(video_path)
+    tmp_root = output_dir / '.extract_tmp'
+    tmp_root.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.TemporaryDirectory(dir=tmp_root) as tmp_dir:
+        cmd = _extract_cmd(video_path, first, last, settings, Path(tmp_dir) / f"{prefix}_%07d.jpg")
+        subprocess.run(cmd, check=True, capture_output=True)
+        names = sorted(os.listdir(tmp_dir))
+
+        if settings['format'] == 'tar':
+            shard_path = output_dir / 'shards' / f"{prefix}_{first:07d}.tar"
+            shard_path.parent.mkdir(parents=True, exist_ok=True)
+            partial_path = shard_path.with_suffix('.tar.partial')
+            # JPEG is already compressed, an uncompressed tar keeps shard reads sequential and cheap
+            with tarfile.open(partial_path, 'w') as tar:
+                for name in names:
+                    tar.add(Path(tmp_dir) / name, arcname=name)
+            os.replace(partial_path, shard_path)
+            return names, str(shard_path)
+
+        image_dir = output_dir / 'images'
+        image_dir.mkdir(parents=True, exist_ok=True)
+        for name in names:
+            os.replace(Path(tmp_dir) / name, image_dir / name)
+        return names, None
+
+
+def load_manifest(output_dir, settings):
+    path = Path(output_dir) / MANIFEST_FILE
+    if not path.exists():
+        return {'settings': settings, 'segments': {}}
+
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest['settings'] != settings:
+        raise ValueError(
+            f"{path} was written with {manifest['settings']}, use a new output_dir for {settings}"
+        )
+    return manifest
+
+
+def save_manifest(output_dir, manifest):
+    path = Path(output_dir) / MANIFEST_FILE
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def extract_frames(video_paths, output_dir, fps=DEFAULT_FPS, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT,
+                   output_format='images', segment_sec=SEGMENT_SEC, max_workers=None):
+    """Extract frames of all recordings in parallel, skipping segments already in the manifest
+
+    Returns:
+        the manifest ({'settings': ..., 'segments': {'<video>:<first frame>': {...}}})
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    settings = {'fps': fps, 'width': width, 'height': height, 'format': output_format}
+    manifest = load_manifest(output_dir, settings)
+
+    jobs = []
+    for video_path in video_paths:
+        duration = probe_video_stream(video_path)['duration']
+        for first, last in plan_segments(duration, fps, segment_sec):
+            key = f"{Path(video_path).as_posix()}:{first}"
+            if key not in manifest['segments']:
+                jobs.append((key, video_path, first, last))
+
+    print(f"{len(jobs)} segments to extract, {len(manifest['segments'])} already done")
+    start = time.perf_counter()
+    num_frames = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        futures = {
+            executor.submit(extract_segment, video_path, first, last, settings, output_dir): (key, video_path, first)
+            for key, video_path, first, last in jobs
+        }
+        for future in as_completed(futures):
+            key, video_path, first = futures[future]
+            try:
+                names, shard = future.result()
+            except subprocess.CalledProcessError as e:
+                print(f"Failed {key}: {e.stderr.decode(errors='replace').strip()}")
+                continue
+
+            manifest['segments'][key] = {'video': str(video_path), 'first': first, 'frames': names, 'shard': shard}
+            # Saved after every segment so an interrupted run resumes from here
+            save_manifest(output_dir, manifest)
+            num_frames += len(names)
+
+    shutil.rmtree(output_dir / '.extract_tmp', ignore_errors=True)
+    elapsed = time.perf_counter() - start
+    print(f"Extracted {num_frames} frames in {elapsed:.1f}s ({num_frames / max(elapsed, 1e-9):.1f} frames/s)")
+    return manifest
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--video_paths", type=str, nargs='+', required=True)
+    parser.add_argument("--output_dir", type=str, required=True)
+    parser.add_argument("--fps", type=float, default=DEFAULT_FPS)
+    parser.add_argument("--width", type=int, default=DEFAULT_WIDTH)
+    parser.add_argument("--height", type=int, default=DEFAULT_HEIGHT)
+    parser.add_argument("--output_format", type=str, choices=['images', 'tar'], default='images')
+    parser.add_argument("--segment_sec", type=float, default=SEGMENT_SEC)
+    parser.add_argument("--max_workers", type=int, default=None)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    extract_frames(**vars(parse_args()))
@@ -0,0 +1,262 @@
+"""Live pull detection on the stream being recorded.
+
+Frames are sampled from the recording through an ffmpeg pipe, scored with the exported
+ONNX FFXIVPullDetector in a worker thread pool, and turned into pull boundaries that are
+written as a JSON sidecar next to the `.mkv` file.
+"""
+import json
+import subprocess
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import onnxruntime as ort
+
+SAMPLE_FPS = 1
+# Used only when the exported model has a dynamic input size
+MODEL_W = 384
+MODEL_H = 384
+
+# Same thresholds as autorecorder/ffxiv-auto-recorder/components/PullDetectorModel.tsx
+START_THRESH = 0.7
+END_THRESH = 1.5
+
+NORMALIZE_VALUES = np.array([0.485, 0.456, 0.406], dtype=np.float32).reshape(3, 1, 1)
+STD_VALUES = np.array([0.229, 0.224, 0.225], dtype=np.float32).reshape(3, 1, 1)
+
+
+def sidecar_path(video_path):
+    """`recordings/a/20250101_120000.mkv` -> `recordings/a/20250101_120000.pulls.json`"""
+    return Path(video_path).with_suffix('.pulls.json')
+
+
+def model_input_size(session):
+    """(H, W) of the model input, checkpoints trained at another image_size export another input size"""
+    _, _, height, width = session.get_inputs()[0].shape
+    return (
+        height if isinstance(height, int) else MODEL_H,
+        width if isinstance(width, int) else MODEL_W,
+    )
+
+
+def sampled_frames_args(sample_fps=SAMPLE_FPS, width=MODEL_W, height=MODEL_H):
+    """ffmpeg output args that write sampled, model-sized RGB frames to stdout"""
+    return [
+        '-map', '0:v:0',
+        '-vf', f'fps={sample_fps},scale={width}:{height}',
+        '-pix_fmt', 'rgb24',
+        '-f', 'rawvideo',
+        'pipe:1',
+    ]
+
+
+class PullBoundaryTracker:
+    """Turns per-frame scores into pull start/end markers, like `isPulling` in PullDetectorModel.tsx"""
+
+    def __init__(self, on_marker=None):
+        self.on_marker = on_marker
+        self.is_pulling = False
+        self.current_start = None
+        self.pulls = []
+        self.markers = []
+
+    def update(self, timestamp, scores):
+        start_score, end_score = float(scores[0]), float(scores[1])
+
+        if not self.is_pulling and start_score > START_THRESH:
+            self.is_pulling = True
+            self.current_start = timestamp
+            self._add_marker('pull_start', timestamp, start_score)
+        elif self.is_pulling and end_score > END_THRESH:
+            self.is_pulling = False
+            self.pulls.append({'start': self.current_start, 'end': timestamp})
+            self._add_marker('pull_end', timestamp, end_score)
+            self.current_start = None
+
+    def finish(self, timestamp):
+        """Close a pull that is still running when the recording ends"""
+        if self.is_pulling:
+            self.pulls.append({'start': self.current_start, 'end': timestamp})
+            self.is_pulling = False
+            self.current_start = None
+
+    def _add_marker(self, marker_type, timestamp, score):
+        marker = {'type': marker_type, 'time': timestamp, 'score': score}
+        self.markers.append(marker)
+        if self.on_marker:
+            self.on_marker(marker)
+
+
+class LivePullDetector:
+    """Scores sampled frames with the ONNX pull detector in a thread pool.
+
+    Args:
+        onnx_model_path: Path of the model exported by `scripts/convert_pth_to_onnx.py`.
+        sample_fps: Number of frames scored per second of video.
+        num_workers: Number of scoring threads sharing one ONNX Runtime session.
+    """
+
+    def __init__(self, onnx_model_path, sample_fps=SAMPLE_FPS, num_workers=2):
+        self.sample_fps = sample_fps
+        self.num_workers = num_workers
+
+        session_options = ort.SessionOptions()
+        session_options.intra_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            str(onnx_model_path),
+            sess_options=session_options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_name = self.session.get_inputs()[0].name
+        self.model_h, self.model_w = model_input_size(self.session)
+
+    def preprocess(self, frame):
+        """(H, W, 3) uint8 RGB -> (1, 3, H, W) normalized float32"""
+        image = frame.astype(np.float32).transpose(2, 0, 1) / 255.0
+        image = (image - NORMALIZE_VALUES) / STD_VALUES
+        return image[np.newaxis]
+
+    def score(self, frame):
+        outputs = self.session.run(None, {self.input_name: self.preprocess(frame)})
+        return outputs[0].reshape(-1)
+
+    def analyze_pipe(self, pipe, on_marker=None, drop_when_busy=False, prefilter=None):
+        """Read raw frames from `pipe` until EOF and track pull boundaries.
+
+        Frames are scored out of order by the pool but consumed in order. With
+        `drop_when_busy`, frames that arrive while every worker is still busy are
+        skipped so a slow CPU never stalls the ffmpeg process writing the recording.
+        Frames rejected by `prefilter` (a ScenePrefilter) reuse the previous scores.
+        """
+        frame_size = self.model_w * self.model_h * 3
+        tracker = PullBoundaryTracker(on_marker)
+        # (timestamp, future), future is None for frames skipped by the prefilter
+        pending = deque()
+        # Only frames submitted to the pool count towards max_pending
+        max_pending = self.num_workers * 2
+        in_flight = 0
+        frame_idx = 0
+        dropped = 0
+        last_scores = None
+
+        def consume():
+            nonlocal last_scores, in_flight
+            done_timestamp, future = pending.popleft()
+            if future is not None:
+                last_scores = future.result()
+                in_flight -= 1
+            if last_scores is not None:
+                tracker.update(done_timestamp, last_scores)
+
+        with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+            while True:
+                data = pipe.read(frame_size)
+                if not data or len(data) < frame_size:
+                    break
+
+                timestamp = frame_idx / self.sample_fps
+                frame_idx += 1
+
+                while pending and (pending[0][1] is None or pending[0][1].done()):
+                    consume()
+
+                if in_flight >= max_pending:
+                    if drop_when_busy:
+                        dropped += 1
+                        continue
+                    while in_flight >= max_pending:
+                        consume()
+
+                frame = np.frombuffer(data, dtype=np.uint8).reshape(self.model_h, self.model_w, 3)
+                if prefilter is not None:
+                    if not prefilter.should_score(frame):
+                        prefilter.mark_skipped()
+                        pending.append((timestamp, None))
+                        continue
+                    prefilter.mark_scored()
+
+                pending.append((timestamp, executor.submit(self.score, frame)))
+                in_flight += 1
+
+            while pending:
+                consume()
+
+        tracker.finish(frame_idx / self.sample_fps)
+        if dropped:
+            print(f"Live pull detection dropped {dropped}/{frame_idx} frames")
+        if prefilter is not None:
+            print(f"Scene prefilter skipped {prefilter.skip_fraction:.1%} of frames")
+
+        return tracker
+
+    def analyze_recording(self, video_path, on_marker=None, prefilter=None, save_sidecar=True):
+        """Run pull detection over an already recorded file"""
+        cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-i', str(video_path)] + sampled_frames_args(self.sample_fps, self.model_w, self.model_h)
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+        try:
+            tracker = self.analyze_pipe(process.stdout, on_marker, prefilter=prefilter)
+        finally:
+            process.stdout.close()
+            process.wait()
+
+        if save_sidecar:
+            self.write_sidecar(video_path, tracker)
+        return tracker
+
+    def write_sidecar(self, video_path, tracker):
+        data = {
+            'video': Path(video_path).name,
+            'sample_fps': self.sample_fps,
+            'pulls': tracker.pulls,
+            'markers': tracker.markers,
+        }
+        with open(sidecar_path(video_path), 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def record_with_live_analysis(channel_url, output_file, record_time, detector, on_marker=None, prefilter=None):
+    """Record `channel_url` into `output_file` while scoring sampled frames of the same stream.
+
+    streamlink writes the stream to stdout and a single ffmpeg process both remuxes it into
+    the `.mkv` file and emits sampled frames, so the stream is downloaded only once.
+    """
+    streamlink_cmd = [
+        'streamlink',
+        '--retry-streams', '3',
+        '--retry-open', '3',
+        channel_url,
+        'best',
+        '-O',
+    ]
+    ffmpeg_cmd = [
+        'ffmpeg', '-hide_banner', '-loglevel', 'error',
+        '-i', 'pipe:0',
+        '-map', '0', '-c', 'copy', '-f', 'matroska', output_file,
+    ] + sampled_frames_args(detector.sample_fps, detector.model_w, detector.model_h)
+
+    print(f"Running: {' '.join(streamlink_cmd)} | {' '.join(ffmpeg_cmd)}")
+    streamlink = subprocess.Popen(streamlink_cmd, stdout=subprocess.PIPE)
+    ffmpeg = subprocess.Popen(ffmpeg_cmd, stdin=streamlink.stdout, stdout=subprocess.PIPE)
+    # ffmpeg owns the pipe now; closing our copy lets streamlink see SIGPIPE if ffmpeg exits
+    streamlink.stdout.close()
+
+    def stop_recording():
+        if streamlink.poll() is None:
+            streamlink.terminate()
+            print(f"Recording stopped after {record_time} seconds")
+
+    timer = threading.Timer(record_time, stop_recording)
+    timer.start()
+    try:
+        tracker = detector.analyze_pipe(ffmpeg.stdout, on_marker, drop_when_busy=True, prefilter=prefilter)
+    finally:
+        timer.cancel()
+        stop_recording()
+        ffmpeg.stdout.close()
+        ffmpeg.wait()
+        streamlink.wait()
+
+    detector.write_sidecar(output_file, tracker)
+    return tracker
@@ -1,23 +1,66 @@
 from datetime import datetime
+import asyncio
+import logging
 import os
 import subprocess
-import threading
 from discord.ext import commands
 from pyobserver.ffxiv_stream_collector.dropbox import upload_to_dropbox
 import discord.utils
 
+logger = logging.getLogger(__name__)
+
 class LiveStreamRecorder(commands.Cog):
 
-    def __init__(self, result_channel_name):
+    def __init__(self, result_channel_name, onnx_model_path=None):
         self.result_channel_name = result_channel_name
+        # 모델 경로가 주어지면 녹화 중에 풀 구간을 실시간으로 탐지
+        self.onnx_model_path = onnx_model_path
+        self.pull_detector = None
+        # 이벤트 루프는 태스크를 약한 참조로만 들고 있으므로 녹화가 끝날 때까지 여기서 참조 유지
+        self.recording_tasks = set()
+
+    def export_state(self):
+        """확장 리로드 시 새 cog로 넘겨줄 상태 (로드된 ONNX 세션 재사용, 진행 중인 녹화 태스크 유지)"""
+        return {
+            'onnx_model_path': self.onnx_model_path,
+            'pull_detector': self.pull_detector,
+            'recording_tasks': self.recording_tasks,
+        }
+
+    def import_state(self, state):
+        # 완료 콜백이 같은 set에서 지우므로 set 객체를 그대로 넘겨받음
+        self.recording_tasks = state.get('recording_tasks', self.recording_tasks)
+
+        pull_detector = state['pull_detector']
+        if pull_detector is None or state['onnx_model_path'] != self.onnx_model_path:
+            return
+
+        # live_pull_detector.py가 바뀌어 헬퍼로 다시 로드된 경우 옛 클래스의 인스턴스는 버리고 새로 만듦
+        from pyobserver.ffxiv_stream_collector.live_pull_detector import LivePullDetector
+        if type(pull_detector) is LivePullDetector:
+            self.pull_detector = pull_detector
+
+    def get_pull_detector(self):
+        if self.onnx_model_path is None:
+            return None
+
+        if self.pull_detector is None:
+            from pyobserver.ffxiv_stream_collector.live_pull_detector import LivePullDetector
+            self.pull_detector = LivePullDetector(self.onnx_model_path)
+
+        return self.pull_detector
 
     @commands.command(name='record_stream')
-    async def record_stream(self, ctx, channel_url, record_time=3600):
-        new_thread = threading.Thread(target=self.record_single_stream, args=(channel_url, record_time, ctx)).start()
+    async def record_stream(self, ctx, channel_url, record_time: int = 3600):
+        task = asyncio.create_task(self.record_single_stream(channel_url, record_time, ctx))
+        self.recording_tasks.add(task)
+        task.add_done_callback(self.recording_tasks.discard)
+        task.add_done_callback(log_task_exception)
 
 
-    async def record_single_stream(self, channel_url, record_time=3600, ctx):
+    async def record_single_stream(self, channel_url, record_time, ctx):
         result_channel = discord.utils.get(ctx.guild.text_channels, name=self.result_channel_name)
+        loop = asyncio.get_running_loop()
         
         if channel_url.startswith('https://www.twitch.tv/'):
             channel_name = channel_url.split('/')[-1]
@@ -32,15 +75,35 @@ class LiveStreamRecorder(commands.Cog):
             output_file = f"recordings/{channel_name}/{datetime.now().strftime('%Y%m%d_%H%M%S')}.mkv"
 
             await ctx.send(f"Recording stream: {channel_url}")
-            self.record_local(channel_url, output_file, record_time)
+            pull_detector = self.get_pull_detector()
+            if pull_detector is None:
+                await asyncio.to_thread(self.record_local, channel_url, output_file, record_time)
+                pulls = None
+            else:
+                from pyobserver.ffxiv_stream_collector.live_pull_detector import record_with_live_analysis
+                from pyobserver.ffxiv_stream_collector.scene_filter import ScenePrefilter
+
+                def post_marker(marker, output_file=output_file):
+                    # 분석 스레드에서 호출되므로 봇 이벤트 루프로 전송을 넘김
+                    text = f"[{output_file.split('/')[-1][:-4]}] {marker['type']} at {marker['time']:.0f}s"
+                    asyncio.run_coroutine_threadsafe(result_channel.send(text), loop)
+
+                tracker = await asyncio.to_thread(
+                    record_with_live_analysis, channel_url, output_file, record_time, pull_detector, post_marker,
+                    ScenePrefilter()
+                )
+                pulls = tracker.pulls
 
             await ctx.send(f"Saving output to Dropbox")
-            public_url = upload_to_dropbox(output_file)
+            public_url = await asyncio.to_thread(upload_to_dropbox, output_file)
 
             await result_channel.send(f"--------------------------------------------------")
             await result_channel.send(f"New recording for {channel_url}")
             await result_channel.send(embed=discord.Embed(description=f"Timestamp: {output_file.split('/')[-1][:-4]}"))
             await result_channel.send(embed=discord.Embed(description=f"Download link: {public_url}"))
+            if pulls is not None:
+                pull_text = '\n'.join(f"{i + 1}. {pull['start']:.0f}s ~ {pull['end']:.0f}s" for i, pull in enumerate(pulls))
+                await result_channel.send(embed=discord.Embed(description=f"Pulls: {len(pulls)}\n{pull_text}"[:4096]))
             await result_channel.send(f"--------------------------------------------------")
 
             record_cnt += 1
@@ -74,6 +137,10 @@ class LiveStreamRecorder(commands.Cog):
         else:
             print("File not created!")
 
+def log_task_exception(task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Recording task failed: {task.exception()!r}", exc_info=task.exception())
+
 def get_channel_name_ytdlp(video_url):
     """
     yt-dlp를 사용해 YouTube 영상 정보 가져오기
@@ -109,4 +176,4 @@ def get_channel_name_ytdlp(video_url):
     return None
 
 async def setup(bot):
-    await bot.add_cog(LiveStreamRecorder('스트림-raw'))
+    await bot.add_cog(LiveStreamRecorder('스트림-raw', os.getenv('PULL_DETECTOR_ONNX_PATH')))
@@ -0,0 +1,123 @@
+"""Scene-change prefilter in front of the pull detector.
+
+Lobby waits and wipe screens produce long runs of near-identical frames. The prefilter compares
+a downscaled grayscale thumbnail of each frame with the last frame that was sent to the model
+and only lets frames through when they changed beyond a threshold, or when a keepalive frame is
+due. The model's predictions for skipped frames are carried forward.
+
+Report on a sample recording:
+
+```sh
+python -m pyobserver.ffxiv_stream_collector.scene_filter --video_path recordings/a/20250101_120000.mkv --onnx_model_path ffxiv_pull_detector.onnx
+```
+"""
+import argparse
+import time
+
+import numpy as np
+
+# Mean absolute difference (0-255) between thumbnails above which a frame is scored
+DIFF_THRESHOLD = 4.0
+# Always score at least one frame out of this many, even when nothing changes
+KEEPALIVE_FRAMES = 10
+THUMBNAIL_SIZE = 32
+
+GRAY_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def thumbnail(frame, size=THUMBNAIL_SIZE):
+    """(H, W, 3) uint8 RGB -> (size, size) float32 grayscale by block averaging"""
+    h, w, _ = frame.shape
+    bh, bw = h // size, w // size
+    gray = frame[:bh * size, :bw * size].astype(np.float32) @ GRAY_WEIGHTS
+    return gray.reshape(size, bh, size, bw).mean(axis=(1, 3))
+
+
+class ScenePrefilter:
+    """Decides which frames need a model forward pass.
+
+    Stateful per video: create a new instance for every recording.
+    """
+
+    def __init__(self, threshold=DIFF_THRESHOLD, keepalive=KEEPALIVE_FRAMES, thumbnail_size=THUMBNAIL_SIZE):
+        self.threshold = threshold
+        self.keepalive = keepalive
+        self.thumbnail_size = thumbnail_size
+
+        self.last_thumbnail = None
+        self.candidate_thumbnail = None
+        self.frames_since_scored = 0
+        self.frames_seen = 0
+        self.frames_scored = 0
+
+    def should_score(self, frame):
+        """Whether `frame` needs a model forward pass.
+
+        Does not change the state, call `mark_scored` once the frame is actually sent to the model
+        or `mark_skipped` when its scores are carried forward.
+        """
+        self.candidate_thumbnail = thumbnail(frame, self.thumbnail_size)
+        return (
+            self.last_thumbnail is None
+            or self.frames_since_scored + 1 >= self.keepalive
+            or np.abs(self.candidate_thumbnail - self.last_thumbnail).mean() > self.threshold
+        )
+
+    def mark_scored(self):
+        self.frames_seen += 1
+        self.last_thumbnail = self.candidate_thumbnail
+        self.frames_since_scored = 0
+        self.frames_scored += 1
+
+    def mark_skipped(self):
+        self.frames_seen += 1
+        self.frames_since_scored += 1
+
+    @property
+    def skip_fraction(self):
+        if self.frames_seen == 0:
+            return 0.0
+        return 1 - self.frames_scored / self.frames_seen
+
+    @property
+    def model_speedup(self):
+        """Reduction in model forward passes"""
+        if self.frames_scored == 0:
+            return 1.0
+        return self.frames_seen / self.frames_scored
+
+
+def report(video_path, onnx_model_path, threshold=DIFF_THRESHOLD, keepalive=KEEPALIVE_FRAMES):
+    from pyobserver.ffxiv_stream_collector.live_pull_detector import LivePullDetector
+
+    detector = LivePullDetector(onnx_model_path)
+
+    start_time = time.perf_counter()
+    baseline = detector.analyze_recording(video_path, save_sidecar=False)
+    baseline_time = time.perf_counter() - start_time
+
+    prefilter = ScenePrefilter(threshold, keepalive)
+    start_time = time.perf_counter()
+    filtered = detector.analyze_recording(video_path, prefilter=prefilter, save_sidecar=False)
+    filtered_time = time.perf_counter() - start_time
+
+    print(f"Frames: {prefilter.frames_seen}, scored: {prefilter.frames_scored}")
+    print(f"Skipped fraction: {prefilter.skip_fraction:.1%}")
+    print(f"Model forward reduction: {prefilter.model_speedup:.2f}x")
+    print(f"Wall clock without prefilter: {baseline_time:.1f}s, with prefilter: {filtered_time:.1f}s ({baseline_time / filtered_time:.2f}x)")
+    print(f"Pulls without prefilter: {baseline.pulls}")
+    print(f"Pulls with prefilter: {filtered.pulls}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--video_path", type=str, required=True)
+    parser.add_argument("--onnx_model_path", type=str, required=True)
+    parser.add_argument("--threshold", type=float, default=DIFF_THRESHOLD)
+    parser.add_argument("--keepalive", type=int, default=KEEPALIVE_FRAMES)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report(**vars(args))
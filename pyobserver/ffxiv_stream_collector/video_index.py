@@ -0,0 +1,197 @@
+"""Keyframe index and keyframe-aware cutting for recorded streams.
+
+The keyframe index is built once per recording with ffprobe (packet flags only, no decoding)
+and stored next to the recording. Clips are cut by stream copy between the keyframes inside
+the requested range, and only the partial GOPs at the edges are re-encoded.
+"""
+import json
+import os
+import subprocess
+import tempfile
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Re-encode the edges with the same codec as the source so the segments can be concatenated
+ENCODERS = {
+    'h264': 'libx264',
+    'hevc': 'libx265',
+}
+
+# Edges shorter than this are snapped to the keyframe instead of being re-encoded
+EDGE_TOLERANCE = 0.05
+
+
+def index_path(video_path):
+    """`recordings/a/20250101_120000.mkv` -> `recordings/a/20250101_120000.keyframes.json`"""
+    return Path(video_path).with_suffix('.keyframes.json')
+
+
+def probe_video_stream(video_path):
+    cmd = [
+        'ffprobe', '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'stream=codec_name,pix_fmt,width,height,avg_frame_rate:format=duration',
+        '-of', 'json',
+        str(video_path),
+    ]
+    info = json.loads(subprocess.run(cmd, capture_output=True, check=True, text=True).stdout)
+    stream = info['streams'][0]
+
+    return {
+        'codec_name': stream.get('codec_name'),
+        'pix_fmt': stream.get('pix_fmt'),
+        'width': stream.get('width'),
+        'height': stream.get('height'),
+        'avg_frame_rate': stream.get('avg_frame_rate'),
+        'duration': float(info['format']['duration']),
+    }
+
+
+def probe_keyframes(video_path):
+    """Presentation timestamps of all video keyframes, read from packet flags"""
+    cmd = [
+        'ffprobe', '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'packet=pts_time,flags',
+        '-of', 'csv=p=0',
+        str(video_path),
+    ]
+    output = subprocess.run(cmd, capture_output=True, check=True, text=True).stdout
+
+    keyframes = []
+    for line in output.splitlines():
+        pts_time, _, flags = line.partition(',')
+        if 'K' in flags and pts_time not in ('', 'N/A'):
+            keyframes.append(float(pts_time))
+
+    return sorted(keyframes)
+
+
+def build_keyframe_index(video_path, rebuild=False):
+    """Load the persistent keyframe index of `video_path`, building it if missing or stale"""
+    stat = os.stat(video_path)
+    path = index_path(video_path)
+
+    if not rebuild and path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('size') == stat.st_size and index.get('mtime') == stat.st_mtime:
+            return index
+
+    index = probe_video_stream(video_path)
+    index['size'] = stat.st_size
+    index['mtime'] = stat.st_mtime
+    index['keyframes'] = probe_keyframes(video_path)
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+
+    return index
+
+
+def plan_cut(keyframes, start, end):
+    """Split [start, end) into (kind, seg_start, seg_end) segments.
+
+    kind is 'copy' for whole GOPs between keyframes and 'encode' for the partial GOPs at the edges.
+    """
+    first = bisect_left(keyframes, start - EDGE_TOLERANCE)
+    last = bisect_right(keyframes, end + EDGE_TOLERANCE) - 1
+
+    if first >= len(keyframes) or last < 0 or keyframes[first] >= keyframes[last]:
+        return [('encode', start, end)]
+
+    copy_start = keyframes[first]
+    copy_end = min(keyframes[last], end)
+    segments = []
+
+    if copy_start - start > EDGE_TOLERANCE:
+        segments.append(('encode', start, copy_start))
+    segments.append(('copy', copy_start, copy_end))
+    if end - copy_end > EDGE_TOLERANCE:
+        segments.append(('encode', copy_end, end))
+
+    return segments
+
+
+def _segment_cmd(video_path, kind, seg_start, seg_end, output_path, index):
+    cmd = [
+        'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+        '-ss', f'{seg_start:.6f}',
+        '-i', str(video_path),
+        '-t', f'{seg_end - seg_start:.6f}',
+        '-map', '0:v:0', '-map', '0:a?',
+    ]
+
+    if kind == 'copy':
+        cmd += ['-c', 'copy']
+    else:
+        cmd += [
+            '-c:v', ENCODERS[index['codec_name']],
+            '-preset', 'veryfast', '-crf', '18',
+            '-pix_fmt', index['pix_fmt'],
+            '-r', index['avg_frame_rate'],
+            '-c:a', 'copy',
+        ]
+
+    # MPEG-TS keeps codec parameters in-band, so segments from different encoders concatenate cleanly
+    return cmd + ['-avoid_negative_ts', 'make_zero', '-f', 'mpegts', str(output_path)]
+
+
+def cut_clip(video_path, start, end, output_path, index=None):
+    """Cut [start, end) seconds of `video_path` into `output_path`, re-encoding only the edges"""
+    if index is None:
+        index = build_keyframe_index(video_path)
+
+    start = max(0.0, start)
+    end = min(end, index['duration'])
+    segments = plan_cut(index['keyframes'], start, end)
+
+    if index['codec_name'] not in ENCODERS:
+        # Unknown codec: fall back to a pure stream copy from the keyframe before `start`
+        segments = [('copy', start, end)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        segment_paths = []
+        for i, (kind, seg_start, seg_end) in enumerate(segments):
+            segment_path = Path(tmp_dir) / f'{i:02d}.ts'
+            subprocess.run(_segment_cmd(video_path, kind, seg_start, seg_end, segment_path, index), check=True)
+            segment_paths.append(segment_path)
+
+        list_path = Path(tmp_dir) / 'segments.txt'
+        with open(list_path, 'w', encoding='utf-8') as f:
+            for segment_path in segment_paths:
+                f.write(f"file '{segment_path.as_posix()}'\n")
+
+        subprocess.run([
+            'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+            '-f', 'concat', '-safe', '0', '-i', str(list_path),
+            '-map', '0', '-c', 'copy',
+            str(output_path),
+        ], check=True)
+
+    return output_path
+
+
+def cut_clips(video_path, clips, output_dir, max_workers=None):
+    """Cut many (start, end) clips from one source in parallel.
+
+    Returns:
+        List of output paths in the same order as `clips`.
+    """
+    index = build_keyframe_index(video_path)
+    os.makedirs(output_dir, exist_ok=True)
+    stem = Path(video_path).stem
+    suffix = Path(video_path).suffix
+
+    output_paths = [Path(output_dir) / f'{stem}_{i + 1:02d}{suffix}' for i in range(len(clips))]
+
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        futures = [
+            executor.submit(cut_clip, video_path, start, end, output_path, index)
+            for (start, end), output_path in zip(clips, output_paths)
+        ]
+        for future in futures:
+            future.result()
+
+    return output_paths
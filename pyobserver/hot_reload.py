@@ -0,0 +1,198 @@
+import os
+import sys
+import time
+import asyncio
+import importlib
+import inspect
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 이 파일들이 바뀌면 확장 리로드로는 반영할 수 없으므로 프로세스를 재시작
+CORE_FILES = {
+    'pyobserver/run_assistant_bot.py',
+    'pyobserver/ai_observer_bot/run_observer_bot.py',
+    'pyobserver/hot_reload.py',
+    # 다시 로드하면 실행 중인 /metrics 서버가 보지 않는 새 REGISTRY가 생기므로 재시작
+    'pyobserver/metrics.py',
+    'pyobserver/run_bot_host.py',
+    'pyproject.toml',
+    'requirements.txt',
+}
+
+
+# run_bot_host로 한 프로세스에서 함께 실행 중인 봇들, 헬퍼 모듈(sys.modules)을 공유하므로 업데이트도 함께 적용
+hosted_bots = []
+
+
+def set_hosted_bots(bots):
+    hosted_bots[:] = bots
+
+
+async def run_git(*args):
+    process = await asyncio.create_subprocess_exec(
+        'git', *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate()
+    return process.returncode, stdout.decode(), stderr.decode()
+
+
+def module_name(path):
+    """'pyobserver/ai_observer_bot/discussion_summarizer.py' -> 'pyobserver.ai_observer_bot.discussion_summarizer'"""
+    if not path.endswith('.py'):
+        return None
+    return path[:-3].replace('/', '.').removesuffix('.__init__')
+
+
+def module_dependencies(name):
+    """name 모듈이 import한 pyobserver 모듈들 (`import x`와 `from x import y` 모두)"""
+    dependencies = set()
+    for value in vars(sys.modules[name]).values():
+        dependency = value.__name__ if inspect.ismodule(value) else getattr(value, '__module__', None)
+        if isinstance(dependency, str) and dependency.startswith('pyobserver.') and dependency != name and dependency in sys.modules:
+            dependencies.add(dependency)
+    return dependencies
+
+
+def helper_reload_order(helpers, loaded_extensions):
+    """바뀐 헬퍼와 그 헬퍼를 가져다 쓰는 헬퍼들을 의존 대상부터 (leaf 먼저) 다시 로드할 순서로 정렬
+
+    `from ... import`로 가져온 함수/객체는 가져다 쓴 모듈을 다시 로드해야 새 것으로 바뀌므로,
+    바뀌지 않은 모듈이라도 바뀐 헬퍼에 의존하면 같이 다시 로드함
+    """
+    core_modules = {module_name(path) for path in CORE_FILES}
+    candidates = [
+        name for name in list(sys.modules)
+        if name.startswith('pyobserver.') and name not in loaded_extensions and name not in core_modules
+    ]
+    dependencies = {name: module_dependencies(name) for name in candidates}
+
+    selected = set(helpers)
+    changed = True
+    while changed:
+        changed = False
+        for name, deps in dependencies.items():
+            if name not in selected and deps & selected:
+                selected.add(name)
+                changed = True
+
+    order = []
+    visiting = set()
+
+    def visit(name):
+        if name in order or name in visiting:
+            return
+        visiting.add(name)
+        for dependency in sorted(dependencies.get(name, ())):
+            if dependency in selected:
+                visit(dependency)
+        order.append(name)
+
+    for name in sorted(selected):
+        visit(name)
+    return order
+
+
+def plan_reload(changed_files, loaded_extensions):
+    """변경된 파일 목록으로 리로드 계획 수립
+
+    Returns:
+        (재시작 필요 여부, 다시 import할 헬퍼 모듈, 리로드할 확장)
+    """
+    if any(path in CORE_FILES for path in changed_files):
+        return True, [], []
+
+    changed_modules = [module_name(path) for path in changed_files]
+    changed_modules = [name for name in changed_modules if name in sys.modules]
+
+    extensions = [name for name in changed_modules if name in loaded_extensions]
+    helpers = [name for name in changed_modules if name not in loaded_extensions]
+
+    # 헬퍼 모듈(request_gemini 등)은 확장들이 `from ... import`로 가져다 쓰므로 모든 확장을 다시 로드
+    if helpers:
+        helpers = helper_reload_order(helpers, loaded_extensions)
+        extensions = list(loaded_extensions)
+
+    return False, helpers, extensions
+
+
+def export_cog_states(bot, extension):
+    """확장에 속한 cog들의 `export_state()` 결과 수집"""
+    states = {}
+    for name, cog in bot.cogs.items():
+        if cog.__module__ == extension and hasattr(cog, 'export_state'):
+            states[name] = cog.export_state()
+    return states
+
+
+def import_cog_states(bot, states):
+    for name, state in states.items():
+        cog = bot.get_cog(name)
+        if cog is not None and hasattr(cog, 'import_state'):
+            cog.import_state(state)
+
+
+async def reload_extension_with_state(bot, extension):
+    states = export_cog_states(bot, extension)
+    await bot.reload_extension(extension)
+    import_cog_states(bot, states)
+
+
+async def restart(*bots):
+    for bot in bots:
+        await bot.close()
+    # 봇 재시작
+    os.execv(sys.executable, ['python'] + sys.argv)
+
+
+async def update_bot(bot, ctx):
+    """Git에서 최신 코드를 가져와 바뀐 확장만 다시 로드하고, 핵심 파일이 바뀐 경우에만 재시작"""
+    await ctx.send("📥 업데이트를 확인하는 중...")
+
+    try:
+        _, old_head, _ = await run_git('rev-parse', 'HEAD')
+
+        # Git pull 실행
+        returncode, output, error = await run_git('pull', 'origin', 'main')
+
+        # 결과 확인
+        if returncode != 0:
+            await ctx.send(f"❌ 업데이트 실패:\n```\n{error}\n```")
+            return
+
+        if "Already up to date." in output:
+            await ctx.send("✅ 이미 최신 버전입니다!")
+            return
+
+        await ctx.send(f"✅ 업데이트 완료!\n```\n{output}\n```")
+
+        _, diff, _ = await run_git('diff', '--name-only', old_head.strip(), 'HEAD')
+        changed_files = [path for path in diff.splitlines() if path]
+        # 같은 프로세스의 다른 봇도 다시 로드한 헬퍼의 옛 함수를 들고 있지 않도록 모든 봇의 확장을 함께 다시 로드
+        # (다른 봇의 !update는 이미 최신이라 아무것도 다시 로드하지 않음)
+        bots = list(hosted_bots) if bot in hosted_bots else [bot]
+        loaded_extensions = [extension for hosted_bot in bots for extension in hosted_bot.extensions]
+        needs_restart, helpers, extensions = plan_reload(changed_files, loaded_extensions)
+
+        if needs_restart:
+            await ctx.send("🔄 핵심 파일이 변경되어 봇을 재시작합니다...")
+            await restart(*bots)
+            return
+
+        start = time.perf_counter()
+        for name in helpers:
+            importlib.reload(sys.modules[name])
+        for hosted_bot in bots:
+            for extension in extensions:
+                if extension in hosted_bot.extensions:
+                    await reload_extension_with_state(hosted_bot, extension)
+        elapsed = time.perf_counter() - start
+
+        logger.info(f"Reloaded {helpers + extensions} in {elapsed:.3f}s")
+        reloaded = ', '.join(extensions) if extensions else '없음'
+        await ctx.send(f"♻️ 확장 리로드 완료 ({elapsed * 1000:.0f}ms): {reloaded}")
+
+    except Exception as e:
+        await ctx.send(f"❌ 오류 발생: {str(e)}")
@@ -0,0 +1,237 @@
+import time
+import asyncio
+from collections import defaultdict, deque
+import discord
+
+# Discord 메시지 제한
+MESSAGE_CONTENT_LIMIT = 2000
+EMBED_TITLE_LIMIT = 256
+EMBED_DESCRIPTION_LIMIT = 4096
+EMBEDS_PER_MESSAGE = 10
+# 한 메시지 안의 모든 임베드 title + description + footer 합계
+EMBED_TOTAL_LIMIT = 6000
+
+# 메시지 전송 rate limit (채널별 5초에 5개)
+SEND_BUCKET_SIZE = 5
+SEND_BUCKET_PERIOD = 5.0
+
+# 진행 중인 메시지 수정 간격 (메시지 수정도 채널별 5초에 5개 제한)
+EDIT_INTERVAL = 1.5
+
+# 임베드에 남은 자리가 이보다 작으면 억지로 채우지 않고 다음 메시지로 넘김
+MIN_CHUNK_SIZE = 200
+# 코드 블록을 닫고 다시 여는 데 필요한 여유 공간
+FENCE_RESERVE = 32
+
+
+def _open_fence(text):
+    """text 끝에서 닫히지 않은 코드 블록의 여는 줄 (예: '```python'), 없으면 None"""
+    fence = None
+    for line in text.split('\n'):
+        stripped = line.strip()
+        if stripped.startswith('```'):
+            fence = None if fence is not None else stripped
+    return fence
+
+
+def _cut_position(text, limit):
+    """limit 이내에서 마크다운이 덜 깨지는 자르는 위치 (문단 > 줄 > 문장 > 단어 순)"""
+    window = text[:limit]
+    for separator in ('\n\n', '\n', '. ', ' '):
+        position = window.rfind(separator)
+        # 너무 앞에서 자르면 메시지 수만 늘어나므로 절반 이후에서만 사용
+        if position >= limit // 2:
+            return position + len(separator)
+    return limit
+
+
+def take_chunk(text, limit):
+    """text 앞부분에서 limit 글자 이하의 조각을 잘라 (조각, 나머지)를 반환
+
+    코드 블록 중간에서 잘리면 조각 끝에서 블록을 닫고 나머지 앞에서 같은 언어로 다시 연다
+    """
+    if len(text) <= limit:
+        return text, ''
+
+    cut = _cut_position(text, limit - FENCE_RESERVE)
+    chunk, rest = text[:cut].rstrip(), text[cut:].lstrip('\n')
+
+    fence = _open_fence(chunk)
+    if fence is not None:
+        chunk += '\n```'
+        rest = f"{fence}\n{rest}"
+    return chunk, rest
+
+
+def split_markdown(text, limit=MESSAGE_CONTENT_LIMIT):
+    """마크다운이 깨지지 않는 경계에서 text를 limit 글자 이하 조각들로 나눔"""
+    chunks = []
+    while text:
+        chunk, text = take_chunk(text, limit)
+        if chunk:
+            chunks.append(chunk)
+    return chunks
+
+
+def pack_sections(sections, footer=None):
+    """(제목, 본문) 섹션들을 임베드로 나누고 최소한의 메시지 수로 묶음
+
+    본문은 임베드 description 제한(4096)과 메시지당 합계 제한(6000)에 맞춰 그때그때 남은 공간만큼 잘라 채움
+
+    Returns:
+        메시지별 임베드 목록 [[{'title': ..., 'description': ...}, ...], ...]
+    """
+    footer_size = len(footer) if footer else 0
+    messages = []
+    current = []
+    used = 0
+
+    for title, text in sections:
+        title = title[:EMBED_TITLE_LIMIT] if title else None
+        rest = text or ''
+        first = True
+
+        while first or rest:
+            title_part = title if first else None
+            budget = min(EMBED_DESCRIPTION_LIMIT, EMBED_TOTAL_LIMIT - used - footer_size - len(title_part or ''))
+
+            full = len(current) == EMBEDS_PER_MESSAGE
+            too_small = budget < min(MIN_CHUNK_SIZE, len(rest) or 1)
+            if current and (full or too_small):
+                messages.append(current)
+                current, used = [], 0
+                continue
+
+            chunk, rest = take_chunk(rest, budget)
+            current.append({'title': title_part, 'description': chunk})
+            used += len(title_part or '') + len(chunk)
+            first = False
+
+    if current:
+        messages.append(current)
+    return messages
+
+
+class ChannelRateLimiter:
+    """채널별 토큰 버킷
+
+    고정된 sleep 대신 채널의 전송 한도(5초에 5개)가 남아 있으면 바로 보내고, 다 쓴 경우에만 가장 오래된 전송이
+    창 밖으로 나갈 때까지 기다림. 채널별 lock으로 여러 메시지로 나뉜 응답이 다른 응답과 섞이지 않게 함
+    """
+
+    def __init__(self, bucket_size=SEND_BUCKET_SIZE, bucket_period=SEND_BUCKET_PERIOD):
+        self.bucket_size = bucket_size
+        self.bucket_period = bucket_period
+        self._sent = defaultdict(deque)
+        self._locks = defaultdict(asyncio.Lock)
+
+    def lock(self, channel_id):
+        return self._locks[channel_id]
+
+    async def acquire(self, channel_id):
+        sent = self._sent[channel_id]
+        now = time.monotonic()
+        while sent and now - sent[0] >= self.bucket_period:
+            sent.popleft()
+
+        if len(sent) >= self.bucket_size:
+            await asyncio.sleep(self.bucket_period - (now - sent[0]))
+            sent.popleft()
+
+        sent.append(time.monotonic())
+
+
+default_limiter = ChannelRateLimiter()
+
+
+def _channel_id(destination):
+    # commands.Context도 받을 수 있도록 실제 채널 기준으로 버킷을 나눔
+    return getattr(destination, 'channel', destination).id
+
+
+async def send_sections(destination, sections, color=None, footer=None, timestamp=None, limiter=None):
+    """섹션들을 임베드로 묶어 전송
+
+    Args:
+        destination: 채널 또는 commands.Context
+        sections: [(제목, 본문)]
+        footer, timestamp: 마지막 임베드에만 표시
+
+    Returns:
+        전송한 메시지 목록
+    """
+    limiter = limiter or default_limiter
+    color = color or discord.Color.blue()
+    packed = pack_sections(sections, footer)
+
+    channel_id = _channel_id(destination)
+    sent_messages = []
+    async with limiter.lock(channel_id):
+        for i, embed_dicts in enumerate(packed):
+            embeds = [
+                discord.Embed(title=embed['title'], description=embed['description'], color=color)
+                for embed in embed_dicts
+            ]
+            if i == len(packed) - 1:
+                if footer:
+                    embeds[-1].set_footer(text=footer)
+                if timestamp:
+                    embeds[-1].timestamp = timestamp
+
+            await limiter.acquire(channel_id)
+            sent_messages.append(await destination.send(embeds=embeds))
+
+    return sent_messages
+
+
+async def send_text(destination, text, title=None, color=None, footer=None, timestamp=None, limiter=None):
+    """긴 텍스트를 마크다운 경계에서 나눠 임베드로 전송"""
+    return await send_sections(destination, [(title, text)], color, footer, timestamp, limiter)
+
+
+class ProgressiveMessage:
+    """스트리밍 응답을 받는 동안 처리 중 메시지를 주기적으로 수정하여 진행 상황을 보여줌
+
+    수정은 EDIT_INTERVAL 간격으로만 보내고 백그라운드 태스크로 실행하여 스트림 소비를 막지 않음.
+    메시지 길이 제한 때문에 지금까지 받은 텍스트의 끝부분만 표시하고, 전체 결과는 호출한 쪽에서 따로 전송
+    """
+
+    def __init__(self, message, header, interval=EDIT_INTERVAL):
+        self.message = message
+        self.header = header
+        self.interval = interval
+        self._last_edit = 0.0
+        self._pending = None
+
+    def render(self, text):
+        limit = MESSAGE_CONTENT_LIMIT - len(self.header) - 8
+        if len(text) > limit:
+            text = '…' + text[-limit:]
+        # 코드 블록이 열린 채로 잘리면 이후 내용이 모두 코드로 보이므로 닫아줌
+        if _open_fence(text) is not None:
+            text += '\n```'
+        return f"{self.header}\n{text}"
+
+    def update(self, text):
+        now = time.monotonic()
+        if now - self._last_edit < self.interval:
+            return
+        if self._pending is not None and not self._pending.done():
+            return
+
+        self._last_edit = now
+        self._pending = asyncio.create_task(self.message.edit(content=self.render(text)))
+
+    async def consume(self, chunks):
+        """텍스트 조각 async iterable을 끝까지 읽으면서 메시지를 갱신하고 전체 텍스트를 반환"""
+        parts = []
+        async for chunk in chunks:
+            parts.append(chunk)
+            self.update(''.join(parts))
+
+        if self._pending is not None:
+            try:
+                await self._pending
+            except discord.HTTPException:
+                pass
+        return ''.join(parts)
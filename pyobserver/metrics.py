@@ -0,0 +1,325 @@
+import os
+import re
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+# `METRICS_PORT=0`이면 HTTP 엔드포인트를 띄우지 않음
+DEFAULT_METRICS_PORT = 9108
+LOOP_LAG_INTERVAL_SEC = 0.5
+# 이벤트 루프가 이 시간 이상 멈추면 루프 스레드의 스택을 로그로 남김
+DEFAULT_BLOCK_THRESHOLD_SEC = 1.0
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            lines.extend(self._render_samples())
+        return lines
+
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def __init__(self, name, documentation, label_names=()):
+        super().__init__(name, documentation, label_names)
+        self._values = defaultdict(float)
+
+    def inc(self, amount=1.0, **labels):
+        with self._lock:
+            self._values[self._key(labels)] += amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0.0)
+
+    def _render_samples(self):
+        return [f"{self.name}{_format_labels(self.label_names, key)} {value}" for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    type_name = 'gauge'
+
+    def __init__(self, name, documentation, label_names=()):
+        super().__init__(name, documentation, label_names)
+        self._values = {}
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0.0)
+
+    def _render_samples(self):
+        return [f"{self.name}{_format_labels(self.label_names, key)} {value}" for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # 라벨 -> [버킷별 개수, 합계, 전체 개수]
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts, _, _ = entry = self._values[key]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def _render_samples(self):
+        lines = []
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, ('le', bound))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, ('le', '+Inf'))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        # 이름 -> metric, 핫 리로드로 모듈이 다시 실행되면 같은 이름의 metric을 새 객체로 교체 (중복 HELP/TYPE 방지)
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+COMMAND_LATENCY = REGISTRY.register(Histogram(
+    'bot_command_latency_seconds', 'Command latency from invoke to completion', ('bot', 'command', 'status')
+))
+GEMINI_LATENCY = REGISTRY.register(Histogram(
+    'gemini_request_latency_seconds', 'Gemini generate_content latency', ('model',)
+))
+GEMINI_FIRST_CHUNK = REGISTRY.register(Histogram(
+    'gemini_time_to_first_chunk_seconds', 'Time until the first streamed Gemini chunk', ('model',)
+))
+GEMINI_TOKENS = REGISTRY.register(Counter(
+    'gemini_tokens_total', 'Gemini tokens by direction (prompt, output)', ('model', 'direction')
+))
+DISCORD_REST_REQUESTS = REGISTRY.register(Counter(
+    'discord_rest_requests_total', 'Discord REST requests', ('bot', 'method', 'route')
+))
+DISCORD_RATE_LIMIT_WAITS = REGISTRY.register(Counter(
+    'discord_rate_limit_waits_total', 'Times discord.py slept on a rate limit', ('scope',)
+))
+DISCORD_RATE_LIMIT_WAIT_SECONDS = REGISTRY.register(Counter(
+    'discord_rate_limit_wait_seconds_total', 'Seconds discord.py slept on rate limits', ('scope',)
+))
+REMINDER_LAG = REGISTRY.register(Histogram(
+    'reminder_check_lag_seconds', 'How late the scheduled event check ran after its planned time'
+))
+UPLOAD_BYTES = REGISTRY.register(Counter(
+    'dropbox_upload_bytes_total', 'Bytes uploaded to Dropbox'
+))
+UPLOAD_SECONDS = REGISTRY.register(Histogram(
+    'dropbox_upload_seconds', 'Dropbox upload duration per file', buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800)
+))
+UPLOAD_THROUGHPUT = REGISTRY.register(Gauge(
+    'dropbox_upload_throughput_bytes_per_second', 'Throughput of the last Dropbox upload'
+))
+EVENT_LOOP_LAG = REGISTRY.register(Histogram(
+    'event_loop_lag_seconds', 'How late a periodic asyncio sleep woke up'
+))
+EVENT_LOOP_BLOCKS = REGISTRY.register(Counter(
+    'event_loop_blocked_total', 'Times the event loop was blocked longer than the watchdog threshold'
+))
+
+
+def record_upload(num_bytes, seconds):
+    UPLOAD_BYTES.inc(num_bytes)
+    UPLOAD_SECONDS.observe(seconds)
+    if seconds > 0:
+        UPLOAD_THROUGHPUT.set(num_bytes / seconds)
+
+
+def record_gemini_usage(model_name, seconds, usage_metadata):
+    GEMINI_LATENCY.observe(seconds, model=model_name)
+    if usage_metadata is not None:
+        GEMINI_TOKENS.inc(getattr(usage_metadata, 'prompt_token_count', 0) or 0, model=model_name, direction='prompt')
+        GEMINI_TOKENS.inc(getattr(usage_metadata, 'candidates_token_count', 0) or 0, model=model_name, direction='output')
+
+
+class LoopMonitor:
+    """이벤트 루프 지연 측정과 블로킹 감시
+
+    루프 안의 태스크가 주기적으로 heartbeat를 갱신하고, 별도 스레드가 heartbeat가 끊긴 시간을 확인하여
+    threshold를 넘으면 루프 스레드의 현재 스택을 로그로 남김 (동기 호출이 루프를 막는 위치를 바로 확인 가능)
+    """
+
+    def __init__(self, interval=LOOP_LAG_INTERVAL_SEC, block_threshold=None):
+        self.interval = interval
+        self.block_threshold = block_threshold if block_threshold is not None else float(
+            os.getenv('LOOP_BLOCK_THRESHOLD_SEC', DEFAULT_BLOCK_THRESHOLD_SEC)
+        )
+        self.last_lag = 0.0
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id = None
+        self._task = None
+        self._stop = threading.Event()
+
+    async def _run(self):
+        while True:
+            start = time.monotonic()
+            self._heartbeat = start
+            await asyncio.sleep(self.interval)
+            self.last_lag = max(0.0, time.monotonic() - start - self.interval)
+            EVENT_LOOP_LAG.observe(self.last_lag)
+
+    def _watchdog(self):
+        reported = None
+        while not self._stop.wait(self.interval):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            # 같은 정지 구간은 한 번만 기록
+            if blocked < self.block_threshold or reported == heartbeat:
+                continue
+            reported = heartbeat
+
+            EVENT_LOOP_BLOCKS.inc()
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = ''.join(traceback.format_stack(frame)) if frame is not None else '(no frame)'
+            logger.warning(f"Event loop blocked for {blocked:.2f}s, loop thread stack:\n{stack}")
+
+    def start(self):
+        self._loop_thread_id = threading.get_ident()
+        self._task = asyncio.create_task(self._run())
+        threading.Thread(target=self._watchdog, name='loop-watchdog', daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+
+
+class RateLimitLogHandler(logging.Handler):
+    """discord.http의 rate limit 로그를 카운터로 집계"""
+
+    # ex) "We are being rate limited. POST /channels/... responded with 429. Retrying in 1.23 seconds."
+    RETRY_PATTERN = re.compile(r'Retrying in ([\d.]+) seconds')
+
+    def emit(self, record):
+        message = record.getMessage()
+        match = self.RETRY_PATTERN.search(message)
+        if match is None:
+            return
+        scope = 'global' if 'global' in message.lower() else 'route'
+        DISCORD_RATE_LIMIT_WAITS.inc(scope=scope)
+        DISCORD_RATE_LIMIT_WAIT_SECONDS.inc(float(match.group(1)), scope=scope)
+
+
+def instrument_bot(bot, bot_name):
+    """명령어 지연 시간과 REST 요청 수를 기록하도록 봇에 리스너와 래퍼를 추가"""
+    started = {}
+
+    async def on_command(ctx):
+        started[ctx.message.id] = time.perf_counter()
+
+    def finish(ctx, status):
+        start = started.pop(ctx.message.id, None)
+        if start is not None and ctx.command is not None:
+            COMMAND_LATENCY.observe(time.perf_counter() - start, bot=bot_name, command=ctx.command.qualified_name, status=status)
+
+    async def on_command_completion(ctx):
+        finish(ctx, 'ok')
+
+    async def on_command_error(ctx, error):
+        finish(ctx, 'error')
+
+    bot.add_listener(on_command)
+    bot.add_listener(on_command_completion)
+    bot.add_listener(on_command_error)
+
+    original_request = bot.http.request
+
+    async def request(route, **kwargs):
+        DISCORD_REST_REQUESTS.inc(bot=bot_name, method=route.method, route=route.path)
+        return await original_request(route, **kwargs)
+
+    bot.http.request = request
+
+
+_monitor = None
+_server_runner = None
+
+
+async def start_metrics(bot, bot_name):
+    """봇 계측을 시작하고, 프로세스에 하나뿐인 루프 모니터와 /metrics 엔드포인트를 띄움 (setup_hook에서 호출)"""
+    global _monitor, _server_runner
+    instrument_bot(bot, bot_name)
+
+    if _monitor is None:
+        _monitor = LoopMonitor()
+        _monitor.start()
+        logging.getLogger('discord.http').addHandler(RateLimitLogHandler())
+
+    port = int(os.getenv('METRICS_PORT', DEFAULT_METRICS_PORT))
+    if _server_runner is None and port:
+        from aiohttp import web
+
+        async def metrics_handler(request):
+            return web.Response(text=REGISTRY.render(), content_type='text/plain', charset='utf-8')
+
+        app = web.Application()
+        app.router.add_get('/metrics', metrics_handler)
+        _server_runner = web.AppRunner(app)
+        await _server_runner.setup()
+        await web.TCPSite(_server_runner, '0.0.0.0', port).start()
+        logger.info(f"Serving metrics on :{port}/metrics")
+
+
+def loop_lag():
+    """가장 최근에 측정한 이벤트 루프 지연 (초)"""
+    return _monitor.last_lag if _monitor is not None else None
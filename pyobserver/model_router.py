@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import logging
+from pyobserver.request_gemini import GeminiModels, request_gemini_async
+from pyobserver.metrics import REGISTRY, Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+TRIAGE_MODEL = GeminiModels.GEMINI_2_5_FLASH_LITE
+
+# 빠르고 싼 순서
+TIER_ORDER = [GeminiModels.GEMINI_2_5_FLASH_LITE, GeminiModels.GEMINI_2_5_FLASH, GeminiModels.GEMINI_2_5_PRO]
+
+# 라우팅 전에 각 용도에서 쓰던 모델, 이보다 비싼 모델로는 보내지 않고 절약한 시간도 이 모델 기준으로 계산
+BASELINE_MODELS = {
+    'discussion_summary': GeminiModels.GEMINI_2_5_PRO,
+    'patch_note': GeminiModels.GEMINI_2_5_FLASH,
+}
+
+# 정책별 delta 크기 -> 모델, None이면 triage 없이 항상 기존 모델 사용
+ROUTING_POLICIES = {
+    'quality': None,
+    'balanced': {
+        'small': GeminiModels.GEMINI_2_5_FLASH,
+        'medium': GeminiModels.GEMINI_2_5_PRO,
+        'large': GeminiModels.GEMINI_2_5_PRO,
+    },
+    'economy': {
+        'small': GeminiModels.GEMINI_2_5_FLASH,
+        'medium': GeminiModels.GEMINI_2_5_FLASH,
+        'large': GeminiModels.GEMINI_2_5_PRO,
+    },
+    'lite': {
+        'small': GeminiModels.GEMINI_2_5_FLASH_LITE,
+        'medium': GeminiModels.GEMINI_2_5_FLASH,
+        'large': GeminiModels.GEMINI_2_5_PRO,
+    },
+}
+DEFAULT_POLICY = 'balanced'
+
+# triage 없이 크기를 정할 때 쓰는 글자 수 기준 (small 미만, medium 미만, 나머지 large)
+DELTA_SIZE_THRESHOLDS = (2000, 20000)
+
+# 실측값이 없을 때 사용하는 모델별 예상 응답 시간 (초)
+DEFAULT_LATENCY_SEC = {
+    GeminiModels.GEMINI_2_5_FLASH_LITE: 2.0,
+    GeminiModels.GEMINI_2_5_FLASH: 6.0,
+    GeminiModels.GEMINI_2_5_PRO: 20.0,
+}
+# 모델별 응답 시간 이동 평균 가중치
+LATENCY_EWMA_ALPHA = 0.2
+
+ROUTED_CALLS = REGISTRY.register(Counter(
+    'gemini_routed_calls_total', 'Gemini calls by routing outcome (tier, or skipped after triage)', ('purpose', 'tier')
+))
+ROUTING_LATENCY_SAVED = REGISTRY.register(Histogram(
+    'gemini_routing_latency_saved_seconds', 'Estimated seconds saved per request against the baseline model (negative when triage only added latency)',
+    ('purpose',), buckets=(-10, -5, -1, 0, 1, 5, 10, 30, 60)
+))
+
+
+def delta_size_from_length(num_chars):
+    small, medium = DELTA_SIZE_THRESHOLDS
+    if num_chars < small:
+        return 'small'
+    if num_chars < medium:
+        return 'medium'
+    return 'large'
+
+
+def parse_triage(text):
+    """triage 응답 JSON 파싱, 코드 블록으로 감싸서 답해도 처리. 실패하면 None"""
+    text = text.strip()
+    start, end = text.find('{'), text.rfind('}')
+    if start < 0 or end < start:
+        return None
+    try:
+        result = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+
+    if result.get('delta_size') not in ('small', 'medium', 'large'):
+        result['delta_size'] = None
+    result['has_new_decisions'] = bool(result.get('has_new_decisions', True))
+    return result
+
+
+class RoutingDecision:
+    def __init__(self, purpose, model, delta_size, skipped=False, triage_sec=0.0):
+        self.purpose = purpose
+        # skipped면 None (triage 결과 새 결정사항이 없어 본 요청을 보내지 않음)
+        self.model = model
+        self.delta_size = delta_size
+        self.skipped = skipped
+        self.triage_sec = triage_sec
+
+
+class ModelRouter:
+    """Flash-Lite triage 결과에 따라 Flash-Lite / Flash / Pro 중 필요한 만큼만 사용
+
+    `GEMINI_ROUTING_POLICY` 환경 변수로 정책 선택 (quality, balanced, economy, lite)
+    """
+
+    def __init__(self, policy=None):
+        self.policy = policy or os.getenv('GEMINI_ROUTING_POLICY', DEFAULT_POLICY)
+        if self.policy not in ROUTING_POLICIES:
+            logger.warning(f"Unknown routing policy '{self.policy}', using '{DEFAULT_POLICY}'")
+            self.policy = DEFAULT_POLICY
+        self.latency_sec = dict(DEFAULT_LATENCY_SEC)
+
+    async def triage(self, prompt):
+        start = time.perf_counter()
+        try:
+            result = parse_triage(await request_gemini_async(TRIAGE_MODEL, prompt))
+        except Exception as e:
+            logger.warning(f"Triage failed, escalating: {e}")
+            result = None
+        elapsed = time.perf_counter() - start
+        self.observe_latency(TRIAGE_MODEL, elapsed)
+        return result, elapsed
+
+    async def route(self, purpose, triage_prompt=None, delta_chars=0):
+        """사용할 모델 결정
+
+        Args:
+            purpose: BASELINE_MODELS의 키
+            triage_prompt: 주어지면 Flash-Lite로 결정사항 유무와 delta 크기를 판단, 없으면 delta_chars로 크기만 판단
+            delta_chars: 새로 처리할 내용의 글자 수
+        """
+        baseline = BASELINE_MODELS[purpose]
+        table = ROUTING_POLICIES[self.policy]
+        if table is None:
+            return RoutingDecision(purpose, baseline, None)
+
+        delta_size = delta_size_from_length(delta_chars)
+        triage_sec = 0.0
+        if triage_prompt is not None:
+            result, triage_sec = await self.triage(triage_prompt)
+            # triage가 실패하면 놓치지 않도록 기존 모델로 처리
+            if result is None:
+                return RoutingDecision(purpose, baseline, None, triage_sec=triage_sec)
+            if not result['has_new_decisions']:
+                return RoutingDecision(purpose, None, result['delta_size'], skipped=True, triage_sec=triage_sec)
+            delta_size = result['delta_size'] or delta_size
+
+        model = table[delta_size]
+        if TIER_ORDER.index(model) > TIER_ORDER.index(baseline):
+            model = baseline
+        return RoutingDecision(purpose, model, delta_size, triage_sec=triage_sec)
+
+    def observe_latency(self, model, seconds):
+        self.latency_sec[model] += LATENCY_EWMA_ALPHA * (seconds - self.latency_sec[model])
+
+    def record(self, decision, elapsed_sec=0.0):
+        """요청이 끝난 뒤 호출하여 계층별 호출 수와 기존 모델 대비 절약한 시간을 기록
+
+        Args:
+            elapsed_sec: 선택된 모델 요청에 걸린 시간 (skipped면 0)
+        """
+        tier = 'skipped' if decision.skipped else decision.model.value
+        ROUTED_CALLS.inc(purpose=decision.purpose, tier=tier)
+
+        if decision.model is not None:
+            self.observe_latency(decision.model, elapsed_sec)
+
+        baseline = BASELINE_MODELS[decision.purpose]
+        saved = self.latency_sec[baseline] - decision.triage_sec - elapsed_sec
+        ROUTING_LATENCY_SAVED.observe(saved, purpose=decision.purpose)
+        logger.info(
+            f"Routed {decision.purpose} to {tier} (delta {decision.delta_size}, policy {self.policy}), "
+            f"saved {saved:.1f}s against {baseline.value}"
+        )
+
+
+default_router = ModelRouter()
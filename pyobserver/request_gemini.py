@@ -1,12 +1,32 @@
-import google.generativeai as genai
 import os
+import time
 from enum import Enum
+from pyobserver.metrics import record_gemini_usage, GEMINI_FIRST_CHUNK
 
 # Load API key from environment variable or config file
 def get_gemini_api_key():
     return os.getenv('GEMINI_API_KEY')
 
 gemini_api_key = get_gemini_api_key()
+
+_genai = None
+
+def get_genai():
+    """google.generativeai는 import가 무거우므로 처음 요청할 때 로드"""
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+        genai.configure(api_key=gemini_api_key)
+        _genai = genai
+    return _genai
+
+_models = {}
+
+def get_model(model_name):
+    """GenerativeModel은 모델 이름별로 한 번만 만들어 같은 프로세스의 모든 봇이 공유"""
+    if model_name not in _models:
+        _models[model_name] = get_genai().GenerativeModel(model_name)
+    return _models[model_name]
     
 class GeminiModels(Enum):
     GEMINI_2_5_FLASH_LITE = "gemini-2.5-flash-lite"
@@ -14,13 +34,51 @@ class GeminiModels(Enum):
     GEMINI_2_5_PRO = "gemini-2.5-pro"
 
 def request_gemini(model: GeminiModels, prompt, image_url=None):
-    genai.configure(api_key=gemini_api_key)
-
-    model = genai.GenerativeModel(model.value)
+    model_name = model.value
+    model = get_model(model_name)
 
+    start = time.perf_counter()
     if image_url:
         response = model.generate_content(prompt, image_url)
     else:
         response = model.generate_content(prompt)
+    record_gemini_usage(model_name, time.perf_counter() - start, getattr(response, 'usage_metadata', None))
+
+    return response.text
+
+async def request_gemini_async(model: GeminiModels, prompt):
+    """request_gemini의 비동기 버전, 짧은 응답(triage 등)에 사용"""
+    model_name = model.value
+    model = get_model(model_name)
+
+    start = time.perf_counter()
+    response = await model.generate_content_async(prompt)
+    record_gemini_usage(model_name, time.perf_counter() - start, getattr(response, 'usage_metadata', None))
 
     return response.text
+
+async def request_gemini_stream(model: GeminiModels, prompt):
+    """응답을 생성되는 대로 텍스트 조각으로 내보내는 async generator
+
+    이벤트 루프를 막지 않으므로 cog에서 바로 `async for`로 사용
+    """
+    model_name = model.value
+    model = get_model(model_name)
+
+    start = time.perf_counter()
+    first_chunk = True
+    response = await model.generate_content_async(prompt, stream=True)
+    async for chunk in response:
+        # 안전 필터 등으로 텍스트가 없는 조각은 건너뜀
+        try:
+            text = chunk.text
+        except ValueError:
+            continue
+
+        if text:
+            if first_chunk:
+                GEMINI_FIRST_CHUNK.observe(time.perf_counter() - start, model=model_name)
+                first_chunk = False
+            yield text
+
+    record_gemini_usage(model_name, time.perf_counter() - start, getattr(response, 'usage_metadata', None))
@@ -0,0 +1,162 @@
+import time
+_process_start = time.perf_counter()
+
+import os
+import sys
+import asyncio
+import argparse
+import importlib
+import logging
+import tracemalloc
+from dotenv import load_dotenv
+import aiohttp
+import discord
+from pyobserver.hot_reload import set_hosted_bots
+from pyobserver.startup import StartupProfile
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# 이름 -> (봇 모듈, 표시 이름), 각 모듈은 TOKEN_ENV와 create_bot(startup_profile, connector)를 제공
+BOTS = {
+    'assistant': ('pyobserver.run_assistant_bot', 'FlyXIV Observer'),
+    'observer': ('pyobserver.ai_observer_bot.run_observer_bot', 'FlyXIV AI Observer'),
+}
+
+
+def rss_mb():
+    """현재 프로세스의 RSS (MB), /proc이 없으면 최대 RSS로 대체"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    import resource
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS는 바이트, Linux는 KB 단위
+    return maxrss / 1024 / 1024 if sys.platform == 'darwin' else maxrss / 1024
+
+
+class SharedConnector(aiohttp.TCPConnector):
+    """여러 봇이 함께 쓰는 연결 풀
+
+    discord.py는 봇마다 이 커넥터 위에 ClientSession을 만들고(connector_owner=True) 봇의 close()에서 커넥터도 닫으므로,
+    봇 하나가 닫혀도(hot_reload.restart 등) 다른 봇의 연결 풀이 닫히지 않도록 run_host의 close_shared()에서만 닫음
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.closing_by_host = False
+
+    def close(self, *args, **kwargs):
+        if self.closing_by_host:
+            return super().close(*args, **kwargs)
+        return asyncio.sleep(0)
+
+    async def close_shared(self):
+        self.closing_by_host = True
+        await self.close()
+
+
+class MemoryReport:
+    """봇별 메모리 사용량 기록
+
+    봇 모듈 import와 로그인(setup_hook에서 확장 로드)을 봇마다 순서대로 실행하면서
+    전후의 RSS와 tracemalloc 차이를 해당 봇의 몫으로 기록
+    """
+
+    def __init__(self):
+        tracemalloc.start()
+        self.base_rss_mb = rss_mb()
+        self.bots = {}
+        self._start = None
+
+    def begin(self):
+        self._start = (rss_mb(), tracemalloc.get_traced_memory()[0])
+
+    def end(self, name):
+        start_rss, start_traced = self._start
+        self.bots[name] = {
+            'rss_mb': rss_mb() - start_rss,
+            'python_heap_mb': (tracemalloc.get_traced_memory()[0] - start_traced) / 1024 / 1024,
+        }
+
+    def report(self):
+        total_rss = rss_mb()
+        # 프로세스를 따로 띄우면 인터프리터와 공통 라이브러리(discord, aiohttp)를 봇마다 한 벌씩 가짐
+        separate_rss = self.base_rss_mb * len(self.bots) + sum(bot['rss_mb'] for bot in self.bots.values())
+
+        lines = [f"Shared interpreter and libraries: {self.base_rss_mb:.1f}MB RSS"]
+        for name, bot in self.bots.items():
+            lines.append(f"  {name:<12}{bot['rss_mb']:>8.1f}MB RSS {bot['python_heap_mb']:>8.1f}MB python heap")
+        lines.append(f"Single process: {total_rss:.1f}MB RSS")
+        lines.append(f"Separate processes (estimated): {separate_rss:.1f}MB RSS")
+        return '\n'.join(lines)
+
+
+async def run_host(names, connection_limit):
+    memory = MemoryReport()
+
+    # 모든 봇이 같은 커넥터(연결 풀)로 Discord REST 요청
+    connector = SharedConnector(limit=connection_limit)
+
+    bots = []
+    try:
+        for name in names:
+            module_name, display_name = BOTS[name]
+            memory.begin()
+
+            module = importlib.import_module(module_name)
+            token = os.getenv(module.TOKEN_ENV)
+            if not token:
+                logger.error(f"{module.TOKEN_ENV} not found in environment variables!")
+                sys.exit(1)
+
+            startup_profile = StartupProfile(display_name, _process_start)
+            startup_profile.mark('imports')
+            bot = module.create_bot(startup_profile, connector=connector)
+
+            # 로그인 중 setup_hook에서 확장을 로드하므로 로그인까지 봇별로 측정
+            logger.info(f"Starting {display_name} Discord bot...")
+            await bot.login(token)
+            memory.end(name)
+            bots.append(bot)
+
+        logger.info(memory.report())
+        set_hosted_bots(bots)
+
+        await asyncio.gather(*(bot.connect() for bot in bots))
+
+    finally:
+        for bot in bots:
+            if not bot.is_closed():
+                await bot.close()
+        if not connector.closed:
+            await connector.close_shared()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="여러 봇을 하나의 프로세스와 이벤트 루프에서 실행")
+    parser.add_argument("--bots", nargs="+", choices=list(BOTS), default=list(BOTS))
+    parser.add_argument("--connection_limit", type=int, default=100)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    discord.utils.setup_logging()
+
+    try:
+        asyncio.run(run_host(args.bots, args.connection_limit))
+    except KeyboardInterrupt:
+        pass
+    except discord.LoginFailure:
+        logger.error("Failed to login: Invalid Discord token")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
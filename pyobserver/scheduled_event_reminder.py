@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 import pytz
 import json
 import os
+from pyobserver.metrics import REMINDER_LAG
 
 # 한국 시간대 설정
 KST = pytz.timezone('Asia/Seoul')
@@ -16,6 +17,7 @@ class ScheduledEventReminder(commands.Cog):
         self.notified_events_1day = set()  
         self.config_file = 'event_config.json'
         self.config = self.load_config()
+        self.next_check_time = None
         self.check_scheduled_events.start()
     
     def load_config(self):
@@ -33,6 +35,13 @@ class ScheduledEventReminder(commands.Cog):
     def cog_unload(self):
         self.check_scheduled_events.cancel()
         self.save_config()
+
+    def export_state(self):
+        """확장 리로드 시 새 cog로 넘겨줄 상태"""
+        return {'notified_events_1day': self.notified_events_1day}
+
+    def import_state(self, state):
+        self.notified_events_1day = state['notified_events_1day']
     
     def get_guild_config(self, guild_id):
         """서버별 설정 가져오기"""
@@ -84,6 +93,11 @@ class ScheduledEventReminder(commands.Cog):
     async def check_scheduled_events(self):
         """Discord의 예정된 이벤트를 확인하고 30분 전에 알림을 보냅니다."""
         current_time = datetime.now(KST)
+
+        # 예정된 실행 시각보다 얼마나 늦게 실행됐는지 기록
+        if self.next_check_time is not None:
+            REMINDER_LAG.observe(max(0.0, (current_time - self.next_check_time).total_seconds()))
+        self.next_check_time = self.check_scheduled_events.next_iteration
         
         for guild in self.bot.guilds:
             try:
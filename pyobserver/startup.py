@@ -0,0 +1,68 @@
+import os
+import time
+import asyncio
+import importlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 콜드 스타트 목표 시간 (초), 초과하면 경고 로그
+DEFAULT_STARTUP_BUDGET_SEC = 5.0
+
+
+class StartupProfile:
+    """봇 시작 단계별 소요 시간 기록 (imports, login, extension load, first ready)"""
+
+    def __init__(self, name, started_at, budget_sec=None):
+        self.name = name
+        self.started_at = started_at
+        self.last_mark = started_at
+        self.phases = {}
+        self.budget_sec = budget_sec if budget_sec is not None else float(
+            os.getenv('STARTUP_BUDGET_SEC', DEFAULT_STARTUP_BUDGET_SEC)
+        )
+        self.finished = False
+
+    def mark(self, phase):
+        """직전 mark 이후 경과 시간을 `phase`로 기록"""
+        now = time.perf_counter()
+        self.phases[phase] = now - self.last_mark
+        self.last_mark = now
+
+    @property
+    def total(self):
+        return self.last_mark - self.started_at
+
+    def report(self):
+        lines = [f"{self.name} startup: {self.total:.2f}s (budget {self.budget_sec:.2f}s)"]
+        for phase, seconds in self.phases.items():
+            lines.append(f"  {phase:<16}{seconds * 1000:>10.1f}ms")
+        return '\n'.join(lines)
+
+    def finish(self):
+        """첫 on_ready에서 한 번만 호출"""
+        if self.finished:
+            return
+        self.finished = True
+        self.mark('first_ready')
+
+        logger.info(self.report())
+        if self.total > self.budget_sec:
+            logger.warning(f"{self.name} startup took {self.total:.2f}s, over the {self.budget_sec:.2f}s budget")
+
+
+async def prewarm_imports(module_names):
+    """접속 후 백그라운드 스레드에서 무거운 모듈을 미리 import 하여 첫 명령 지연을 줄임
+
+    `PREWARM_IMPORTS=0`이면 건너뜀
+    """
+    if os.getenv('PREWARM_IMPORTS', '1') == '0':
+        return
+
+    for name in module_names:
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(importlib.import_module, name)
+            logger.info(f"Pre-warmed {name} in {(time.perf_counter() - start) * 1000:.0f}ms")
+        except ImportError as e:
+            logger.warning(f"Failed to pre-warm {name}: {e}")
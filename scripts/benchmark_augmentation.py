@@ -0,0 +1,49 @@
+import time
+import torch
+import argparse
+
+import numpy as np
+from PIL import Image
+
+from pyffxivdata.dataset import TRAIN_TRANSFORM, UINT8_TRANSFORM
+from pyffxivdata.augmentation import BatchAugmentation
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_images", type=int, default=256)
+    parser.add_argument("--batch_size", type=int, default=32)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--device", type=str, default="cpu")
+    return parser.parse_args()
+
+def benchmark(num_images, batch_size, width, height, device):
+    rng = np.random.default_rng(0)
+    images = [
+        Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8))
+        for _ in range(min(num_images, 16))
+    ]
+    images = [images[i % len(images)] for i in range(num_images)]
+
+    # Current path: RandomHorizontalFlip + RandomAffine + Resize + ToTensor + Normalize per PIL image
+    start = time.perf_counter()
+    for image in images:
+        TRAIN_TRANSFORM(image)
+    pil_sec = time.perf_counter() - start
+
+    # Batched path: per-image resize to uint8 in the dataset, augmentation on collated batches
+    augmentation = BatchAugmentation(seed=0)
+    start = time.perf_counter()
+    for i in range(0, num_images, batch_size):
+        batch = torch.stack([UINT8_TRANSFORM(image) for image in images[i:i + batch_size]]).to(device)
+        augmentation(batch)
+    if device.startswith("cuda"):
+        torch.cuda.synchronize()
+    batched_sec = time.perf_counter() - start
+
+    print(f"PIL per-image path: {num_images / pil_sec:.1f} images/sec")
+    print(f"Batched tensor path: {num_images / batched_sec:.1f} images/sec ({pil_sec / batched_sec:.2f}x)")
+
+if __name__ == "__main__":
+    args = parse_args()
+    benchmark(**vars(args))
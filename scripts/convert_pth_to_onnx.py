@@ -1,27 +1,48 @@
+import json
 import torch
 import argparse
 
+from pathlib import Path
+
 import torch.nn as nn
 from torch.export import Dim
 
 from pyffxivdata.model import FFXIVPullDetector  
 
+# Resolution of checkpoints saved before best_model.meta.json existed
+DEFAULT_IMAGE_SIZE = 384
+
 def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("--torch_checkpoint_path", type=str, required=True)
     parser.add_argument("--onnx_path", type=str, required=True)
+    parser.add_argument("--image_size", type=int, default=None, help="default: image_size in the checkpoint's .meta.json")
+    parser.add_argument("--dynamic_batch", action="store_true", help="export with a dynamic batch dimension for batched inference")
     return parser.parse_args()
 
-def convert_to_onnx(torch_checkpoint_path, onnx_path):
+def load_image_size(torch_checkpoint_path):
+    # Written next to the checkpoint by pyffxivdata.train (save_checkpoint_meta)
+    meta_path = Path(torch_checkpoint_path).with_suffix(".meta.json")
+    if not meta_path.exists():
+        return DEFAULT_IMAGE_SIZE
+    with open(meta_path, "r") as f:
+        return json.load(f)["image_size"]
+
+def convert_to_onnx(torch_checkpoint_path, onnx_path, image_size=None, dynamic_batch=False):
     model = FFXIVPullDetector(device="cpu")
     state = torch.load(torch_checkpoint_path, map_location="cpu")
     state = {k.replace("module.", ""): v for k,v in state.items()}
     model.load_state_dict(state, strict=True)
     model.eval()
 
-    dummy = torch.randn(1, 3, 384, 384)
+    image_size = image_size or load_image_size(torch_checkpoint_path)
+    print(f"Exporting at {image_size}x{image_size}")
+
+    # torch.export specializes size-1 dimensions, so trace a dynamic batch with 2 samples
+    dummy = torch.randn(2 if dynamic_batch else 1, 3, image_size, image_size)
 
-    exported = torch.onnx.export(model, dummy, dynamo=True)
+    dynamic_shapes = {"x": {0: Dim("batch", min=1, max=1024)}} if dynamic_batch else None
+    exported = torch.onnx.export(model, dummy, dynamo=True, dynamic_shapes=dynamic_shapes)
 
     exported.save(onnx_path)
     print("Saved:", onnx_path)
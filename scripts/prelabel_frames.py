@@ -0,0 +1,141 @@
+"""Pre-label frames with the exported pull detector for annotation in Label Studio.
+
+Images are decoded and resized by a process pool (one batch per task, a bounded number of batches
+in flight) while one ONNX Runtime session scores whole batches on all cores. The output is a
+Label Studio import file: `data` + `predictions` per task with no annotations, so Label Studio
+shows the model output as a pre-annotation and the export after human review has the
+`file_upload` + `annotations[0].result` schema read by `PullDetectorDataset`.
+
+Export the model with `--dynamic_batch` to score batches in one run:
+
+```sh
+python scripts/convert_pth_to_onnx.py --torch_checkpoint_path saved_models/best_model.pth --onnx_path pull_detector.onnx --dynamic_batch
+python scripts/prelabel_frames.py --onnx_model_path pull_detector.onnx --image_dir data/ffxiv_pulldetector_v2/images --output data/ffxiv_pulldetector_v2/annotations.prelabel.json
+```
+"""
+import os
+import json
+import time
+import argparse
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import onnxruntime as ort
+from PIL import Image
+
+from pyobserver.ffxiv_stream_collector.live_pull_detector import NORMALIZE_VALUES, STD_VALUES, model_input_size
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+# Model outputs in order, see ChoiceLabels in pyffxivdata/dataset.py (IsCombat has no head)
+OUTPUT_LABELS = ["HasRedCircle", "PullEnded"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--onnx_model_path", type=str, required=True)
+    parser.add_argument("--image_dir", type=str, required=True)
+    parser.add_argument("--output", type=str, required=True)
+    parser.add_argument("--batch_size", type=int, default=64)
+    parser.add_argument("--num_workers", type=int, default=None)
+    parser.add_argument("--threshold", type=float, default=0.5, help="sigmoid probability for a choice")
+    parser.add_argument("--from_name", type=str, default="choice", help="Choices tag name in the labeling config")
+    parser.add_argument("--to_name", type=str, default="image", help="Image tag name in the labeling config")
+    parser.add_argument("--model_version", type=str, default=None)
+    return parser.parse_args()
+
+
+def load_batch(paths, height, width):
+    """Decode and resize in a worker process, (B, H, W, 3) uint8 is 4x smaller to send back than float32"""
+    batch = np.empty((len(paths), height, width, 3), dtype=np.uint8)
+    for i, path in enumerate(paths):
+        with Image.open(path) as image:
+            # Let the JPEG decoder downscale by a power of two before the exact resize
+            image.draft("RGB", (width, height))
+            batch[i] = np.asarray(image.convert("RGB").resize((width, height), Image.Resampling.BILINEAR))
+    return batch
+
+
+def normalize(batch):
+    """(B, H, W, 3) uint8 -> (B, 3, H, W) normalized float32"""
+    images = batch.astype(np.float32).transpose(0, 3, 1, 2) / 255.0
+    return ((images - NORMALIZE_VALUES) / STD_VALUES).astype(np.float32)
+
+
+def build_session(onnx_model_path):
+    session_options = ort.SessionOptions()
+    session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session_options.intra_op_num_threads = os.cpu_count()
+    return ort.InferenceSession(str(onnx_model_path), sess_options=session_options, providers=["CPUExecutionProvider"])
+
+
+def run_batch(session, images):
+    input_meta = session.get_inputs()[0]
+    # Models exported without --dynamic_batch only take batch size 1
+    if isinstance(input_meta.shape[0], int) and input_meta.shape[0] != len(images):
+        return np.concatenate([session.run(None, {input_meta.name: image[np.newaxis]})[0] for image in images])
+    return session.run(None, {input_meta.name: images})[0]
+
+
+def to_task(image_name, logits, threshold, from_name, to_name, model_version):
+    probabilities = 1 / (1 + np.exp(-logits.astype(np.float64)))
+    choices = [label for label, probability in zip(OUTPUT_LABELS, probabilities) if probability > threshold]
+
+    # An empty result means no choice is set
+    result = [] if not choices else [{
+        "from_name": from_name,
+        "to_name": to_name,
+        "type": "choices",
+        "value": {"choices": choices},
+    }]
+    # Confidence of the least certain decision, so low scores can be reviewed first
+    score = float(np.min(np.maximum(probabilities, 1 - probabilities)))
+
+    return {
+        "data": {"image": image_name},
+        # Filled in by the reviewer, only human-reviewed labels end up in the exported annotations
+        "annotations": [],
+        "predictions": [{"model_version": model_version, "score": score, "result": result}],
+    }
+
+
+def prelabel(onnx_model_path, image_dir, output, batch_size, num_workers, threshold, from_name, to_name, model_version):
+    image_dir = Path(image_dir)
+    names = sorted(name for name in os.listdir(image_dir) if Path(name).suffix.lower() in IMAGE_EXTENSIONS)
+    batches = [names[i:i + batch_size] for i in range(0, len(names), batch_size)]
+    model_version = model_version or Path(onnx_model_path).stem
+
+    session = build_session(onnx_model_path)
+    height, width = model_input_size(session)
+    num_workers = num_workers or os.cpu_count()
+
+    tasks = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        # Keep only a few decoded batches in memory while the session is busy
+        pending = deque()
+        next_batch = 0
+        for batch_names in batches:
+            while next_batch < len(batches) and len(pending) < num_workers * 2:
+                pending.append(executor.submit(load_batch, [image_dir / name for name in batches[next_batch]], height, width))
+                next_batch += 1
+
+            logits = run_batch(session, normalize(pending.popleft().result()))
+            for name, row in zip(batch_names, logits.reshape(len(batch_names), -1)):
+                tasks.append(to_task(name, row, threshold, from_name, to_name, model_version))
+
+            print(f"\r{len(tasks)}/{len(names)} frames", end="", flush=True)
+
+    elapsed = time.perf_counter() - start
+    print(f"\nScored {len(tasks)} frames in {elapsed:.1f}s ({len(tasks) / max(elapsed, 1e-9):.1f} frames/s)")
+
+    with open(output, "w") as f:
+        json.dump(tasks, f)
+    print("Saved:", output)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    prelabel(**vars(args))
@@ -0,0 +1,59 @@
+import sys
+import argparse
+import subprocess
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modules", nargs="+", default=[
+        "pyobserver.run_assistant_bot",
+        "pyobserver.ai_observer_bot.run_observer_bot",
+    ])
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--budget_ms", type=float, default=None, help="exit 1 if a module's total import time exceeds this")
+    return parser.parse_args()
+
+def measure_import_time(module):
+    """`python -X importtime -c "import <module>"`를 새 프로세스에서 실행하여 결과 파싱
+
+    Returns:
+        [(누적 시간 us, 자체 시간 us, 모듈 이름)]
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return rows
+
+def report(module, rows, top):
+    # 최상위 import만 더하면 전체 시간 (중첩된 import는 들여쓰기로 구분됨)
+    total_us = sum(cumulative for cumulative, _, name in rows if len(name) - len(name.lstrip()) <= 1)
+
+    print(f"\n=== {module}: {total_us / 1000:.1f}ms ({len(rows)} modules) ===")
+    print(f"{'cumulative':>12}{'self':>10}  module")
+    for cumulative, self_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative / 1000:>10.1f}ms{self_us / 1000:>8.1f}ms  {name.strip()}")
+    return total_us / 1000
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    over_budget = []
+    for module in args.modules:
+        total_ms = report(module, measure_import_time(module), args.top)
+        if args.budget_ms is not None and total_ms > args.budget_ms:
+            over_budget.append((module, total_ms))
+
+    for module, total_ms in over_budget:
+        print(f"{module} import took {total_ms:.1f}ms, over the {args.budget_ms:.1f}ms budget")
+    sys.exit(1 if over_budget else 0)
@@ -0,0 +1,52 @@
+"""Compare training runs by wall-clock time against validation score.
+
+Reads `metrics_history.csv` of each `save_dir` written by `pyffxivdata.train` (one row per epoch with
+image_size, epoch_time_sec, elapsed_sec and score) and prints one row per run, e.g. a fixed 384 run
+against a 224 -> 320 -> 384 schedule.
+
+run ex)
+
+```sh
+python scripts/report_resolution_schedule.py --save_dirs saved_models/fixed_384 saved_models/progressive
+```
+"""
+import argparse
+
+from pathlib import Path
+
+import pandas as pd
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--save_dirs", type=str, nargs="+", required=True)
+    return parser.parse_args()
+
+
+def summarize(save_dir):
+    history = pd.read_csv(Path(save_dir) / "metrics_history.csv")
+    best = history["score"].idxmax()
+
+    # Consecutive epochs at the same resolution, e.g. "224x10 320x10 384x10"
+    phases = []
+    for size in history["image_size"]:
+        if phases and phases[-1][0] == size:
+            phases[-1][1] += 1
+        else:
+            phases.append([size, 1])
+
+    return {
+        "run": Path(save_dir).name,
+        "schedule": " ".join(f"{size}x{epochs}" for size, epochs in phases),
+        "wall_clock_sec": history["elapsed_sec"].iloc[-1],
+        "final_score": history["score"].iloc[-1],
+        "best_score": history["score"].iloc[best],
+        "sec_to_best": history["elapsed_sec"].iloc[best],
+    }
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = pd.DataFrame([summarize(save_dir) for save_dir in args.save_dirs])
+    report["time_vs_first"] = report["wall_clock_sec"] / report["wall_clock_sec"].iloc[0]
+    print(report.to_string(index=False, float_format=lambda value: f"{value:.3f}"))